@@ -0,0 +1,215 @@
+"""
+命令解析模块
+所有命令共用的单遍分词器：参数以空白分隔，双引号括起的文本可以包含空格，
+引号内只有 \\" 表示转义的引号，其余反斜杠原样保留（如 insert 文本中的 \\n 由命令自行处理）。
+每种命令的参数格式由它的用法字符串（如 insert <line:col> "text"）编译一次，
+解析结果是类型化的参数元组。所有命令都经同一个分词器与 Signature.parse 解析，
+不为个别用法另写切分规则，转义、空白与报错对每个命令都相同
+"""
+import re
+import functools
+
+# 用法字符串中的占位符 -> 参数类型
+_PLACEHOLDER_KINDS = {
+    "file": "word",
+    "path": "word",
+    "time": "word",
+    "pattern": "word",
+    "N": "int",
+    "len": "int",
+    "line": "int",
+}
+
+
+class CommandError(ValueError):
+    """命令参数与用法不符"""
+
+
+class Quoted(str):
+    """双引号括起的参数"""
+    __slots__ = ()
+
+
+# 一个参数：引号文本（其中的 \" 不结束文本）、不含空白和引号的词，或不匹配的引号
+_QUOTED_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*')
+_TOKEN = re.compile(r'"(' + _QUOTED_BODY.pattern + r')"|([^\s"]+)|(")')
+
+
+def tokenize(command):
+    """把命令切分为参数元组，引号括起的参数为 Quoted；引号不匹配时抛出 CommandError"""
+    tokens = []
+    for quoted, word, stray in _TOKEN.findall(command):
+        if word:
+            tokens.append(word)
+        elif stray:
+            raise CommandError("引号不匹配")
+        else:
+            tokens.append(Quoted(quoted.replace('\\"', '"') if '\\"' in quoted else quoted))
+    return tuple(tokens)
+
+
+def operator(command):
+    """命令名（第一个参数）；空命令返回空字符串。只读取命令名，参数由命令自己解析"""
+    head = command.split(None, 1)
+    if not head:
+        return ""
+    return head[0].split('"', 1)[0]
+
+
+def quote(text):
+    """把文本写成命令中的引号参数，与 tokenize 互逆"""
+    return '"' + text.replace('"', '\\"') + '"'
+
+
+def _text(token):
+    if not isinstance(token, Quoted):
+        raise ValueError(token)
+    return str(token)
+
+
+def _word(token):
+    return str(token)
+
+
+def _int(token):
+    if isinstance(token, Quoted):
+        raise ValueError(token)
+    return int(token)
+
+
+def _position(token):
+    if isinstance(token, Quoted):
+        raise ValueError(token)
+    line, col = token.split(":")
+    return int(line), int(col)
+
+
+def _choice(choices, token):
+    if isinstance(token, Quoted) or token not in choices:
+        raise ValueError(token)
+    return token
+
+
+# 参数类型 -> 转换函数，不符时抛出 ValueError
+_CONVERTERS = {"text": _text, "word": _word, "int": _int, "pos": _position}
+
+
+class Signature:
+    """
+    由用法字符串编译出的参数格式
+    <name> 或 file、N 等为占位符，line:col 形式为位置，"text" 为引号文本，
+    a|b 为可选的字面值之一，[...] 为可省略的参数，[--name <value>] 为可出现在任意位置的选项
+    """
+
+    def __init__(self, usage):
+        self.usage = usage
+        self.message = f"参数错误，应为：{usage}"
+        # 每个参数的 (转换函数, 是否可省略)
+        self.fields = []
+        # 选项名 -> 在结果元组中的下标
+        self.options = {}
+        spec = tokenize(usage)[1:]
+        index = 0
+        while index < len(spec):
+            token = spec[index]
+            if isinstance(token, Quoted) or not token.startswith("["):
+                self.fields.append((_converter(token), False))
+                index += 1
+                continue
+            group = [token[1:]]
+            while not group[-1].endswith("]"):
+                index += 1
+                group.append(spec[index])
+            group[-1] = group[-1][:-1]
+            index += 1
+            if group[0].startswith("--"):
+                self.options[group[0]] = len(self.fields)
+                self.fields.append((_converter(group[1]), True))
+            else:
+                self.fields.append((_converter(group[0]), True))
+        option_indexes = set(self.options.values())
+        self.positional = [(i, field) for i, field in enumerate(self.fields) if i not in option_indexes]
+        # 没有可省略参数时按位置一一转换
+        self.fixed = not any(optional for _, optional in self.fields)
+
+    def parse(self, command):
+        """解析命令（不含命令名），返回与用法中参数一一对应的元组，省略的参数为 None"""
+        try:
+            tokens = tokenize(command)[1:]
+            if self.fixed:
+                if len(tokens) != len(self.fields):
+                    raise CommandError(self.message)
+                return tuple(convert(token) for (convert, _), token in zip(self.fields, tokens))
+            return self._parse_optional(tokens)
+        except ValueError:
+            # 包括 tokenize 报告的引号不匹配
+            raise CommandError(self.message)
+
+    def _parse_optional(self, tokens):
+        values = [None] * len(self.fields)
+        positional = []
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            option = None if isinstance(token, Quoted) else self.options.get(token)
+            if option is None:
+                positional.append(token)
+                index += 1
+                continue
+            if index + 1 >= len(tokens) or values[option] is not None:
+                raise CommandError(self.message)
+            values[option] = self.fields[option][0](tokens[index + 1])
+            index += 2
+
+        position = 0
+        for field_index, (convert, optional) in self.positional:
+            if position < len(positional):
+                try:
+                    values[field_index] = convert(positional[position])
+                    position += 1
+                    continue
+                except ValueError:
+                    # 可省略的参数不匹配时留给下一个参数
+                    if not optional:
+                        raise
+            elif not optional:
+                raise CommandError(self.message)
+        if position < len(positional):
+            raise CommandError(self.message)
+        return tuple(values)
+
+
+def _converter(token):
+    """用法中一个参数对应的转换函数"""
+    if isinstance(token, Quoted):
+        return _text
+    name = token[1:-1] if token.startswith("<") and token.endswith(">") else token
+    if ":" in name:
+        return _position
+    alternatives = name.split("|")
+    for alternative in alternatives:
+        if alternative in _PLACEHOLDER_KINDS:
+            return _CONVERTERS[_PLACEHOLDER_KINDS[alternative]]
+    if token.startswith("<"):
+        return _word
+    return functools.partial(_choice, tuple(alternatives))
+
+
+# 用法 -> 编译好的 Signature
+_signatures = {}
+
+
+def signature(usage):
+    """编译用法字符串，每种用法只编译一次"""
+    compiled = _signatures.get(usage)
+    if compiled is None:
+        compiled = _signatures[usage] = Signature(usage)
+    return compiled
+
+
+def parse(command, usage):
+    """按用法解析命令，参数不符时抛出 CommandError（消息为“参数错误，应为：用法”）"""
+    compiled = _signatures.get(usage)
+    if compiled is None:
+        compiled = signature(usage)
+    return compiled.parse(command)
@@ -1,7 +1,16 @@
 import os
+import shutil
 import File
+import TextBuffer
 
 rootpath = os.getcwd()
+# 保存文件时每次写入的行数
+SAVE_CHUNK_LINES = 8192
+# 保存后是否 fsync 到磁盘（更安全，但更慢）
+SAVE_FSYNC = False
+# 只修改了文件尾部、且需要改写的行数不超过该值时原地改写尾部，否则整体重写
+SAVE_PATCH_MAX_LINES = 100000
+
 def pathCheck(path: str):
 
     base = os.path.basename(path)
@@ -37,3 +46,172 @@ def create_newFile(filePath,withLog=False):
     newFile=File.TextFile(filePath,withLog=withLog)
     File.FileList.all_files[newFile.filePath]=newFile
     return newFile
+
+#读取磁盘上已有的文件，load 时使用
+def load_existingFile(filePath):
+    if not pathCheck(filePath):
+        return
+    if filePath in File.FileList.all_files_path:
+        print("文件已存在")
+        return
+    try:
+        # 先取磁盘状态：读取期间文件被修改时，保存会整体重写
+        stamp = disk_stamp(filePath)
+        content = TextBuffer.read_lines(filePath)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"读取文件失败: {e}")
+        return
+    File.FileList.all_files_path.add(filePath)
+    newFile=File.TextFile(filePath,content=content)
+    newFile.disk_stamp = stamp
+    File.FileList.all_files[newFile.filePath]=newFile
+    return newFile
+
+#磁盘文件的 (大小, 修改时间)，文件不存在时为 None
+def disk_stamp(filePath):
+    try:
+        st = os.stat(filePath)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+#保存 TextFile：磁盘文件自上次读取或保存后未被改动、且只修改了尾部时，
+#截断到第一处修改所在行并写入之后的行（只追加时即为追加写入）；否则整体原子重写。
+#mmap 打开的文件只原地追加，从不在映射仍在使用时截断
+def save_file(filePath, textFile, fsync=None):
+    content = textFile.content
+    if not _patch_tail(filePath, textFile, content, fsync):
+        mapped = content.original
+        if not (isinstance(mapped, TextBuffer.MappedLines)
+                and os.path.abspath(mapped.path) == os.path.abspath(filePath)):
+            mapped = None
+        write_lines_atomic(filePath, content, fsync, release=mapped)
+        if mapped is not None:
+            # 旧映射已关闭，改为映射刚写好的文件，之后的编辑与保存都基于它
+            content.rebase(TextBuffer.read_lines(filePath))
+    content.mark_clean()
+    textFile.disk_stamp = disk_stamp(filePath)
+
+def _patch_tail(filePath, textFile, content, fsync):
+    fsync = SAVE_FSYNC if fsync is None else fsync
+    if textFile.disk_stamp is None or disk_stamp(filePath) != textFile.disk_stamp:
+        return False
+    start = content.dirty_from()
+    if start is None:
+        # 内容与磁盘一致，无需写入
+        return True
+    disk_lines = content.clean_length() - start
+    if max(disk_lines, len(content) - start) > SAVE_PATCH_MAX_LINES:
+        return False
+    if disk_lines and isinstance(content.original, TextBuffer.MappedLines):
+        # 原始内容正映射着这个文件：截断后再读被映射的尾部会崩溃（Windows 上截断直接失败），
+        # 只允许追加，其余情况整体重写
+        return False
+    tail = content[start:]
+    with open(filePath, 'r+b') as f:
+        found = _tail_line_offset(f, disk_lines)
+        if found is None:
+            return False
+        offset, need_newline = found
+        f.seek(offset)
+        f.truncate()
+        text = "".join(line + "\n" for line in tail)
+        if need_newline:
+            text = "\n" + text
+        f.write(text.replace("\n", os.linesep).encode('utf-8'))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    return True
+
+#文件最后 lines 行的起始字节位置，以及写入前是否需要先补一个换行符；
+#要改写的部分含有与本机换行符不同的 \r（单独的 \r 或其他平台的换行）时返回 None，
+#这时按换行符数出的行与读入时的行对应不上，只能整体重写
+def _tail_line_offset(f, lines):
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        return 0, False
+    f.seek(max(0, size - 2))
+    last = f.read()
+    if not _native_newlines(last):
+        return None
+    ends_with_newline = last.endswith(b"\n")
+    if lines == 0:
+        return size, not ends_with_newline
+    # 末尾的换行符属于最后一行，要再往前找一个
+    remaining = lines + 1 if ends_with_newline else lines
+    pos = size
+    block = 64 * 1024
+    while pos > 0:
+        read_start = max(0, pos - block)
+        f.seek(read_start)
+        data = f.read(pos - read_start)
+        end = len(data)
+        while True:
+            end = data.rfind(b"\n", 0, end)
+            if end < 0:
+                break
+            remaining -= 1
+            if remaining == 0:
+                # 找到的换行符之前的一个字节也要检查（可能是 \r\n 的 \r）
+                if end == 0 and read_start > 0:
+                    f.seek(read_start - 1)
+                    data = f.read(1) + data
+                    end += 1
+                if not _native_newlines(data[max(0, end - 1):]):
+                    return None
+                return read_start + end + 1, False
+        if not _native_newlines(data):
+            return None
+        pos = read_start
+    return 0, False
+
+#字节串中的换行是否都是本机换行符（os.linesep）；块边界上被切开的 \r\n 按不一致处理
+def _native_newlines(data):
+    if os.linesep == "\n":
+        return b"\r" not in data
+    return data.count(b"\r") == data.count(b"\r\n") == data.count(b"\n")
+
+#保存文件：分块写入同目录下的临时文件，再改名覆盖目标文件
+#写入中途失败时原文件保持不变。release 为正映射着目标文件的 MappedLines：
+#Windows 上不能替换仍被映射的文件，写完临时文件后先关闭映射再改名，改名失败时重新映射
+def write_lines_atomic(filePath, lines, fsync=None, release=None):
+    fsync = SAVE_FSYNC if fsync is None else fsync
+    dir_path, base = os.path.split(os.path.abspath(filePath))
+    tmp_path = os.path.join(dir_path, f".{base}.saving")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            chunk = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) >= SAVE_CHUNK_LINES:
+                    chunk.append("")
+                    f.write("\n".join(chunk))
+                    chunk.clear()
+            if chunk:
+                chunk.append("")
+                f.write("\n".join(chunk))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        if os.path.exists(filePath):
+            shutil.copymode(filePath, tmp_path)
+        if release is not None:
+            release.close()
+        try:
+            os.replace(tmp_path, filePath)
+        except BaseException:
+            if release is not None:
+                release.reopen()
+            raise
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if fsync and hasattr(os, "O_DIRECTORY"):
+        # 改名本身也要落盘
+        dir_fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
@@ -1,442 +1,622 @@
 """
 编辑器操作命令模块
-使用命令模式（Command Pattern）实现可撤销的编辑操作
+使用命令模式（Command Pattern）实现可撤销的编辑操作：
+命令对象只负责解析与执行，每次执行产生一条不可变的编辑记录，
+撤销/重做栈中保存的是这些记录
 """
+import re
+import sys
+import itertools
 import WorkSpace
 import Logging
+import CommandParser
+import TextBuffer
+
+# 每条撤销记录除文本外的固定开销（字节，估算值）
+_RECORD_OVERHEAD = 64
+
+
+def _splice(content, line, col, length, text):
+    """从第 line 行第 col 列（从 0 开始）起删除 length 个字符（换行符计一个），再插入 text"""
+    end_line, end_col = line, col + length
+    while end_col > len(content[end_line]) and end_line + 1 < len(content):
+        end_col -= len(content[end_line]) + 1
+        end_line += 1
+    head = content[line][:col]
+    tail = content[end_line][end_col:]
+    content[line:end_line + 1] = (head + text + tail).split("\n")
+
+
+class TextDelta:
+    """
+    一次编辑的最小差量：在第 line 行第 col 列（从 0 开始）处把 removed 替换为 inserted，
+    两者都可以跨行（以换行符分隔）；撤销记录只保存差量，不保存整行内容
+    """
+    __slots__ = ("line", "col", "removed", "inserted")
+
+    def __init__(self, line, col, removed, inserted):
+        object.__setattr__(self, "line", line)
+        object.__setattr__(self, "col", col)
+        object.__setattr__(self, "removed", removed)
+        object.__setattr__(self, "inserted", inserted)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TextDelta 不可修改")
+
+    def apply(self, content):
+        _splice(content, self.line, self.col, len(self.removed), self.inserted)
+
+    def revert(self, content):
+        _splice(content, self.line, self.col, len(self.inserted), self.removed)
+
+    def memory_size(self):
+        return _RECORD_OVERHEAD + sys.getsizeof(self.removed) + sys.getsizeof(self.inserted)
+
+
+class EditRecord:
+    """
+    编辑记录基类：一次命令执行的结果，创建后不可修改
+    apply/revert 只改动内容；undo/redo 在此基础上输出提示并记录日志
+    """
+    __slots__ = ("file", "kind")
+
+    # 命令名 -> 提示中的操作名
+    _LABELS = {"append": "追加", "insert": "插入", "delete": "删除", "replace": "替换", "batch": "批量编辑",
+               "append-file": "追加文件", "insert-block": "插入文本块"}
+
+    def __init__(self, file, kind):
+        object.__setattr__(self, "file", file)
+        object.__setattr__(self, "kind", kind)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 不可修改")
+
+    def apply(self):
+        """把这次编辑应用到文件内容"""
+        raise NotImplementedError
+
+    def revert(self):
+        """从文件内容中撤回这次编辑"""
+        raise NotImplementedError
+
+    def describe(self):
+        """这次编辑对应的命令文本，用于日志"""
+        raise NotImplementedError
+
+    def to_value(self):
+        """不含文件引用的可序列化形式，用于持久化撤销历史"""
+        raise NotImplementedError
+
+    def memory_size(self):
+        """记录占用的内存（字节，估算值），用于撤销历史的内存预算"""
+        return _RECORD_OVERHEAD
+
+    def can_undo(self):
+        return True
+
+    def merge(self, record):
+        """
+        与紧随其后的一条记录合并为一条撤销记录：连续的 append 合并为一条多行追加，
+        一次撤销整段追加；不能合并时返回 None
+        """
+        return None
+
+    def group(self, records):
+        """
+        把批量编辑中的一组记录合并为一条复合记录：
+        连续的 append 合并为一条多行追加，撤销与重做时只做一次切片操作
+        """
+        merged = []
+        appended = []
+        for record in records:
+            if isinstance(record, AppendRecord) and record.kind == "append":
+                appended.append(record.text)
+                continue
+            if appended:
+                merged.append(AppendLinesRecord(self.file, tuple(appended)))
+                appended = []
+            merged.append(record)
+        if appended:
+            merged.append(AppendLinesRecord(self.file, tuple(appended)))
+        return CompoundRecord(self.file, tuple(merged))
+
+    def undo(self):
+        self.revert()
+        print(f"撤销{self._LABELS[self.kind]}操作成功")
+        WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"undo {self.describe()}")
+
+    def redo(self):
+        self.apply()
+        print(f"重做{self._LABELS[self.kind]}操作成功")
+        WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"redo {self.describe()}")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.describe()!r})"
+
+
+class AppendRecord(EditRecord):
+    """在文件末尾新增一行：append，以及在空文件中的 insert"""
+    __slots__ = ("text",)
+
+    def __init__(self, file, text, kind="append"):
+        super().__init__(file, kind)
+        object.__setattr__(self, "text", text)
+
+    def apply(self):
+        self.file.content.append(self.text)
+
+    def revert(self):
+        if self.file.content:
+            self.file.content.pop()
+
+    def merge(self, record):
+        if self.kind == "append" and isinstance(record, AppendRecord) and record.kind == "append":
+            return AppendLinesRecord(self.file, [self.text, record.text])
+        return None
+
+    def describe(self):
+        if self.kind == "insert":
+            return f"insert 1:1 {CommandParser.quote(self.text)}"
+        return f"append {CommandParser.quote(self.text)}"
+
+    def to_value(self):
+        return ["append", self.kind, self.text]
+
+    def memory_size(self):
+        return _RECORD_OVERHEAD + sys.getsizeof(self.text)
+
+
+class AppendLinesRecord(EditRecord):
+    """
+    在文件末尾一次新增多行
+    连续追加时新记录与旧记录共用同一个行列表（只在末尾追加），每条记录只使用前 count 行，
+    合并一次追加的开销与已合并的行数无关
+    """
+    __slots__ = ("_lines", "count", "size")
+
+    def __init__(self, file, lines, kind="append", count=None, size=None):
+        super().__init__(file, kind)
+        count = len(lines) if count is None else count
+        if size is None:
+            size = _RECORD_OVERHEAD + sys.getsizeof(lines) + sum(sys.getsizeof(line) for line in lines[:count])
+        object.__setattr__(self, "_lines", lines)
+        object.__setattr__(self, "count", count)
+        object.__setattr__(self, "size", size)
+
+    @property
+    def lines(self):
+        return tuple(self._lines[:self.count])
+
+    def apply(self):
+        content = self.file.content
+        content[len(content):] = self._lines[:self.count]
+
+    def revert(self):
+        content = self.file.content
+        del content[max(0, len(content) - self.count):]
+
+    def merge(self, record):
+        if self.kind != "append" or not isinstance(record, AppendRecord) or record.kind != "append":
+            return None
+        lines = self._lines
+        if not isinstance(lines, list) or len(lines) != self.count:
+            # 行列表已被更新的记录延长，或不可追加：复制一份
+            lines = list(lines[:self.count])
+        lines.append(record.text)
+        return AppendLinesRecord(self.file, lines, self.kind, self.count + 1,
+                                 self.size + sys.getsizeof(record.text))
+
+    def describe(self):
+        return f"append {self.count} lines"
+
+    def to_value(self):
+        return ["lines", self.kind, self._lines[:self.count]]
+
+    def memory_size(self):
+        return self.size
+
+
+class BlockRecord(EditRecord):
+    """
+    在第 index 行（从 0 开始）前一次插入多行：append-file、insert-block
+    应用与撤销都只做一次切片操作，与行数无关
+    """
+    __slots__ = ("index", "lines")
+
+    def __init__(self, file, kind, index, lines):
+        super().__init__(file, kind)
+        object.__setattr__(self, "index", index)
+        object.__setattr__(self, "lines", lines)
+
+    def apply(self):
+        self.file.content[self.index:self.index] = self.lines
+
+    def revert(self):
+        del self.file.content[self.index:self.index + len(self.lines)]
+
+    def describe(self):
+        return f"{self.kind} {self.index + 1} {len(self.lines)} lines"
+
+    def to_value(self):
+        return ["block", self.kind, self.index, list(self.lines)]
+
+    def memory_size(self):
+        return _RECORD_OVERHEAD + sys.getsizeof(self.lines) + sum(sys.getsizeof(line) for line in self.lines)
+
+
+class CompoundRecord(EditRecord):
+    """批量编辑：按顺序重做、按逆序撤销其中的所有记录"""
+    __slots__ = ("records",)
+
+    def __init__(self, file, records):
+        super().__init__(file, "batch")
+        object.__setattr__(self, "records", records)
+
+    def apply(self):
+        for record in self.records:
+            record.apply()
+
+    def revert(self):
+        for record in reversed(self.records):
+            record.revert()
+
+    def describe(self):
+        return "batch"
+
+    def to_value(self):
+        return ["batch", [record.to_value() for record in self.records]]
+
+    def memory_size(self):
+        return _RECORD_OVERHEAD + sum(record.memory_size() for record in self.records)
+
+
+class DeltaRecord(EditRecord):
+    """行内编辑：insert、delete、replace，只保存差量"""
+    __slots__ = ("delta",)
+
+    def __init__(self, file, kind, delta):
+        super().__init__(file, kind)
+        object.__setattr__(self, "delta", delta)
+
+    def apply(self):
+        self.delta.apply(self.file.content)
+
+    def revert(self):
+        self.delta.revert(self.file.content)
+
+    def describe(self):
+        delta = self.delta
+        position = f"{delta.line + 1}:{delta.col + 1}"
+        if self.kind == "insert":
+            text = delta.inserted.replace("\n", "\\n")
+            return f"insert {position} {CommandParser.quote(text)}"
+        if self.kind == "delete":
+            return f"delete {position} {len(delta.removed)}"
+        return f"replace {position} {len(delta.removed)} {CommandParser.quote(delta.inserted)}"
+
+    def to_value(self):
+        delta = self.delta
+        return ["delta", self.kind, delta.line, delta.col, delta.removed, delta.inserted]
+
+    def memory_size(self):
+        return self.delta.memory_size()
+
+
+def record_from_value(file, value):
+    """由 to_value 的结果还原编辑记录"""
+    tag = value[0]
+    if tag == "append":
+        return AppendRecord(file, value[2], kind=value[1])
+    if tag == "lines":
+        return AppendLinesRecord(file, tuple(value[2]), kind=value[1])
+    if tag == "block":
+        return BlockRecord(file, value[1], value[2], tuple(value[3]))
+    if tag == "delta":
+        return DeltaRecord(file, value[1], TextDelta(*value[2:6]))
+    if tag == "batch":
+        return CompoundRecord(file, tuple(record_from_value(file, item) for item in value[1]))
+    raise ValueError(f"未知的编辑记录: {tag}")
+
+
+def read_block(path):
+    """读取外部文件的全部行，用于 append-file/insert-block；文件不存在时抛出 OSError"""
+    lines = TextBuffer.read_lines(path)
+    if isinstance(lines, TextBuffer.MappedLines):
+        # 记录需要在撤销/重做时保留这些行，不能继续引用可能被修改的磁盘文件
+        try:
+            return tuple(lines)
+        finally:
+            lines.close()
+    return tuple(lines)
+
 
 class EditCommand:
     """编辑命令基类（抽象命令）"""
-    
+
+    # 命令用法，由 CommandParser 编译为参数格式
+    USAGE = None
+    # 编译好的参数格式，定义命令类时编译一次，解析时不再按用法查找
+    SIGNATURE = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.USAGE is not None:
+            cls.SIGNATURE = CommandParser.signature(cls.USAGE)
+
     def execute(self, command):
         """执行命令"""
         raise NotImplementedError
-    
-    def undo(self):
-        """撤销命令"""
-        raise NotImplementedError
-    
+
     def can_undo(self):
         """判断是否可以撤销"""
         return True
 
+    def _parse(self, command):
+        """按 USAGE 解析参数，参数错误时输出提示并返回 None"""
+        try:
+            return self.SIGNATURE.parse(command)
+        except CommandParser.CommandError as e:
+            print(str(e))
+            return None
+
+    def _current_file(self):
+        """获取当前活动文件，没有时输出提示并返回 None"""
+        if not WorkSpace.WorkSpace.current_workFile_path:
+            print("没有打开的文件")
+            return None
+        file = WorkSpace.WorkSpace.current_workFile_list.get(
+            WorkSpace.WorkSpace.current_workFile_path
+        )
+        if not file:
+            print("当前文件不存在")
+            return None
+        return file
+
 
 class AppendCommand(EditCommand):
     """追加文本命令 - append "text" """
-    
-    def __init__(self):
-        self.file = None
-        self.text = ""
-    
+    USAGE = 'append "text"'
+
     def execute(self, command):
         # 解析命令：append "text"
-        parts = command.split('"')
-        if len(parts) < 2:
-            print("参数错误，应为：append \"text\"")
+        args = self._parse(command)
+        if args is None:
             return False
-        
-        self.text = parts[1]
-        
+        text, = args
+
         # 获取当前活动文件
-        if not WorkSpace.WorkSpace.current_workFile_path:
-            print("没有打开的文件")
-            return False
-        
-        self.file = WorkSpace.WorkSpace.current_workFile_list.get(
-            WorkSpace.WorkSpace.current_workFile_path
-        )
-        
-        if not self.file:
-            print("当前文件不存在")
+        file = self._current_file()
+        if not file:
             return False
-        
+
         # 执行追加操作
-        self.file.content.append(self.text)
-        self.file.state = "modified"
+        record = AppendRecord(file, text)
+        record.apply()
+        file.state = "modified"
         print("追加成功")
-        WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"append \"{self.text}\"")
-        
+        WorkSpace.WorkSpace.logger.log_command(file.filePath, f"append {CommandParser.quote(text)}")
+
         # 添加到命令历史（用于undo/redo）
-        self.file.add_to_history(self)
+        file.add_to_history(record)
         return True
-    
-    def undo(self):
-        """撤销追加操作 - 删除最后一行"""
-        if self.file and self.file.content:
-            self.file.content.pop()
-            print("撤销追加操作成功")
-            WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"undo append \"{self.text}\"")
-    
-    def redo(self):
-        """重做追加操作"""
-        if self.file:
-            self.file.content.append(self.text)
-            print("重做追加操作成功")
-            WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"redo append \"{self.text}\"")
-        
+
 
 class InsertCommand(EditCommand):
     """插入文本命令 - insert <line:col> "text" """
-    
-    def __init__(self):
-        self.file = None
-        self.line = 0
-        self.col = 0
-        self.text = ""
-        self.original_line_content = ""
-    
+    USAGE = 'insert <line:col> "text"'
+
     def execute(self, command):
         # 解析命令：insert 1:3 "text"
-        try:
-            parts = command.split('"')
-            if len(parts) < 2:
-                print("参数错误，应为：insert <line:col> \"text\"")
-                return False
-            
-            self.text = parts[1]
-            position = parts[0].strip().split()[1]  # 获取line:col部分
-            line_col = position.split(':')
-            self.line = int(line_col[0])
-            self.col = int(line_col[1])
-            
-        except (IndexError, ValueError):
-            print("参数错误，应为：insert <line:col> \"text\"")
+        args = self._parse(command)
+        if args is None:
             return False
-        
+        (line, col), text = args
+
         # 获取当前活动文件
-        if not WorkSpace.WorkSpace.current_workFile_path:
-            print("没有打开的文件")
-            return False
-        
-        self.file = WorkSpace.WorkSpace.current_workFile_list.get(
-            WorkSpace.WorkSpace.current_workFile_path
-        )
-        
-        if not self.file:
-            print("当前文件不存在")
+        file = self._current_file()
+        if not file:
             return False
-        
+
         # 行列号从1开始，转换为索引（从0开始）
-        line_idx = self.line - 1
-        col_idx = self.col - 1
-        
+        line_idx = line - 1
+        col_idx = col - 1
+
         # 空文件只能在1:1插入
-        if not self.file.content:
-            if self.line != 1 or self.col != 1:
+        if not file.content:
+            if line != 1 or col != 1:
                 print("空文件只能在1:1位置插入")
                 return False
-            self.file.content.append(self.text)
-            self.file.state = "modified"
+            record = AppendRecord(file, text, kind="insert")
+            record.apply()
+            file.state = "modified"
             print("插入成功")
-            self.file.add_to_history(self)
+            WorkSpace.WorkSpace.logger.log_command(file.filePath, f"insert 1:1 {CommandParser.quote(text)}")
+            file.add_to_history(record)
             return True
-        
+
         # 检查行号是否越界
-        if line_idx < 0 or line_idx >= len(self.file.content):
+        if line_idx < 0 or line_idx >= len(file.content):
             print("行号越界")
             return False
-        
+
         # 检查列号是否越界
-        current_line = self.file.content[line_idx]
+        current_line = file.content[line_idx]
         if col_idx < 0 or col_idx > len(current_line):
             print("列号越界")
             return False
-        
-        # 保存原始行内容（用于撤销）
-        self.original_line_content = current_line
-        
-        # 处理包含换行符的文本
-        if '\\n' in self.text:
-            # 替换转义的换行符
-            text_with_newlines = self.text.replace('\\n', '\n')
-            lines = text_with_newlines.split('\n')
-            
-            # 拆分当前行
-            before = current_line[:col_idx]
-            after = current_line[col_idx:]
-            
-            # 第一行：before + lines[0]
-            # 中间行：lines[1:-1]
-            # 最后一行：lines[-1] + after
-            new_lines = []
-            new_lines.append(before + lines[0])
-            for i in range(1, len(lines) - 1):
-                new_lines.append(lines[i])
-            new_lines.append(lines[-1] + after)
-            
-            # 替换原来的行并插入新行
-            self.file.content[line_idx:line_idx+1] = new_lines
-        else:
-            # 简单插入
-            new_line = current_line[:col_idx] + self.text + current_line[col_idx:]
-            self.file.content[line_idx] = new_line
-        
-        self.file.state = "modified"
+
+        # 转义的换行符表示插入多行；撤销时只需删除插入的文本
+        record = DeltaRecord(file, "insert", TextDelta(line_idx, col_idx, "", text.replace('\\n', '\n')))
+        record.apply()
+
+        file.state = "modified"
         print("插入成功")
-        WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"insert {self.line}:{self.col} \"{self.text}\"")
-        self.file.add_to_history(self)
+        WorkSpace.WorkSpace.logger.log_command(file.filePath, f"insert {line}:{col} {CommandParser.quote(text)}")
+        file.add_to_history(record)
         return True
-    
-    def undo(self):
-        """撤销插入操作 - 恢复原始行内容"""
-        if self.file:
-            line_idx = self.line - 1
-            
-            # 如果原始行内容为空，说明是在空文件中插入的第一行
-            if not self.original_line_content and len(self.file.content) == 1:
-                self.file.content.pop()
-            elif '\\n' in self.text:
-                # 如果插入了多行，需要删除这些行并恢复原来的单行
-                text_with_newlines = self.text.replace('\\n', '\n')
-                lines_inserted = len(text_with_newlines.split('\n'))
-                if self.original_line_content:
-                    self.file.content[line_idx:line_idx+lines_inserted] = [self.original_line_content]
-                else:
-                    # 如果原始行内容为空，直接删除插入的行
-                    del self.file.content[line_idx:line_idx+lines_inserted]
-            else:
-                # 恢复原始行内容
-                if line_idx < len(self.file.content):
-                    if self.original_line_content:
-                        self.file.content[line_idx] = self.original_line_content
-                    else:
-                        # 如果原始行内容为空，删除该行
-                        self.file.content.pop(line_idx)
-            print("撤销插入操作成功")
-            WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"undo insert {self.line}:{self.col} \"{self.text}\"")
-    
-    def redo(self):
-        """重做插入操作"""
-        if self.file:
-            line_idx = self.line - 1
-            col_idx = self.col - 1
-            
-            if '\\n' in self.text:
-                # 处理多行插入
-                text_with_newlines = self.text.replace('\\n', '\n')
-                lines = text_with_newlines.split('\n')
-                current_line = self.file.content[line_idx]
-                before = current_line[:col_idx]
-                after = current_line[col_idx:]
-                
-                new_lines = []
-                new_lines.append(before + lines[0])
-                for i in range(1, len(lines) - 1):
-                    new_lines.append(lines[i])
-                new_lines.append(lines[-1] + after)
-                
-                self.file.content[line_idx:line_idx+1] = new_lines
-            else:
-                # 简单插入
-                current_line = self.file.content[line_idx]
-                new_line = current_line[:col_idx] + self.text + current_line[col_idx:]
-                self.file.content[line_idx] = new_line
-            
-            print("重做插入操作成功")
-            WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"redo insert {self.line}:{self.col} \"{self.text}\"")
 
 
 class DeleteCommand(EditCommand):
     """删除字符命令 - delete <line:col> <len> """
-    
-    def __init__(self):
-        self.file = None
-        self.line = 0
-        self.col = 0
-        self.length = 0
-        self.deleted_text = ""
-        self.original_line_content = ""
-    
+    USAGE = "delete <line:col> <len>"
+
     def execute(self, command):
         # 解析命令：delete 1:3 5
-        try:
-            parts = command.split()
-            if len(parts) != 3:
-                print("参数错误，应为：delete <line:col> <len>")
-                return False
-            
-            position = parts[1]
-            line_col = position.split(':')
-            self.line = int(line_col[0])
-            self.col = int(line_col[1])
-            self.length = int(parts[2])
-            
-        except (IndexError, ValueError):
-            print("参数错误，应为：delete <line:col> <len>")
+        args = self._parse(command)
+        if args is None:
             return False
-        
+        (line, col), length = args
+
         # 获取当前活动文件
-        if not WorkSpace.WorkSpace.current_workFile_path:
-            print("没有打开的文件")
-            return False
-        
-        self.file = WorkSpace.WorkSpace.current_workFile_list.get(
-            WorkSpace.WorkSpace.current_workFile_path
-        )
-        
-        if not self.file:
-            print("当前文件不存在")
+        file = self._current_file()
+        if not file:
             return False
-        
+
         # 行列号从1开始，转换为索引（从0开始）
-        line_idx = self.line - 1
-        col_idx = self.col - 1
-        
+        line_idx = line - 1
+        col_idx = col - 1
+
         # 检查行号是否越界
-        if line_idx < 0 or line_idx >= len(self.file.content):
+        if line_idx < 0 or line_idx >= len(file.content):
             print("行号越界")
             return False
-        
+
         # 检查列号是否越界
-        current_line = self.file.content[line_idx]
+        current_line = file.content[line_idx]
         if col_idx < 0 or col_idx >= len(current_line):
             print("列号越界")
             return False
-        
+
         # 检查删除长度是否超出行尾
-        if col_idx + self.length > len(current_line):
+        if col_idx + length > len(current_line):
             print("删除长度超出行尾")
             return False
-        
-        # 保存原始行内容和被删除的文本（用于撤销）
-        self.original_line_content = current_line
-        self.deleted_text = current_line[col_idx:col_idx + self.length]
-        
-        # 执行删除
-        new_line = current_line[:col_idx] + current_line[col_idx + self.length:]
-        self.file.content[line_idx] = new_line
-        
-        self.file.state = "modified"
+
+        # 只记录被删除的文本（用于撤销）
+        record = DeltaRecord(file, "delete", TextDelta(line_idx, col_idx, current_line[col_idx:col_idx + length], ""))
+        record.apply()
+
+        file.state = "modified"
         print("删除成功")
-        WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"delete {self.line}:{self.col} {self.length}")
-        self.file.add_to_history(self)
+        WorkSpace.WorkSpace.logger.log_command(file.filePath, f"delete {line}:{col} {length}")
+        file.add_to_history(record)
         return True
-    
-    def undo(self):
-        """撤销删除操作 - 恢复原始行内容"""
-        if self.file:
-            line_idx = self.line - 1
-            if line_idx < len(self.file.content):
-                self.file.content[line_idx] = self.original_line_content
-            print("撤销删除操作成功")
-            WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"undo delete {self.line}:{self.col} {self.length}")
-    
-    def redo(self):
-        """重做删除操作"""
-        if self.file:
-            line_idx = self.line - 1
-            col_idx = self.col - 1
-            current_line = self.file.content[line_idx]
-            new_line = current_line[:col_idx] + current_line[col_idx + self.length:]
-            self.file.content[line_idx] = new_line
-            print("重做删除操作成功")
-            WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"redo delete {self.line}:{self.col} {self.length}")
 
 
 class ReplaceCommand(EditCommand):
     """替换字符命令 - replace <line:col> <len> "text" """
-    
-    def __init__(self):
-        self.file = None
-        self.line = 0
-        self.col = 0
-        self.length = 0
-        self.text = ""
-        self.original_line_content = ""
-    
+    USAGE = 'replace <line:col> <len> "text"'
+
     def execute(self, command):
         # 解析命令：replace 1:3 5 "text"
-        try:
-            parts = command.split('"')
-            if len(parts) < 2:
-                print("参数错误，应为：replace <line:col> <len> \"text\"")
-                return False
-            
-            self.text = parts[1]
-            cmd_parts = parts[0].strip().split()
-            if len(cmd_parts) != 3:
-                print("参数错误，应为：replace <line:col> <len> \"text\"")
-                return False
-            
-            position = cmd_parts[1]
-            line_col = position.split(':')
-            self.line = int(line_col[0])
-            self.col = int(line_col[1])
-            self.length = int(cmd_parts[2])
-            
-        except (IndexError, ValueError):
-            print("参数错误，应为：replace <line:col> <len> \"text\"")
+        args = self._parse(command)
+        if args is None:
             return False
-        
+        (line, col), length, text = args
+
         # 获取当前活动文件
-        if not WorkSpace.WorkSpace.current_workFile_path:
-            print("没有打开的文件")
-            return False
-        
-        self.file = WorkSpace.WorkSpace.current_workFile_list.get(
-            WorkSpace.WorkSpace.current_workFile_path
-        )
-        
-        if not self.file:
-            print("当前文件不存在")
+        file = self._current_file()
+        if not file:
             return False
-        
+
         # 行列号从1开始，转换为索引（从0开始）
-        line_idx = self.line - 1
-        col_idx = self.col - 1
-        
+        line_idx = line - 1
+        col_idx = col - 1
+
         # 检查行号是否越界
-        if line_idx < 0 or line_idx >= len(self.file.content):
+        if line_idx < 0 or line_idx >= len(file.content):
             print("行号越界")
             return False
-        
+
         # 检查列号是否越界
-        current_line = self.file.content[line_idx]
+        current_line = file.content[line_idx]
         if col_idx < 0 or col_idx >= len(current_line):
             print("列号越界")
             return False
-        
+
         # 检查替换长度是否超出行尾
-        if col_idx + self.length > len(current_line):
+        if col_idx + length > len(current_line):
             print("替换长度超出行尾")
             return False
-        
-        # 保存原始行内容（用于撤销）
-        self.original_line_content = current_line
-        
-        # 执行替换：删除指定长度，然后插入新文本
-        new_line = current_line[:col_idx] + self.text + current_line[col_idx + self.length:]
-        self.file.content[line_idx] = new_line
-        
-        self.file.state = "modified"
+
+        # 执行替换：删除指定长度，然后插入新文本；只记录被替换的文本（用于撤销）
+        record = DeltaRecord(file, "replace", TextDelta(line_idx, col_idx, current_line[col_idx:col_idx + length], text))
+        record.apply()
+
+        file.state = "modified"
         print("替换成功")
-        self.file.add_to_history(self)
-        WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"replace {self.line}:{self.col} {self.length} \"{self.text}\"")
+        file.add_to_history(record)
+        WorkSpace.WorkSpace.logger.log_command(file.filePath, f"replace {line}:{col} {length} {CommandParser.quote(text)}")
+        return True
+
+
+class AppendFileCommand(EditCommand):
+    """追加文件命令 - append-file <path>，把外部文件的全部行作为一次编辑追加到末尾"""
+    USAGE = "append-file <path>"
+
+    def execute(self, command):
+        args = self._parse(command)
+        if args is None:
+            return False
+        path, = args
+
+        file = self._current_file()
+        if not file:
+            return False
+
+        try:
+            lines = read_block(path)
+        except (OSError, UnicodeDecodeError):
+            print("无法读取文件")
+            return False
+
+        # 无论多少行，都只做一次切片操作、产生一条撤销记录和一条日志
+        record = BlockRecord(file, "append-file", len(file.content), lines)
+        record.apply()
+        file.state = "modified"
+        print(f"追加成功: {len(lines)} 行")
+        WorkSpace.WorkSpace.logger.log_command(file.filePath, f"append-file {CommandParser.quote(path)}")
+        file.add_to_history(record)
+        return True
+
+
+class InsertBlockCommand(EditCommand):
+    """插入文本块命令 - insert-block <line> <path>，把外部文件的全部行插入到第 line 行之前"""
+    USAGE = "insert-block <line> <path>"
+
+    def execute(self, command):
+        args = self._parse(command)
+        if args is None:
+            return False
+        line, path = args
+
+        file = self._current_file()
+        if not file:
+            return False
+
+        # 行号可以是最后一行的下一行，表示插入到末尾
+        if line < 1 or line > len(file.content) + 1:
+            print("行号越界")
+            return False
+
+        try:
+            lines = read_block(path)
+        except (OSError, UnicodeDecodeError):
+            print("无法读取文件")
+            return False
+
+        record = BlockRecord(file, "insert-block", line - 1, lines)
+        record.apply()
+        file.state = "modified"
+        print(f"插入成功: {len(lines)} 行")
+        WorkSpace.WorkSpace.logger.log_command(file.filePath, f"insert-block {line} {CommandParser.quote(path)}")
+        file.add_to_history(record)
         return True
-    
-    def undo(self):
-        """撤销替换操作 - 恢复原始行内容"""
-        if self.file:
-            line_idx = self.line - 1
-            if line_idx < len(self.file.content):
-                self.file.content[line_idx] = self.original_line_content
-            print("撤销替换操作成功")
-            WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"undo replace {self.line}:{self.col} {self.length} \"{self.text}\"")
-    
-    def redo(self):
-        """重做替换操作"""
-        if self.file:
-            line_idx = self.line - 1
-            col_idx = self.col - 1
-            current_line = self.file.content[line_idx]
-            new_line = current_line[:col_idx] + self.text + current_line[col_idx + self.length:]
-            self.file.content[line_idx] = new_line
-            print("重做替换操作成功")
-            WorkSpace.WorkSpace.logger.log_command(self.file.filePath, f"redo replace {self.line}:{self.col} {self.length} \"{self.text}\"")
 
 
 class ShowCommand(EditCommand):
     """显示文本内容命令 - show [startLine:endLine] """
+    USAGE = "show [startLine:endLine]"
     
     def execute(self, command):
         # 获取当前活动文件
@@ -453,29 +633,23 @@ class ShowCommand(EditCommand):
             return False
         
         # 解析命令：show 或 show 1:5
-        parts = command.split()
-        
-        if len(parts) == 1:
+        args = self._parse(command)
+        if args is None:
+            return False
+        line_range, = args
+
+        if line_range is None:
             # 显示全文
             start_line = 1
             end_line = len(file.content)
-        elif len(parts) == 2:
-            # 显示指定范围
-            try:
-                range_parts = parts[1].split(':')
-                start_line = int(range_parts[0])
-                end_line = int(range_parts[1])
-            except (IndexError, ValueError):
-                print("参数错误，应为：show [startLine:endLine]")
-                return False
         else:
-            print("参数错误，应为：show [startLine:endLine]")
-            return False
+            # 显示指定范围
+            start_line, end_line = line_range
         
         # 处理空文件
         if not file.content:
             print("(空文件)")
-            return False
+            return True
         
         # 检查范围
         if start_line < 1 or end_line < start_line:
@@ -492,9 +666,59 @@ class ShowCommand(EditCommand):
             print(f"{i + 1}: {file.content[i]}")
         
         WorkSpace.WorkSpace.logger.log_command(file, f"show {start_line}:{end_line}")
-        return False  # show命令不进入历史栈
+        # show命令不进入历史栈（是否入栈由 can_undo 决定，返回值只表示是否成功）
+        return True
     
     def can_undo(self):
         """show命令不能撤销"""
         return False
 
+
+class FindCommand(EditCommand):
+    """查找命令 - find <pattern>，输出第一处匹配的 行:列"""
+    USAGE = "find <pattern>"
+    # 为 True 时输出全部匹配
+    FIND_ALL = False
+
+    def execute(self, command):
+        args = self._parse(command)
+        if args is None:
+            return False
+        pattern, = args
+
+        file = self._current_file()
+        if not file:
+            return False
+
+        try:
+            regex = re.compile(pattern)
+        except re.error as e:
+            print(f"正则表达式错误: {e}")
+            return False
+
+        # 由片段表的三元组索引筛选候选行，只在这些行上匹配
+        hits = file.content.search(regex)
+        if not self.FIND_ALL:
+            hits = itertools.islice(hits, 1)
+        count = 0
+        for index, match in hits:
+            count += 1
+            print(f"{index + 1}:{match.start() + 1}: {match.string}")
+        if count == 0:
+            print("未找到匹配")
+        elif self.FIND_ALL:
+            print(f"共 {count} 处匹配")
+
+        operator = "find-all" if self.FIND_ALL else "find"
+        WorkSpace.WorkSpace.logger.log_command(file.filePath, f"{operator} {CommandParser.quote(pattern)}")
+        # 查找不修改内容，不进入历史栈；没有匹配也是成功的查找
+        return True
+
+    def can_undo(self):
+        return False
+
+
+class FindAllCommand(FindCommand):
+    """查找全部命令 - find-all <pattern>，输出每一处匹配的 行:列"""
+    USAGE = "find-all <pattern>"
+    FIND_ALL = True
@@ -1,35 +1,206 @@
 
+import itertools
+import functools
+from collections import deque
+import TextBuffer
+
+# 每个文件撤销历史的内存预算（字节），超出后丢弃最早的撤销记录
+UNDO_MEMORY_BUDGET = 16 * 1024 * 1024
+
 class FileList():
     all_files_path = set()
     all_files = {}
 
 class TextFile():
-    def __init__(self, filePath,content=None,withLog=False):
+    def __init__(self, filePath,content=None,withLog=False,loader=None):
         self.fileName = filePath.split("/")[-1]
         self.filePath = filePath
-        self.content = content or []
+        # loader 不为空时内容延迟到第一次访问 content 才加载
+        self._loader = loader
+        self._content = TextBuffer.PieceTable() if loader else _as_buffer(content or [])
+        # 恢复工作区时内容对应的内容块哈希，内容未加载时保存快照直接引用它
+        self.blob_hash = None
+        # 最近一次快照取得的内容：(内容对象, 版本, 内容块哈希, 行列表)，
+        # 内容未变时下一次快照直接复用，不再复制；哈希由快照写入线程在保存内容块后填入
+        self.snapshot = None
+        # 上次读取或保存时磁盘文件的 (大小, 修改时间)，用于判断能否只改写文件尾部
+        self.disk_stamp = None
         self.state = "normal"
         if withLog:
             self.content.append("# log")
 
         # 命令历史栈（用于undo/redo）
-        self.command_history = []  # 已执行的命令
+        self.command_history = deque()  # 已执行的命令
         self.redo_stack = []  # 已撤销的命令（用于redo）
+        # 撤销历史占用的内存（字节，估算值）
+        self.history_bytes = 0
+        # 进行中的批量编辑收集到的记录；None 表示没有批量编辑
+        self._transaction = None
+        # 恢复工作区时保存在磁盘上的撤销历史，第一次撤销/重做时才读取
+        self._history_loader = None
+        # 最近一次压入撤销历史的记录，之后紧接着的 append 与它合并；撤销/重做后不再合并
+        self._last_pushed = None
     
+    @property
+    def content(self):
+        if self._loader is not None:
+            loader = self._loader
+            self._loader = None
+            try:
+                self._content = _as_buffer(loader())
+            except (OSError, UnicodeDecodeError) as e:
+                # 恢复后文件被删除或无法读取：与 load 相同只提示，不中断编辑器
+                print(f"[Warning] 读取文件失败，已使用空内容: {e}")
+                self._content = _as_buffer([])
+                # 内容与磁盘不再对应，保存时整体重写
+                self.disk_stamp = None
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._loader = None
+        self._content = _as_buffer(value)
+        # 整体替换后内容与磁盘的对应关系未知，下次保存时整体重写
+        self.disk_stamp = None
+
+    def release(self):
+        """
+        关闭文件时调用：mmap 打开的内容自读取或保存以来未修改时关闭映射，下次使用时重新读取；
+        有未保存修改的内容仍引用映射，保持打开
+        """
+        if self._loader is None and TextBuffer.is_disk_backed(self._content):
+            self._content.original.close()
+            self._loader = functools.partial(TextBuffer.read_lines, self.filePath)
+            self._content = TextBuffer.PieceTable()
+            # 内容改为与磁盘文件对应，不再引用恢复时的内容块
+            self.blob_hash = None
+            self.snapshot = None
+
+    def is_loaded(self):
+        """内容是否已经加载到内存"""
+        return self._loader is None
+
+    def offset_of(self, line, col):
+        """行列号（从1开始）转换为全文字符偏移（从0开始，行间换行符计一个字符）"""
+        return self.content.offset_of(line - 1, col - 1)
+
+    def position_of(self, offset):
+        """全文字符偏移转换为行列号（从1开始）"""
+        line_idx, col_idx = self.content.position_of(offset)
+        return line_idx + 1, col_idx + 1
+
     def add_to_history(self, command):
         """添加命令到历史记录"""
         if command.can_undo():
-            self.command_history.append(command)
             # 执行新命令后，清空redo栈
             self.redo_stack.clear()
+            if self._transaction is not None:
+                self._transaction.append(command)
+                return
+            self._push_history(command)
+
+    def _push_history(self, command):
+        history = self.command_history
+        if history and history[-1] is self._last_pushed:
+            # 连续的 append 合并为一条记录，一次撤销整段追加
+            merged = history[-1].merge(command)
+            if merged is not None:
+                self.history_bytes -= history.pop().memory_size()
+                command = merged
+        history.append(command)
+        self.history_bytes += command.memory_size()
+        self._last_pushed = command
+        self._trim_history()
+
+    def _trim_history(self):
+        # 超出内存预算时丢弃最早的记录，至少保留最近一条
+        while self.history_bytes > UNDO_MEMORY_BUDGET and len(self.command_history) > 1:
+            self.history_bytes -= self.command_history.popleft().memory_size()
+
+    def set_history_loader(self, loader):
+        """设置读取持久化撤销历史的函数，返回 (撤销记录, 重做记录) 或 None"""
+        self._history_loader = loader
+
+    def _load_history(self):
+        if self._history_loader is None:
+            return
+        loader = self._history_loader
+        self._history_loader = None
+        history = loader()
+        if not history:
+            return
+        undo, redo = history
+        # 本次会话还没有编辑过时，重做栈才仍然有效
+        fresh = not self.command_history and not self.redo_stack
+        # 磁盘上的记录比本次会话的记录更早
+        self.command_history.extendleft(reversed(undo))
+        self.history_bytes += sum(record.memory_size() for record in undo)
+        self._trim_history()
+        if fresh:
+            self.redo_stack = list(redo)
+
+    def history_values(self, limit):
+        """
+        撤销/重做历史中各自最近 limit 条记录的可序列化形式 (撤销列表, 重做列表)，用于持久化；
+        磁盘上的历史尚未读取且本次会话没有新记录时返回 None，表示磁盘上的日志仍然有效
+        """
+        if self._history_loader is not None:
+            if not self.command_history and not self.redo_stack:
+                return None
+            self._load_history()
+        # 先截取再转换，只转换要写入的记录
+        undo = itertools.islice(self.command_history, max(0, len(self.command_history) - limit), None)
+        return ([record.to_value() for record in undo],
+                [record.to_value() for record in self.redo_stack[-limit:]])
+
+    def history_key(self):
+        """
+        撤销/重做历史的标识：新增、撤销、重做、丢弃记录后随之改变，用于判断历史是否需要重新保存；
+        返回 (标识, 需要保持存活的对象)，后者保证标识中的 id 不会被新对象复用
+        """
+        content = self.content
+        last_undo = self.command_history[-1] if self.command_history else None
+        last_redo = self.redo_stack[-1] if self.redo_stack else None
+        key = (id(content), content.version, len(self.command_history), len(self.redo_stack),
+               id(last_undo), id(last_redo))
+        return key, (content, last_undo, last_redo)
+
+    def in_transaction(self):
+        """是否有进行中的批量编辑"""
+        return self._transaction is not None
+
+    def begin(self):
+        """开始批量编辑：之后的编辑在 commit 时合并为一条撤销记录"""
+        if self._transaction is not None:
+            print("批量编辑已经开始")
+            return False
+        self._transaction = []
+        return True
+
+    def commit(self):
+        """提交批量编辑，返回其中的编辑条数；没有进行中的批量编辑时返回 None"""
+        if self._transaction is None:
+            print("没有进行中的批量编辑")
+            return None
+        records = self._transaction
+        self._transaction = None
+        if records:
+            self._push_history(records[0].group(records))
+        return len(records)
     
     def undo(self):
         """撤销最后一个命令"""
+        if self._transaction is not None:
+            print("批量编辑尚未提交")
+            return False
+        self._load_history()
         if not self.command_history:
             print("没有可撤销的操作")
             return False
         
         command = self.command_history.pop()
+        self.history_bytes -= command.memory_size()
+        self._last_pushed = None
         command.undo()
         self.redo_stack.append(command)
         
@@ -41,17 +212,29 @@ class TextFile():
     
     def redo(self):
         """重做最后一个撤销的命令"""
+        if self._transaction is not None:
+            print("批量编辑尚未提交")
+            return False
+        self._load_history()
         if not self.redo_stack:
             print("没有可重做的操作")
             return False
         
         command = self.redo_stack.pop()
+        self._last_pushed = None
         command.redo()
         self.command_history.append(command)
+        self.history_bytes += command.memory_size()
         self.state = "modified"
         
         return True
 
+def _as_buffer(content):
+    """文件内容统一存放在片段表中，原始行序列不会被复制"""
+    if isinstance(content, TextBuffer.PieceTable):
+        return content
+    return TextBuffer.PieceTable(content)
+
 class LogFile():
     def __init__(self,content=None):
         self.content = content or []
@@ -1,7 +1,42 @@
 import os
+import re
+import gzip
+import time
+import shutil
+import atexit
+import weakref
 import datetime
+import threading
+from collections import deque
 import File
 import WorkSpace
+import CommandParser
+
+# 每个日志文件的写缓冲达到该大小（字节）时写盘
+LOG_BUFFER_BYTES = 64 * 1024
+# 距上次写盘超过该时间（秒）后，下一条日志写入时一并写盘
+LOG_FLUSH_INTERVAL = 1.0
+# 是否由后台线程写日志（False 时在调用线程中写入缓冲）
+LOG_ASYNC = True
+# 待写日志队列的容量（条）
+LOG_QUEUE_SIZE = 10000
+# 队列满时的策略："block" 等待写线程腾出空间；
+# "drop_oldest" 丢弃队列中最早的一条；"drop" 丢弃新日志。丢弃的条数都会计入统计
+LOG_QUEUE_POLICY = "block"
+# 日志轮转：当前日志超过 LOG_MAX_BYTES 字节时改名为 .name.log.1（更早的依次后移），
+# LOG_ROTATE_PER_SESSION 为 True 时每次会话开始都轮转；只保留 LOG_BACKUP_COUNT 个归档，
+# LOG_COMPRESS 为 True 时归档用 gzip 压缩为 .name.log.N.gz
+LOG_MAX_BYTES = 1024 * 1024
+LOG_ROTATE_PER_SESSION = False
+LOG_BACKUP_COUNT = 5
+LOG_COMPRESS = False
+# log-show 倒序读取与二分查找时每次读取的块大小（字节）
+LOG_READ_CHUNK = 64 * 1024
+# 放入写队列的轮转请求，保证与前后的日志按顺序处理
+_ROTATE = object()
+
+# 所有 Logger 实例，退出时统一写盘并关闭文件
+_loggers = weakref.WeakSet()
 
 class Logger:
     """
@@ -13,6 +48,19 @@ class Logger:
         self._enabled_files = set()
         # 记录本次会话是否已经为某个文件写入过 Session Header，防止重复写入
         self._session_started = set()
+        # 保持打开的日志文件句柄、当前日志文件大小与尚未写盘的日志
+        self._handles = {}
+        self._sizes = {}
+        self._buffers = {}
+        self._buffer_sizes = {}
+        self._last_flush = time.monotonic()
+        # 同一秒内的日志复用格式化好的时间戳
+        self._ts_second = None
+        self._ts_text = ""
+        # 缓冲与文件句柄可能同时被写线程和调用线程访问
+        self._io_lock = threading.RLock()
+        self._writer = _LogWriter(self)
+        _loggers.add(self)
 
     def enable_logging(self, filepath):
         """
@@ -21,6 +69,7 @@ class Logger:
         if filepath not in self._enabled_files:
             self._enabled_files.add(filepath)
             self._write_session_start(filepath)
+            self.flush(filepath)
             print(f"日志已启用: {self._get_log_filename(filepath)}")
 
     def disable_logging(self, filepath):
@@ -29,6 +78,7 @@ class Logger:
         """
         if filepath in self._enabled_files:
             self._enabled_files.remove(filepath)
+            self.close(filepath)
             print(f"日志已关闭: {filepath}")
 
     def is_logging_enabled(self, filepath):
@@ -44,24 +94,114 @@ class Logger:
         if filepath not in self._enabled_files:
             return
 
-        timestamp = datetime.datetime.now().strftime("%Y%m%d %H:%M:%S")
-        log_entry = f"{timestamp} {command_str}\n"
+        log_entry = f"{self._timestamp()} {command_str}\n"
         
-        self._append_to_log_file(filepath, log_entry)
+        self._submit(filepath, log_entry)
+
+    def flush(self, filepath=None):
+        """等待队列写完，再把缓冲中的日志写盘；filepath 为空时写所有文件"""
+        self._writer.drain()
+        with self._io_lock:
+            self._flush_buffers(filepath)
+
+    def close(self, filepath=None):
+        """写盘并关闭日志文件；filepath 为空时关闭所有文件并停止写线程"""
+        if filepath is None:
+            self._writer.stop()
+        self.flush(filepath)
+        with self._io_lock:
+            paths = [filepath] if filepath is not None else list(self._handles)
+            for path in paths:
+                handle = self._handles.pop(path, None)
+                if handle is not None:
+                    try:
+                        handle.close()
+                    except OSError as e:
+                        print(f"[Warning] 写入日志失败: {str(e)}")
+
+    def stats(self):
+        """日志队列统计：当前排队条数、排队条数峰值、丢弃条数"""
+        return self._writer.stats()
+
+    def _submit(self, filepath, content):
+        if LOG_ASYNC:
+            self._writer.put(filepath, content)
+        else:
+            with self._io_lock:
+                self._append_to_log_file(filepath, content)
+
+    def _write_entries(self, entries):
+        """写线程调用：把一批日志写入缓冲；entries 为空表示空闲超时，把缓冲写盘"""
+        with self._io_lock:
+            for filepath, content in entries:
+                self._append_to_log_file(filepath, content)
+            if not entries:
+                self._flush_buffers(None)
+
+    def _has_buffered(self):
+        return bool(self._buffers)
+
+    def _flush_buffers(self, filepath):
+        paths = [filepath] if filepath is not None else list(self._buffers)
+        for path in paths:
+            self._flush_file(path)
+        self._last_flush = time.monotonic()
 
-    def show_log(self, filepath):
+    def iter_log(self, filepath, tail=None, since=None, grep=None):
         """
-        读取并返回日志内容
+        逐行读取当前日志（不含换行符），不把整个文件读入内存
+        :param tail: 只返回最后 tail 行，从文件末尾倒序查找起点
+        :param since: 只返回时间戳不早于 since 的行（可以只写前缀，如 "20250101 10"），二分查找起点
+        :param grep: 只返回匹配该正则表达式的行
         """
+        self.flush(filepath)
         log_file = self._get_log_filename(filepath)
         if not os.path.exists(log_file):
-            return "暂无日志记录。"
-        
-        try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception as e:
-            return f"读取日志失败: {str(e)}"
+            return
+        pattern = re.compile(grep) if grep is not None else None
+        with open(log_file, 'rb') as f:
+            start = _since_offset(f, since) if since is not None else 0
+            if tail is not None and pattern is None:
+                start = max(start, _tail_offset(f, tail))
+            f.seek(start)
+            lines = (raw.rstrip(b"\r\n").decode('utf-8', errors='replace') for raw in f)
+            if pattern is not None:
+                lines = (line for line in lines if pattern.search(line))
+                if tail is not None:
+                    # 过滤后的最后 tail 行只能顺序读取，只保留 tail 行在内存中
+                    lines = deque(lines, maxlen=tail) if tail > 0 else ()
+            yield from lines
+
+    def iter_history(self, filepath, since=None):
+        """
+        按时间顺序逐行读取所有日志分段（归档在前，包括压缩的归档），不含换行符
+        :param since: 只返回时间戳不早于 since 的行；未压缩的分段二分查找起点
+        """
+        self.flush(filepath)
+        for segment in self.log_segments(filepath):
+            if segment.endswith(".gz"):
+                with gzip.open(segment, 'rb') as f:
+                    for raw in f:
+                        if since is None or _line_timestamp(raw) >= since:
+                            yield raw.rstrip(b"\r\n").decode('utf-8', errors='replace')
+            else:
+                with open(segment, 'rb') as f:
+                    if since is not None:
+                        f.seek(_since_offset(f, since))
+                    for raw in f:
+                        yield raw.rstrip(b"\r\n").decode('utf-8', errors='replace')
+
+    def log_segments(self, filepath):
+        """日志的所有分段（归档在前，当前日志在最后），按时间从早到晚排列"""
+        log_file = self._get_log_filename(filepath)
+        segments = []
+        for index in range(LOG_BACKUP_COUNT, 0, -1):
+            segment = _find_segment(log_file, index)
+            if segment is not None:
+                segments.append(segment)
+        if os.path.exists(log_file):
+            segments.append(log_file)
+        return segments
 
     def _get_log_filename(self, filepath):
         """
@@ -80,22 +220,270 @@ class Logger:
         if filepath in self._session_started:
             return
 
-        timestamp = datetime.datetime.now().strftime("%Y%m%d %H:%M:%S")
-        header = f"session start at {timestamp}\n"
-        self._append_to_log_file(filepath, header)
+        header = f"session start at {self._timestamp()}\n"
+        if LOG_ROTATE_PER_SESSION:
+            self._submit(filepath, _ROTATE)
+        self._submit(filepath, header)
         self._session_started.add(filepath)
 
+    def _timestamp(self):
+        now = int(time.time())
+        if now != self._ts_second:
+            self._ts_second = now
+            self._ts_text = datetime.datetime.fromtimestamp(now).strftime("%Y%m%d %H:%M:%S")
+        return self._ts_text
+
     def _append_to_log_file(self, filepath, content):
         """
-        写入文件系统的底层方法，包含错误处理
+        写入缓冲，缓冲达到大小或时间阈值时写盘
         """
-        log_file = self._get_log_filename(filepath)
+        if content is _ROTATE:
+            self._flush_file(filepath)
+            self._rotate(filepath)
+            return
+        self._buffers.setdefault(filepath, []).append(content)
+        size = self._buffer_sizes.get(filepath, 0) + len(content)
+        self._buffer_sizes[filepath] = size
+        if size >= LOG_BUFFER_BYTES:
+            self._flush_file(filepath)
+        elif time.monotonic() - self._last_flush >= LOG_FLUSH_INTERVAL:
+            self._flush_buffers(None)
+
+    def _flush_file(self, filepath):
+        """
+        写文件系统的底层方法，包含错误处理
+        """
+        entries = self._buffers.pop(filepath, None)
+        self._buffer_sizes.pop(filepath, None)
+        if not entries:
+            return
+        data = "".join(entries).encode('utf-8')
         try:
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(content)
+            handle = self._handles.get(filepath)
+            if handle is None:
+                handle = open(self._get_log_filename(filepath), 'ab')
+                self._handles[filepath] = handle
+                self._sizes[filepath] = os.fstat(handle.fileno()).st_size
+            if 0 < self._sizes[filepath] and self._sizes[filepath] + len(data) > LOG_MAX_BYTES:
+                self._rotate(filepath)
+                handle = open(self._get_log_filename(filepath), 'ab')
+                self._handles[filepath] = handle
+            handle.write(data)
+            handle.flush()
+            self._sizes[filepath] += len(data)
         except Exception as e:
             # 需求：若日志记录失败仅提示警告，不中断程序正常运行
             print(f"[Warning] 写入日志失败: {str(e)}")
+            handle = self._handles.pop(filepath, None)
+            if handle is not None:
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+
+    def _rotate(self, filepath):
+        """把当前日志改名为第 1 个归档，已有归档依次后移，超出保留数的删除"""
+        handle = self._handles.pop(filepath, None)
+        if handle is not None:
+            handle.close()
+        self._sizes[filepath] = 0
+        log_file = self._get_log_filename(filepath)
+        try:
+            if not os.path.exists(log_file) or os.path.getsize(log_file) == 0:
+                return
+            for index in range(LOG_BACKUP_COUNT, 0, -1):
+                segment = _find_segment(log_file, index)
+                if segment is None:
+                    continue
+                if index >= LOG_BACKUP_COUNT:
+                    os.remove(segment)
+                else:
+                    suffix = ".gz" if segment.endswith(".gz") else ""
+                    os.replace(segment, f"{log_file}.{index + 1}{suffix}")
+            if LOG_BACKUP_COUNT <= 0:
+                os.remove(log_file)
+            elif LOG_COMPRESS:
+                tmp_path = f"{log_file}.1.gz.tmp"
+                with open(log_file, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(tmp_path, f"{log_file}.1.gz")
+                os.remove(log_file)
+            else:
+                os.replace(log_file, f"{log_file}.1")
+        except OSError as e:
+            print(f"[Warning] 日志轮转失败: {str(e)}")
+
+
+def _find_segment(log_file, index):
+    """第 index 个归档的路径（可能已压缩），不存在时返回 None"""
+    for suffix in ("", ".gz"):
+        path = f"{log_file}.{index}{suffix}"
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _tail_offset(f, count):
+    """从文件末尾倒序按块读取，返回最后 count 行的起始偏移"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    if count <= 0:
+        return end
+    # 文件末尾的换行符不算作一行
+    position = end
+    if position > 0:
+        f.seek(position - 1)
+        if f.read(1) == b"\n":
+            position -= 1
+    remaining = count
+    while position > 0:
+        size = min(LOG_READ_CHUNK, position)
+        position -= size
+        f.seek(position)
+        chunk = f.read(size)
+        index = len(chunk)
+        while True:
+            index = chunk.rfind(b"\n", 0, index)
+            if index < 0:
+                break
+            remaining -= 1
+            if remaining == 0:
+                return position + index + 1
+    return 0
+
+
+def _line_timestamp(line):
+    """日志行的时间戳："YYYYMMDD HH:MM:SS 命令" 或 "session start at YYYYMMDD HH:MM:SS" """
+    if line.startswith(b"session start at "):
+        line = line[len(b"session start at "):]
+    return line[:17].decode('ascii', errors='replace')
+
+
+def _since_offset(f, since):
+    """
+    二分查找第一条时间戳不早于 since 的行的起始偏移
+    日志按时间顺序追加，时间戳格式固定，可以按字符串比较
+    """
+    f.seek(0, os.SEEK_END)
+    low, high = 0, f.tell()
+    # 不变量：low 是行首且之前的行都早于 since；high 之后的行首都不早于 since
+    while low < high:
+        middle = (low + high) // 2
+        if middle > low:
+            # 跳到 middle 处或之后的第一个行首
+            f.seek(middle - 1)
+            f.readline()
+        else:
+            f.seek(middle)
+        line_start = f.tell()
+        if line_start >= high:
+            high = middle
+            continue
+        line = f.readline()
+        if _line_timestamp(line) < since:
+            low = f.tell()
+        else:
+            high = line_start
+    return low
+
+
+class _LogWriter:
+    """
+    后台日志写入线程
+    log_command 只把日志放入有界队列，由写线程批量取出写入缓冲；
+    空闲超过 LOG_FLUSH_INTERVAL 秒时把缓冲写盘
+    """
+    def __init__(self, logger):
+        self._logger = logger
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._busy = False
+        self._stopping = False
+        self._thread = None
+        self._max_depth = 0
+        self._dropped = 0
+
+    def put(self, filepath, content):
+        with self._cond:
+            self._stopping = False
+            self._ensure_thread()
+            if len(self._queue) >= LOG_QUEUE_SIZE:
+                if LOG_QUEUE_POLICY == "drop_oldest":
+                    self._queue.popleft()
+                    self._dropped += 1
+                elif LOG_QUEUE_POLICY == "drop":
+                    self._dropped += 1
+                    return
+                else:
+                    while len(self._queue) >= LOG_QUEUE_SIZE:
+                        self._cond.wait()
+            self._queue.append((filepath, content))
+            self._max_depth = max(self._max_depth, len(self._queue))
+            self._cond.notify_all()
+
+    def drain(self):
+        """等待队列中的日志全部交给 Logger"""
+        with self._cond:
+            if self._queue:
+                self._ensure_thread()
+            while self._queue or self._busy:
+                self._cond.wait()
+
+    def stop(self):
+        """写完队列后结束写线程；之后再有日志时会重新启动"""
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join()
+
+    def stats(self):
+        with self._cond:
+            return {"queued": len(self._queue), "max_queued": self._max_depth, "dropped": self._dropped}
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    if self._stopping:
+                        self._thread = None
+                        self._cond.notify_all()
+                        return
+                    if self._logger._has_buffered():
+                        # 空闲超时后把缓冲写盘
+                        if not self._cond.wait(LOG_FLUSH_INTERVAL):
+                            break
+                    else:
+                        self._cond.wait()
+                entries = list(self._queue)
+                self._queue.clear()
+                self._busy = True
+                # 唤醒因队列满而等待的调用方
+                self._cond.notify_all()
+            try:
+                self._logger._write_entries(entries)
+            except Exception as e:
+                print(f"[Warning] 写入日志失败: {str(e)}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+def close_all():
+    """退出时写完所有 Logger 的队列与缓冲并关闭文件"""
+    for logger in list(_loggers):
+        logger.close()
+
+
+atexit.register(close_all)
 
 class LogOnCommand:
     """
@@ -103,22 +491,27 @@ class LogOnCommand:
     功能: 启用日志
     """
     def execute(self, command):
-        parts = command.split(' ')
-        if len(parts) < 2:
+        args = WorkSpace.parse_args(command, "log-on [file]")
+        if args is None:
+            return False
+        target_file, = args
+        if target_file is None:
             # 默认对当前活动文件生效
             if not WorkSpace.WorkSpace.current_workFile_path:
                 print("没有打开的文件")
+                return False
             else:
                 target_file = WorkSpace.WorkSpace.current_workFile_path
                 if not target_file:
                     print("当前文件不存在")
+                    return False
                 else:
                     WorkSpace.WorkSpace.logger.enable_logging(target_file)
         else:
             # 对指定文件生效
-            target_file = parts[1]
             if(target_file not in File.FileList.all_files_path):
                 print("当前文件不存在")
+                return False
             else:
                 WorkSpace.WorkSpace.logger.enable_logging(target_file)
 
@@ -128,54 +521,96 @@ class LogOffCommand:
     功能: 关闭日志
     """
     def execute(self, command):
-        parts = command.split(' ')
-        if len(parts) < 2:
+        args = WorkSpace.parse_args(command, "log-off [file]")
+        if args is None:
+            return False
+        target_file, = args
+        if target_file is None:
             # 默认对当前活动文件生效
             if not WorkSpace.WorkSpace.current_workFile_path:
                 print("没有打开的文件")
+                return False
             else:
                 # 获取当前文件路径
                 target_path = WorkSpace.WorkSpace.current_workFile_path
                 # 检查文件是否在当前工作区列表中
                 if target_path not in WorkSpace.WorkSpace.current_workFile_list:
                     print("当前文件不存在")
+                    return False
                 else:
                     WorkSpace.WorkSpace.logger.disable_logging(target_path)
         else:
             # 对指定文件生效
-            target_file = parts[1]
             if(target_file not in File.FileList.all_files_path):
                 print("当前文件不存在")
+                return False
             else:
                 WorkSpace.WorkSpace.logger.disable_logging(target_file)
             
 class LogShowCommand:
     """
-    命令: log-show [file]
-    功能: 显示日志内容
+    命令: log-show [file] [--tail N] [--since <time>] [--grep <pattern>]
+    功能: 显示日志内容；逐行输出，不把整个日志读入内存
     """
+    USAGE = "log-show [file] [--tail N] [--since <time>] [--grep <pattern>]"
+
     def execute(self, command):
-        parts = command.split(' ')
-        if len(parts) < 2:
+        args = WorkSpace.parse_args(command, self.USAGE)
+        if args is None:
+            return False
+        target_file, tail, since, grep = args
+        if tail is not None and tail < 0:
+            print(CommandParser.signature(self.USAGE).message)
+            return False
+        options = {"tail": tail, "since": since, "grep": grep}
+
+        if target_file is None:
             # 默认对当前活动文件生效
             if not WorkSpace.WorkSpace.current_workFile_path:
                 print("没有打开的文件")
-            else:
-                target_path = WorkSpace.WorkSpace.current_workFile_path
-                if target_path not in WorkSpace.WorkSpace.current_workFile_list:
-                    print("当前文件不存在")
-                else:
-                    content = WorkSpace.WorkSpace.logger.show_log(target_path)
-                    print(f"--- Log for {target_path} ---")
-                    print(content)
-                    print("-----------------------------")
-        else:
-            # 对指定文件生效
-            target_file = parts[1]
-            if(target_file not in File.FileList.all_files_path):
+                return False
+            target_file = WorkSpace.WorkSpace.current_workFile_path
+            if target_file not in WorkSpace.WorkSpace.current_workFile_list:
                 print("当前文件不存在")
-            else:
-                content = WorkSpace.WorkSpace.logger.show_log(target_file)
-                print(f"--- Log for {target_file} ---")
-                print(content)
-                print("-----------------------------")
+                return False
+        elif target_file not in File.FileList.all_files_path:
+            # 对指定文件生效
+            print("当前文件不存在")
+            return False
+        return self._print_log(target_file, options)
+
+    def _print_log(self, target_file, options):
+        """逐行输出日志，读取失败时返回 False"""
+        logger = WorkSpace.WorkSpace.logger
+        ok = True
+        print(f"--- Log for {target_file} ---")
+        try:
+            found = False
+            for line in logger.iter_log(target_file, **options):
+                found = True
+                print(line)
+            if not found and not os.path.exists(logger._get_log_filename(target_file)):
+                print("暂无日志记录。")
+        except re.error as e:
+            print(f"正则表达式错误: {str(e)}")
+            ok = False
+        except OSError as e:
+            print(f"读取日志失败: {str(e)}")
+            ok = False
+        archived = len(logger.log_segments(target_file)) - 1
+        if archived > 0:
+            print(f"（更早的日志已轮转到 {archived} 个归档文件）")
+        print("-----------------------------")
+        if not ok:
+            return False
+
+class LogStatsCommand:
+    """
+    命令: log-stats
+    功能: 显示日志队列统计
+    """
+    def execute(self, command):
+        if WorkSpace.parse_args(command, "log-stats") is None:
+            return False
+        stats = WorkSpace.WorkSpace.logger.stats()
+        print(f"日志队列: 当前 {stats['queued']} 条，峰值 {stats['max_queued']} 条，已丢弃 {stats['dropped']} 条")
@@ -1,8 +1,57 @@
 import json
+import os
+import time
+import zlib
+import atexit
+import struct
+import hashlib
+import threading
 from datetime import datetime
+from collections import deque
 from File import FileList
+import TextBuffer
+import CommonUtils
+import CommandParser
+
+# 工作区快照日志：每行一条 JSON 记录，只追加、不重写历史
+MEMENTO_FILE = "memento.txt"
+# 文件内容按哈希存放的目录，快照中只记录哈希
+BLOB_DIR = ".memento_blobs"
+# 快照编码格式："json"（memento.txt，每行一条）、"binary"、"binary-zlib"
+#（后两种写入同名 .bin 文件，长度前缀记录；首次写入时自动迁移已有的 JSON 快照）
+SERIALIZER = "json"
+# 是否由后台线程写入快照（False 时 update 同步写盘）
+ASYNC_WRITE = True
+# 后台线程合并快照的最长等待时间（秒）
+FLUSH_INTERVAL = 1.0
+# 快照保留策略：保留最近 RETENTION_KEEP_LAST 条；
+# RETENTION_BUCKET 为 "hourly"/"daily" 时，每小时/每天额外保留最后一条
+RETENTION_KEEP_LAST = 20
+RETENTION_BUCKET = None
+# 启动时 memento.txt 超过该大小才自动压缩，避免每次启动都完整扫描
+AUTO_COMPACT_BYTES = 1024 * 1024
+# 时间段名称 -> 时间戳前缀长度（时间戳格式 %Y-%m-%d %H:%M:%S）
+_BUCKET_PREFIX = {"hourly": 13, "daily": 10}
+# 从文件末尾向前查找记录时每次读取的块大小
+_TAIL_CHUNK_SIZE = 64 * 1024
+# 本进程中已确认为日志格式的文件（避免每次 update 都检查旧格式）
+_journal_checked = set()
+# 本进程中已确认存在的内容块
+_known_blobs = set()
+# 是否同时把每个文件的撤销/重做历史保存到磁盘，重启后仍可撤销（默认关闭）
+PERSIST_UNDO = False
+# 撤销日志目录：每个文件一个二进制日志，头部记录对应内容的哈希
+UNDO_DIR = ".memento_undo"
+# 每个文件的撤销日志最多保存的记录条数，更早的记录被截掉
+UNDO_LOG_LIMIT = 200
+_UNDO_MAGIC = b"MUNDO1\n"
+# 文件路径 -> 最近写入撤销日志时的 TextFile.history_key()，由写入线程在写入后更新，
+# 历史未变化时快照不再转换、写入撤销历史
+_history_logged = {}
+
 
 def update(current_workFile_path, current_workFile_list):
+    # 在调用线程中只做一次浅拷贝，哈希与写盘交给后台线程
     new_state = {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "current_workFile_path": current_workFile_path,
@@ -13,46 +62,633 @@ def update(current_workFile_path, current_workFile_list):
         },
 
         # 保存所有文件
-        "all_files": [
-            {
-                "fileName": f.fileName,
-                "filePath": f.filePath,
-                "content": f.content,
-                "state": f.state
-            }
-            for f in FileList.all_files.values()
-        ]
+        "all_files": [_capture_file(f) for f in FileList.all_files.values()]
     }
 
-    # 读取原来的状态历史（list）
-    try:
-        with open("memento.txt", "r", encoding="utf-8") as f:
-            all_states = json.load(f)
-    except FileNotFoundError:
-        all_states = []
+    if ASYNC_WRITE:
+        _writer.submit(new_state)
+    else:
+        _write_snapshot(new_state)
 
-    # 添加新的快照
-    all_states.append(new_state)
+    print("工作区状态已保存")
 
-    # 写回文件
-    with open("memento.txt", "w", encoding="utf-8") as f:
-        json.dump(all_states, f, ensure_ascii=False, indent=2)
 
-    print("工作区状态已保存")
+def _capture_file(f):
+    entry = {"fileName": f.fileName, "filePath": f.filePath, "state": f.state}
+    if (f.is_loaded() and TextBuffer.is_disk_backed(f.content) and f.disk_stamp is not None
+            and CommonUtils.disk_stamp(f.filePath) == f.disk_stamp):
+        # mmap 内容自读取或保存以来未修改、磁盘文件也未被改动，不复制内容
+        entry["onDisk"] = True
+    elif f.is_loaded():
+        _capture_content(f, entry)
+    elif f.blob_hash:
+        # 内容尚未加载，说明与恢复时相同，直接引用原来的内容块
+        entry["hash"] = f.blob_hash
+    else:
+        # 恢复时就来自磁盘文件且尚未加载
+        entry["onDisk"] = True
+    if PERSIST_UNDO and f.is_loaded() and not entry.get("onDisk"):
+        key = f.history_key()
+        logged = _history_logged.get(f.filePath)
+        # 历史自上次写入撤销日志以来没有变化时不再转换
+        if logged is None or logged[0] != key[0]:
+            history = f.history_values(UNDO_LOG_LIMIT)
+            if history is not None:
+                entry["history"] = history
+                entry["_history_key"] = key
+    return entry
+
+
+def _capture_content(f, entry):
+    """取得已加载文件的内容：自上次快照以来未修改时复用上次的结果，只有修改过的文件才复制"""
+    content = f.content
+    snapshot = f.snapshot
+    if snapshot is None or snapshot[0] is not content or snapshot[1] != content.version:
+        snapshot = f.snapshot = (content, content.version, None, list(content))
+    if snapshot[2]:
+        entry["hash"] = snapshot[2]
+    else:
+        # 同一份行列表可能被多个尚未写入的快照共用，写入线程只读取它
+        entry["content"] = snapshot[3]
+        entry["_snapshot"] = (f, snapshot)
+
+
+def _remember_blob(entry):
+    """内容块保存后把哈希记到文件上；期间文件又被修改时快照已不是同一个，不更新"""
+    f, snapshot = entry.pop("_snapshot")
+    if f.snapshot is snapshot:
+        f.snapshot = snapshot[:2] + (entry["hash"], None)
+
+
+def flush():
+    """等待所有待写快照落盘（exit 时调用）"""
+    _writer.flush()
+
+
+def _write_snapshot(state):
+    for f in state["all_files"]:
+        if "content" in f:
+            f["hash"] = _store_blob(f.pop("content"))
+            _remember_blob(f)
+        if "history" in f:
+            _write_undo_log(f["filePath"], f["hash"], f.pop("history"))
+            _history_logged[f["filePath"]] = f.pop("_history_key")
+
+    serializer = _serializer()
+    _ensure_journal(serializer)
+
+    with open(serializer.path(), "ab") as f:
+        f.write(serializer.encode(state))
+
+
+class _SnapshotWriter:
+    """
+    后台快照写入线程
+    只保留最新一份待写快照：连续多次 update 合并为一次写入，
+    在距第一次未写入的 update 超过 FLUSH_INTERVAL 秒或调用 flush 时落盘
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = None
+        self._pending_since = 0.0
+        self._flush_requested = False
+        self._writing = False
+        self._thread = None
+
+    def submit(self, state):
+        with self._cond:
+            if self._pending is None:
+                self._pending_since = time.monotonic()
+            self._pending = state
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def flush(self):
+        with self._cond:
+            if self._pending is None and not self._writing:
+                return
+            self._flush_requested = True
+            self._ensure_thread()
+            self._cond.notify_all()
+            while self._pending is not None or self._writing:
+                self._cond.wait()
+            self._flush_requested = False
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="memento-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                while not self._flush_requested:
+                    remaining = self._pending_since + FLUSH_INTERVAL - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                state = self._pending
+                self._pending = None
+                self._writing = True
+            try:
+                _write_snapshot(state)
+            except Exception as e:
+                print(f"[Warning] 保存工作区状态失败: {str(e)}")
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+
+_writer = _SnapshotWriter()
+# 程序意外退出（未执行 exit 命令）时也尽量把最后的快照写完
+atexit.register(flush)
 
 
 def recover():
-    try:
-        with open("memento.txt", "r", encoding="utf-8") as f:
-            all_states = json.load(f)
-    except FileNotFoundError:
+    flush()
+    serializer = _serializer()
+    if not os.path.exists(serializer.path()):
+        # 切换到二进制格式后首次启动，仍从原来的 JSON 快照恢复
+        serializer = _SERIALIZERS["json"]
+    if not os.path.exists(serializer.path()):
         print("没有可恢复的工作区状态")
         return
 
-    if not all_states:
+    last_state = serializer.read_last()
+
+    if not last_state:
         print("没有可恢复的工作区状态")
         return
 
-    last_state = all_states[-1]
-
+    # 快照中只有内容哈希，由调用方通过 load_blob 按需读取内容
     return last_state
+
+
+def load_blob(blob_hash):
+    """按哈希读取文件内容（行列表）"""
+    if not blob_hash:
+        return []
+    try:
+        with open(_blob_path(blob_hash), "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+    except FileNotFoundError:
+        print(f"[Warning] 缺少文件内容块: {blob_hash}")
+        return []
+    return text.split("\n")[:-1]
+
+
+def _store_blob(content):
+    """写入内容块并返回哈希；相同内容只写一次"""
+    data = "".join(line + "\n" for line in content).encode("utf-8")
+    blob_hash = hashlib.sha256(data).hexdigest()
+    path = _blob_path(blob_hash)
+    if path in _known_blobs:
+        return blob_hash
+    if not os.path.exists(path):
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        # 先写临时文件再改名，避免中断后留下残缺的内容块
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    _known_blobs.add(path)
+    return blob_hash
+
+
+def _blob_path(blob_hash):
+    return os.path.join(BLOB_DIR, blob_hash)
+
+
+def load_undo_log(filePath, content_hash):
+    """
+    读取文件的撤销日志，返回 (撤销记录, 重做记录) 的编码值列表；
+    日志不存在、已损坏或不是针对该内容保存的时返回 None
+    """
+    try:
+        with open(_undo_log_path(filePath), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if not data.startswith(_UNDO_MAGIC):
+        return None
+    try:
+        value, _ = _decode_value(data, len(_UNDO_MAGIC))
+    except (struct.error, ValueError, IndexError, UnicodeDecodeError):
+        return None
+    if not isinstance(value, dict) or value.get("hash") != content_hash:
+        return None
+    return value.get("undo", []), value.get("redo", [])
+
+
+def _write_undo_log(filePath, content_hash, history):
+    undo, redo = history
+    path = _undo_log_path(filePath)
+    data = _UNDO_MAGIC + _encode_value({
+        "hash": content_hash,
+        "undo": undo,
+        "redo": redo,
+    })
+    os.makedirs(UNDO_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _undo_log_path(filePath):
+    name = hashlib.sha256(filePath.encode("utf-8")).hexdigest()
+    return os.path.join(UNDO_DIR, name + ".bin")
+
+
+def compact(keep_last=None, bucket=None):
+    """
+    按保留策略原地压缩快照日志，并删除不再被引用的内容块
+    返回 (压缩前记录数, 压缩后记录数)
+    """
+    keep_last = RETENTION_KEEP_LAST if keep_last is None else keep_last
+    bucket = RETENTION_BUCKET if bucket is None else bucket
+    if bucket is not None and bucket not in _BUCKET_PREFIX:
+        raise ValueError(f"不支持的时间段: {bucket}")
+
+    flush()
+    serializer = _serializer()
+    _ensure_journal(serializer)
+    journal = serializer.path()
+    if not os.path.exists(journal):
+        return 0, 0
+
+    # 顺序扫描，只保留需要的原始记录，不在内存中保存整个历史
+    total = 0
+    last_records = deque(maxlen=max(keep_last, 1))
+    bucket_records = {}
+    prefix_len = _BUCKET_PREFIX.get(bucket)
+    with open(journal, "rb") as f:
+        for raw, state in serializer.iter_records(f):
+            last_records.append((total, raw, state))
+            if prefix_len:
+                timestamp = state.get("timestamp")
+                if timestamp:
+                    bucket_records[timestamp[:prefix_len]] = (total, raw, state)
+            total += 1
+
+    kept = {index: (raw, state) for index, raw, state in bucket_records.values()}
+    if keep_last > 0:
+        kept.update({index: (raw, state) for index, raw, state in last_records})
+    elif last_records:
+        # 至少保留最后一条，保证仍可恢复
+        index, raw, state = last_records[-1]
+        kept[index] = (raw, state)
+
+    tmp_path = journal + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for index in sorted(kept):
+            f.write(kept[index][0])
+    os.replace(tmp_path, journal)
+
+    _collect_blobs(kept_state for _, kept_state in kept.values())
+    return total, len(kept)
+
+
+def auto_compact():
+    """启动时调用：快照日志过大时按默认策略压缩"""
+    try:
+        if os.path.getsize(_serializer().path()) <= AUTO_COMPACT_BYTES:
+            return
+    except OSError:
+        return
+    try:
+        compact()
+    except Exception as e:
+        print(f"[Warning] 压缩工作区状态失败: {str(e)}")
+
+
+def _collect_blobs(states):
+    """删除所有保留快照都不再引用的内容块"""
+    if not os.path.isdir(BLOB_DIR):
+        return
+    referenced = set()
+    for state in states:
+        for f in state.get("all_files", []):
+            if f.get("hash"):
+                referenced.add(f["hash"])
+    for name in os.listdir(BLOB_DIR):
+        if name in referenced:
+            continue
+        path = os.path.join(BLOB_DIR, name)
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        _known_blobs.discard(path)
+
+
+class MementoCompactCommand:
+    """
+    命令: memento-compact [N] [hourly|daily]
+    功能: 按保留策略压缩工作区状态历史
+    """
+    USAGE = "memento-compact [N] [hourly|daily]"
+
+    def execute(self, command):
+        try:
+            keep_last, bucket = CommandParser.parse(command, self.USAGE)
+        except CommandParser.CommandError as e:
+            print(str(e))
+            return False
+        if keep_last is not None and keep_last < 0:
+            print(CommandParser.signature(self.USAGE).message)
+            return False
+        before, after = compact(keep_last, bucket)
+        print(f"工作区状态已压缩: {before} -> {after} 条快照")
+
+
+def _ensure_journal(serializer):
+    """
+    首次写入前整理快照文件：
+    旧版 memento.txt 是整体 JSON 数组，转换为逐行日志；
+    使用二进制格式且 .bin 文件尚不存在时，把已有 JSON 快照迁移过去
+    """
+    journal = serializer.path()
+    if journal in _journal_checked:
+        return
+    json_serializer = _SERIALIZERS["json"]
+    json_path = json_serializer.path()
+    if os.path.exists(json_path) and _is_legacy_file(json_path):
+        _rewrite(json_serializer, json_path, _load_legacy(json_path))
+    if serializer is not json_serializer and not os.path.exists(journal) and os.path.exists(json_path):
+        with open(json_path, "rb") as f:
+            states = [state for _, state in json_serializer.iter_records(f)]
+        _rewrite(serializer, journal, states)
+    if os.path.exists(journal):
+        serializer.repair_tail()
+    _journal_checked.add(journal)
+
+
+def _rewrite(serializer, path, states):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for state in states:
+            f.write(serializer.encode(state))
+    os.replace(tmp_path, path)
+
+
+def _is_legacy_file(path):
+    """旧格式以 '[' 开头（json.dump 写出的列表）"""
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()
+    return head.startswith(b"[")
+
+
+def _load_legacy(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            all_states = json.load(f)
+    except ValueError:
+        return []
+    return all_states if isinstance(all_states, list) else []
+
+
+class JsonSerializer:
+    """每行一条紧凑 JSON 记录（JSON 字符串中的换行会被转义，保证一条记录只占一行）"""
+
+    def path(self):
+        return MEMENTO_FILE
+
+    def encode(self, state):
+        return (json.dumps(state, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def repair_tail(self):
+        """上次写入中断时末尾缺少换行，补上后新记录不会与残缺行粘连"""
+        path = self.path()
+        with open(path, "rb+") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def iter_records(self, f):
+        for raw in f:
+            state = self._decode(raw)
+            if state is not None:
+                yield raw, state
+
+    def read_last(self):
+        """返回最后一条完整有效的记录；写入中断造成的残缺行会被跳过"""
+        path = self.path()
+        if _is_legacy_file(path):
+            all_states = _load_legacy(path)
+            return all_states[-1] if all_states else None
+        for raw in _iter_lines_reversed(path):
+            state = self._decode(raw)
+            if state is not None:
+                return state
+        return None
+
+    def _decode(self, raw):
+        try:
+            state = json.loads(raw.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            return None
+        return state if isinstance(state, dict) else None
+
+
+class BinarySerializer:
+    """
+    长度前缀的二进制记录：
+    [标志 1B][长度 4B][数据][长度 4B]
+    数据为 _encode_value 的输出，标志位 1 表示数据经过 zlib 压缩；
+    尾部重复的长度用于从文件末尾直接定位最后一条记录
+    """
+    _HEADER = struct.Struct(">BI")
+    _TRAILER = struct.Struct(">I")
+    _FLAG_ZLIB = 1
+
+    def __init__(self, compress):
+        self.compress = compress
+
+    def path(self):
+        return os.path.splitext(MEMENTO_FILE)[0] + ".bin"
+
+    def encode(self, state):
+        payload = _encode_value(state)
+        flags = 0
+        if self.compress:
+            payload = zlib.compress(payload)
+            flags |= self._FLAG_ZLIB
+        return self._HEADER.pack(flags, len(payload)) + payload + self._TRAILER.pack(len(payload))
+
+    def repair_tail(self):
+        """截掉写入中断留下的残缺记录，保证后续追加的记录可以被顺序扫描到"""
+        path = self.path()
+        with open(path, "rb+") as f:
+            if self._read_tail_record(f) is not None:
+                return
+            f.seek(0)
+            valid_end = 0
+            for raw, _ in self.iter_records(f):
+                valid_end += len(raw)
+            if valid_end != f.seek(0, os.SEEK_END):
+                f.truncate(valid_end)
+
+    def iter_records(self, f):
+        header_size = self._HEADER.size
+        while True:
+            header = f.read(header_size)
+            if len(header) < header_size:
+                return
+            flags, length = self._HEADER.unpack(header)
+            body = f.read(length + self._TRAILER.size)
+            if len(body) < length + self._TRAILER.size:
+                return
+            state = self._decode(flags, body[:length])
+            if state is None or self._TRAILER.unpack(body[length:])[0] != length:
+                # 记录损坏，之后的数据无法再定位
+                return
+            yield header + body, state
+
+    def read_last(self):
+        with open(self.path(), "rb") as f:
+            state = self._read_tail_record(f)
+            if state is not None:
+                return state
+            # 末尾记录不完整（写入中断），顺序扫描找最后一条完整记录
+            f.seek(0)
+            last_state = None
+            for _, state in self.iter_records(f):
+                last_state = state
+            return last_state
+
+    def _read_tail_record(self, f):
+        """通过尾部长度直接读取最后一条记录，失败返回 None"""
+        header_size = self._HEADER.size
+        trailer_size = self._TRAILER.size
+        end = f.seek(0, os.SEEK_END)
+        if end < header_size + trailer_size:
+            return None
+        f.seek(end - trailer_size)
+        length = self._TRAILER.unpack(f.read(trailer_size))[0]
+        start = end - trailer_size - length - header_size
+        if start < 0:
+            return None
+        f.seek(start)
+        flags, header_length = self._HEADER.unpack(f.read(header_size))
+        if header_length != length:
+            return None
+        return self._decode(flags, f.read(length))
+
+    def _decode(self, flags, payload):
+        try:
+            if flags & self._FLAG_ZLIB:
+                payload = zlib.decompress(payload)
+            state, _ = _decode_value(memoryview(payload), 0)
+        except (zlib.error, struct.error, ValueError, IndexError, UnicodeDecodeError):
+            return None
+        return state if isinstance(state, dict) else None
+
+
+_SERIALIZERS = {
+    "json": JsonSerializer(),
+    "binary": BinarySerializer(compress=False),
+    "binary-zlib": BinarySerializer(compress=True),
+}
+
+
+def _serializer():
+    if SERIALIZER not in _SERIALIZERS:
+        raise ValueError(f"不支持的快照格式: {SERIALIZER}")
+    return _SERIALIZERS[SERIALIZER]
+
+
+# 二进制值编码：1 字节类型标记 + 数据，字符串/列表/字典带 4 字节长度前缀
+_U32 = struct.Struct(">I")
+_I64 = struct.Struct(">q")
+
+
+def _encode_value(value):
+    out = []
+    _encode_into(value, out)
+    return b"".join(out)
+
+
+def _encode_into(value, out):
+    if value is None:
+        out.append(b"N")
+    elif value is True:
+        out.append(b"T")
+    elif value is False:
+        out.append(b"F")
+    elif isinstance(value, int):
+        out.append(b"I" + _I64.pack(value))
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out.append(b"S" + _U32.pack(len(data)))
+        out.append(data)
+    elif isinstance(value, (list, tuple)):
+        out.append(b"L" + _U32.pack(len(value)))
+        for item in value:
+            _encode_into(item, out)
+    elif isinstance(value, dict):
+        out.append(b"D" + _U32.pack(len(value)))
+        for key, item in value.items():
+            _encode_into(str(key), out)
+            _encode_into(item, out)
+    else:
+        raise ValueError(f"无法编码的类型: {type(value).__name__}")
+
+
+def _decode_value(buf, pos):
+    tag = buf[pos]
+    pos += 1
+    if tag == 0x53:  # S
+        length = _U32.unpack_from(buf, pos)[0]
+        pos += 4
+        return str(buf[pos:pos + length], "utf-8"), pos + length
+    if tag == 0x44:  # D
+        count = _U32.unpack_from(buf, pos)[0]
+        pos += 4
+        result = {}
+        for _ in range(count):
+            key, pos = _decode_value(buf, pos)
+            result[key], pos = _decode_value(buf, pos)
+        return result, pos
+    if tag == 0x4C:  # L
+        count = _U32.unpack_from(buf, pos)[0]
+        pos += 4
+        result = []
+        for _ in range(count):
+            item, pos = _decode_value(buf, pos)
+            result.append(item)
+        return result, pos
+    if tag == 0x49:  # I
+        return _I64.unpack_from(buf, pos)[0], pos + 8
+    if tag == 0x4E:  # N
+        return None, pos
+    if tag == 0x54:  # T
+        return True, pos
+    if tag == 0x46:  # F
+        return False, pos
+    raise ValueError(f"未知的类型标记: {tag}")
+
+
+def _iter_lines_reversed(path):
+    """从文件末尾向前逐行返回（bytes），不读取整个文件"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        tail = b""
+        while pos > 0:
+            size = min(_TAIL_CHUNK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + tail).split(b"\n")
+            # 第一段可能是不完整的行，留到下一块拼接
+            tail = lines[0]
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
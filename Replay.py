@@ -0,0 +1,246 @@
+"""
+日志重放模块
+按时间顺序读取文件的 .name.log 日志，把其中的编辑命令直接应用到文件内容上，
+用于事故后由日志重建文件或审计；重放时不逐条输出提示、不写撤销历史、不记录日志
+"""
+import time
+import WorkSpace
+import EditorActions
+import File
+
+# 日志行开头时间戳的长度："YYYYMMDD HH:MM:SS"
+_TIMESTAMP_LEN = 17
+# 编辑命令 -> 参数格式，与编辑器中的命令使用同一个编译好的 Signature
+_SIGNATURES = {
+    "append": EditorActions.AppendCommand.SIGNATURE,
+    "insert": EditorActions.InsertCommand.SIGNATURE,
+    "delete": EditorActions.DeleteCommand.SIGNATURE,
+    "replace": EditorActions.ReplaceCommand.SIGNATURE,
+    "append-file": EditorActions.AppendFileCommand.SIGNATURE,
+    "insert-block": EditorActions.InsertBlockCommand.SIGNATURE,
+}
+
+
+class ReplayError(ValueError):
+    """日志中的命令无法应用到当前内容"""
+
+
+class Replayer:
+    """
+    把日志中的命令依次应用到一个 TextFile
+    编辑命令生成与编辑器相同的编辑记录并直接 apply；undo/redo 使用重放自己的撤销栈，
+    batch begin/commit 之间的编辑合并为一条记录，与编辑器中的撤销行为一致
+    """
+
+    def __init__(self, file, base=None):
+        self.file = file
+        # 重放前的内容是否已知：由 base 给出，或在日志中遇到 init 后才确定
+        self.based = base is not None
+        if self.based:
+            self.file.content = list(base)
+        self.undo_stack = []
+        self.redo_stack = []
+        self.transaction = None
+        # 最近一次压入撤销栈的记录，合并连续 append 的规则与 TextFile 相同
+        self.last_pushed = None
+        # 已重放的命令数（含 undo/redo/batch）
+        self.count = 0
+
+    def run(self, lines, since=None, until=None):
+        """重放日志行，返回重放的命令数；until 之后的日志不再读取"""
+        for line in lines:
+            if not line:
+                continue
+            if line.startswith("session start at "):
+                # 新会话中编辑器的撤销历史从头开始，之前的追加不再与之后的合并
+                self.last_pushed = None
+                continue
+            timestamp = line[:_TIMESTAMP_LEN]
+            if since is not None and timestamp < since:
+                continue
+            # 时间可以只写前缀，只比较相同长度的部分
+            if until is not None and timestamp[:len(until)] > until:
+                break
+            try:
+                self.execute(line[_TIMESTAMP_LEN + 1:])
+            except (IndexError, ValueError) as e:
+                raise ReplayError(f"{line} ({str(e)})")
+        return self.count
+
+    def execute(self, command):
+        op = command.split(" ", 1)[0]
+        if not self.based and (op in _SIGNATURES or op in ("undo", "redo", "load")):
+            # 例如先 load 再开启日志：日志中没有载入时的内容，不能把编辑应用到不相干的内容上
+            raise ReplayError("初始内容未知（日志中没有 init 记录），请用 --base <path> 指定重放的初始内容")
+        if op in _SIGNATURES:
+            record = self._make_record(op, command)
+            record.apply()
+            self.redo_stack.clear()
+            if self.transaction is not None:
+                self.transaction.append(record)
+            else:
+                self._push(record)
+        elif op == "undo":
+            if self.transaction is not None or not self.undo_stack:
+                raise ReplayError("没有可撤销的操作")
+            record = self.undo_stack.pop()
+            self.last_pushed = None
+            record.revert()
+            self.redo_stack.append(record)
+        elif op == "redo":
+            if self.transaction is not None or not self.redo_stack:
+                raise ReplayError("没有可重做的操作")
+            record = self.redo_stack.pop()
+            self.last_pushed = None
+            record.apply()
+            self.undo_stack.append(record)
+        elif op == "batch":
+            self._batch(command)
+        elif op == "init":
+            # 新建文件：内容从空（或只有 # log 一行）开始
+            self.file.content = ["# log"] if command.endswith(" with-log") else []
+            self.based = True
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.transaction = None
+            self.last_pushed = None
+        else:
+            # load/save/close/edit/show 等命令不改变内容；load 之前的内容由 init 或 base 确定
+            return
+        self.count += 1
+
+    def _batch(self, command):
+        if command == "batch begin":
+            self.transaction = []
+        elif command == "batch commit":
+            records = self.transaction or []
+            self.transaction = None
+            if records:
+                self._push(records[0].group(records))
+        else:
+            raise ReplayError("未知的批量编辑命令")
+
+    def _push(self, record):
+        if self.undo_stack and self.undo_stack[-1] is self.last_pushed:
+            merged = self.last_pushed.merge(record)
+            if merged is not None:
+                self.undo_stack.pop()
+                record = merged
+        self.undo_stack.append(record)
+        self.last_pushed = record
+
+    def _make_record(self, op, command):
+        """按与编辑命令相同的用法解析命令并生成编辑记录"""
+        content = self.file.content
+        args = _SIGNATURES[op].parse(command)
+        if op == "append":
+            return EditorActions.AppendRecord(self.file, args[0])
+        if op in ("append-file", "insert-block"):
+            return self._make_block(op, args)
+        (line, col) = args[0]
+        line_idx, col_idx = line - 1, col - 1
+        if op == "delete":
+            length = args[1]
+            current_line = _check_position(content, line_idx, col_idx, length)
+            return EditorActions.DeltaRecord(self.file, "delete", EditorActions.TextDelta(
+                line_idx, col_idx, current_line[col_idx:col_idx + length], ""))
+
+        text = args[-1]
+        if op == "insert":
+            if not content:
+                if line_idx != 0 or col_idx != 0:
+                    raise ReplayError("空文件只能在1:1位置插入")
+                return EditorActions.AppendRecord(self.file, text, kind="insert")
+            _check_position(content, line_idx, col_idx, 0, allow_end=True)
+            return EditorActions.DeltaRecord(self.file, "insert", EditorActions.TextDelta(
+                line_idx, col_idx, "", text.replace('\\n', '\n')))
+        length = args[1]
+        current_line = _check_position(content, line_idx, col_idx, length)
+        return EditorActions.DeltaRecord(self.file, "replace", EditorActions.TextDelta(
+            line_idx, col_idx, current_line[col_idx:col_idx + length], text))
+
+    def _make_block(self, op, args):
+        """日志中只记录了外部文件的路径，重放时重新读取该文件"""
+        index = len(self.file.content)
+        if op == "insert-block":
+            line, path = args
+            if line < 1 or line > index + 1:
+                raise ReplayError("行号越界")
+            index = line - 1
+        else:
+            path, = args
+        try:
+            lines = EditorActions.read_block(path)
+        except (OSError, UnicodeDecodeError):
+            raise ReplayError(f"无法读取文件 {path}")
+        return EditorActions.BlockRecord(self.file, op, index, lines)
+
+
+def _check_position(content, line_idx, col_idx, length, allow_end=False):
+    """与编辑命令相同的越界检查，返回所在行"""
+    if line_idx < 0 or line_idx >= len(content):
+        raise ReplayError("行号越界")
+    current_line = content[line_idx]
+    if col_idx < 0 or col_idx > len(current_line) or (col_idx == len(current_line) and not allow_end):
+        raise ReplayError("列号越界")
+    if col_idx + length > len(current_line):
+        raise ReplayError("长度超出行尾")
+    return current_line
+
+
+class ReplayCommand:
+    """
+    命令: replay <file> [--from <time>] [--to <time>] [--base <path>]
+    功能: 把文件日志中的编辑命令重放到文件内容上
+    重放从日志中的 init 开始；日志从 load 开始（或只重放 --from 之后的部分）时，
+    用 --base 指定重放开始时的文件内容
+    """
+    USAGE = "replay <file> [--from <time>] [--to <time>] [--base <path>]"
+
+    def execute(self, command):
+        args = WorkSpace.parse_args(command, self.USAGE)
+        if args is None:
+            return False
+        target_file, since, until, base_path = args
+
+        if target_file not in File.FileList.all_files_path:
+            print("当前文件不存在")
+            return False
+        file = File.FileList.all_files[target_file]
+        if file.in_transaction():
+            print("批量编辑尚未提交")
+            return False
+
+        base = None
+        if base_path is not None:
+            try:
+                base = EditorActions.read_block(base_path)
+            except (OSError, UnicodeDecodeError):
+                print(f"无法读取文件 {base_path}")
+                return False
+
+        logger = WorkSpace.WorkSpace.logger
+        # 重放到副本上，全部成功后才替换文件内容；中途出错时文件与撤销历史保持不变
+        scratch = File.TextFile(file.filePath, content=[])
+        replayer = Replayer(scratch, base)
+        start = time.perf_counter()
+        try:
+            count = replayer.run(logger.iter_history(target_file, since=since), since=since, until=until)
+        except ReplayError as e:
+            print(f"重放中止，第 {replayer.count + 1} 条命令无法应用，文件内容未改变: {str(e)}")
+            return False
+        except OSError as e:
+            print(f"读取日志失败: {str(e)}")
+            return False
+        elapsed = time.perf_counter() - start
+
+        if count:
+            # 重放改写了内容，原有的撤销历史不再对应当前内容
+            file.content = scratch.content
+            file.command_history.clear()
+            file.redo_stack.clear()
+            file.history_bytes = 0
+            file.set_history_loader(None)
+            file.state = "modified"
+        rate = count / elapsed if elapsed > 0 else 0
+        print(f"重放完成: {count} 条命令，耗时 {elapsed * 1000:.1f} ms，{rate:.0f} 条/秒")
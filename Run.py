@@ -1,7 +1,14 @@
+import os
+import sys
+import time
+import argparse
+import contextlib
 import WorkSpace
+import CommandParser
 import Memento
 import EditorActions
 import Logging
+import Replay
 
 class CommandFactory:
     def __init__(self):
@@ -16,18 +23,28 @@ class CommandFactory:
             "dir-tree": WorkSpace.DirTreeCommand(),
             "undo": WorkSpace.UndoCommand(),
             "redo": WorkSpace.RedoCommand(),
+            "batch": WorkSpace.BatchCommand(),
 
             # 文本编辑命令
             "append": EditorActions.AppendCommand(),
             "insert": EditorActions.InsertCommand(),
             "delete": EditorActions.DeleteCommand(),
             "replace": EditorActions.ReplaceCommand(),
+            "append-file": EditorActions.AppendFileCommand(),
+            "insert-block": EditorActions.InsertBlockCommand(),
             "show": EditorActions.ShowCommand(),
+            "find": EditorActions.FindCommand(),
+            "find-all": EditorActions.FindAllCommand(),
 
             # # 日志命令
             "log-on": Logging.LogOnCommand(),
             "log-off": Logging.LogOffCommand(),
             "log-show": Logging.LogShowCommand(),
+            "log-stats": Logging.LogStatsCommand(),
+            "replay": Replay.ReplayCommand(),
+
+            # 工作区状态
+            "memento-compact": Memento.MementoCompactCommand(),
         }
 
     def isValid(self, operator):
@@ -35,28 +52,101 @@ class CommandFactory:
 
     def getCommand(self, operator):
         return self.commands.get(operator)
-    
-if __name__ == "__main__":
-    cf=CommandFactory()
-    last_state = Memento.recover()
-    WorkSpace.WorkSpace.recover()
+
+
+def run_command(cf, command):
+    """执行一条命令，返回 False 表示退出"""
+    if(command == "exit"):
+        return False
+    execute_command(cf, command)
+    return True
+
+
+def execute_command(cf, command):
+    """执行一条命令（exit 除外），返回命令是否成功：不支持的操作与 execute 返回 False 的命令视为失败"""
+    #调试用
+    if(command == "curpath"):
+        print(WorkSpace.WorkSpace.current_workFile_path)
+        return True
+    if(command == "curlist"):
+        print(WorkSpace.WorkSpace.current_workFile_list)
+        return True
+    operator = CommandParser.operator(command)
+    if(not cf.isValid(operator)):
+        print("不支持的操作")
+        return False
+    return cf.getCommand(operator).execute(command) is not False
+
+
+def shutdown():
+    #退出的时候记录一下当前状态
+    Memento.update(WorkSpace.WorkSpace.current_workFile_path,WorkSpace.WorkSpace.current_workFile_list)
+    Memento.flush()
+    WorkSpace.WorkSpace.logger.close()
+
+
+def run_interactive(cf):
     while True:
         command = input("> ")
-        if(command == "exit"):
-            #退出的时候记录一下当前状态
-            Memento.update(WorkSpace.WorkSpace.current_workFile_path,WorkSpace.WorkSpace.current_workFile_list)
+        if not run_command(cf, command):
             break
-        #调试用
-        if(command == "curpath"):
-            print(WorkSpace.WorkSpace.current_workFile_path)
-            continue
-        if(command == "curlist"):
-            print(WorkSpace.WorkSpace.current_workFile_list)
-            continue
-        operator = command.split(" ")[0]
-        if(not cf.isValid(operator)):
-            print("不支持的操作")
-            continue
-        cf.getCommand(operator).execute(command)
-        
 
+
+def run_script(cf, script, quiet=False):
+    """
+    脚本模式：逐行执行命令文件（- 表示标准输入），空行和 # 开头的行跳过；
+    需要确认的提示使用默认回答，quiet 为 True 时不输出命令的提示信息，
+    结束后输出命令数、失败条数、总耗时与每秒命令数（quiet 时同样输出）；返回失败的命令数
+    """
+    WorkSpace.WorkSpace.interactive = False
+    count = 0
+    failed = 0
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        f = sys.stdin if script == "-" else stack.enter_context(open(script, "r", encoding="utf-8"))
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        for line in f:
+            command = line.strip()
+            if not command or command.startswith("#"):
+                continue
+            count += 1
+            if command == "exit":
+                break
+            if not execute_command(cf, command):
+                failed += 1
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0
+    print(f"脚本执行完成: {count} 条命令，失败 {failed} 条，耗时 {elapsed * 1000:.1f} ms，{rate:.0f} 条/秒")
+    return failed
+
+
+def main(argv=None):
+    """程序入口，返回退出状态：脚本模式下有命令失败或脚本无法读取时为 1"""
+    parser = argparse.ArgumentParser(description="命令行文本编辑器")
+    parser.add_argument("--script", help="按行执行命令文件中的命令，- 表示从标准输入读取")
+    parser.add_argument("--quiet", action="store_true", help="脚本模式下不输出命令的提示信息")
+    args = parser.parse_args(argv)
+    if args.quiet and not args.script:
+        parser.error("--quiet 只能与 --script 一起使用")
+
+    cf=CommandFactory()
+    # 启动时先按保留策略压缩历史，保证启动时间和磁盘占用有界
+    Memento.auto_compact()
+    WorkSpace.WorkSpace.recover()
+    status = 0
+    if args.script:
+        try:
+            if run_script(cf, args.script, args.quiet):
+                status = 1
+        except OSError as e:
+            print(f"读取脚本失败: {str(e)}")
+            status = 1
+    else:
+        run_interactive(cf)
+    shutdown()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
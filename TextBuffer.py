@@ -0,0 +1,757 @@
+"""
+文本缓冲区模块
+负责把磁盘文件读入编辑器：小文件直接读为行列表，
+大文件通过 mmap 按需读取，不在打开时把整个文件复制为字符串列表；
+PieceTable 在原始内容之上记录编辑，编辑时不复制原始内容；
+查找时按需建立三元组索引，之后随编辑增量更新
+"""
+import os
+import re
+import mmap
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence, MutableSequence
+
+# 超过该大小（字节）的文件使用 mmap 方式打开
+MMAP_THRESHOLD = 64 * 1024 * 1024
+# 稀疏换行索引的分块大小：每块只记录块前的行数
+_INDEX_CHUNK = 1024 * 1024
+# 缓存展开后的块内换行位置的块数
+_CACHED_CHUNKS = 16
+# 三元组索引中一块的行数
+_TRIGRAM_BLOCK = 32
+
+
+def read_lines(path):
+    """读取文件内容为行序列，超过 MMAP_THRESHOLD 时返回 MappedLines"""
+    if os.path.getsize(path) > MMAP_THRESHOLD:
+        return MappedLines(path)
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if not text:
+        return []
+    lines = text.split("\n")
+    # 以换行结尾的文件最后会多出一个空串
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def is_disk_backed(content):
+    """
+    mmap 打开的内容自读取或上次保存以来是否没有修改；
+    是否仍与磁盘文件一致还要由调用方比较磁盘状态（大小、修改时间）
+    """
+    return (isinstance(content, PieceTable) and content.dirty_from() is None
+            and isinstance(content.original, MappedLines))
+
+
+class MappedLines(Sequence):
+    """
+    基于 mmap 的只读行序列
+    打开时只按块统计换行数（稀疏索引），访问某一行时再在所在块内定位
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._chunk_size = _INDEX_CHUNK
+        # _chunk_lines[i]：第 i 块之前的换行符个数
+        self._chunk_lines = array("q")
+        self._chunk_cache = OrderedDict()
+        self._count = self._build_index()
+
+    def _build_index(self):
+        mm = self._mm
+        size = len(mm)
+        newlines = 0
+        for offset in range(0, size, self._chunk_size):
+            self._chunk_lines.append(newlines)
+            newlines += mm[offset:offset + self._chunk_size].count(b"\n")
+        # 最后一行没有换行符时也算一行
+        if size and mm[size - 1] != 0x0A:
+            newlines += 1
+        return newlines
+
+    def _chunk_newlines(self, chunk):
+        """返回第 chunk 块内所有换行符的位置"""
+        positions = self._chunk_cache.get(chunk)
+        if positions is not None:
+            self._chunk_cache.move_to_end(chunk)
+            return positions
+        positions = array("q")
+        mm = self._mm
+        pos = chunk * self._chunk_size
+        end = min(pos + self._chunk_size, len(mm))
+        while True:
+            pos = mm.find(b"\n", pos, end)
+            if pos < 0:
+                break
+            positions.append(pos)
+            pos += 1
+        self._chunk_cache[chunk] = positions
+        if len(self._chunk_cache) > _CACHED_CHUNKS:
+            self._chunk_cache.popitem(last=False)
+        return positions
+
+    def _line_start(self, index):
+        """第 index 行（从 0 开始）的起始字节位置"""
+        if index == 0:
+            return 0
+        # 第 index 行从第 index 个换行符之后开始
+        chunk = bisect_left(self._chunk_lines, index) - 1
+        positions = self._chunk_newlines(chunk)
+        return positions[index - self._chunk_lines[chunk] - 1] + 1
+
+    def _decode(self, start, end):
+        line = self._mm[start:end].decode("utf-8", errors="replace")
+        return line[:-1] if line.endswith("\r") else line
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+    def reopen(self):
+        """close 之后文件未被改动时重新映射，已建立的换行索引仍然有效"""
+        if self._mm is None:
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._chunk_cache.clear()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError("line index out of range")
+        start = self._line_start(index)
+        end = self._mm.find(b"\n", start)
+        return self._decode(start, end if end >= 0 else len(self._mm))
+
+    def __iter__(self):
+        return self.iter_range(0, self._count)
+
+    def iter_range(self, start, stop):
+        """顺序返回 [start, stop) 范围内的行，只定位一次起点"""
+        if start >= stop:
+            return
+        mm = self._mm
+        size = len(mm)
+        pos = self._line_start(start)
+        for _ in range(stop - start):
+            if pos >= size:
+                return
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = size
+            yield self._decode(pos, end)
+            pos = end + 1
+
+    def __repr__(self):
+        return f"MappedLines({self.path!r}, lines={len(self)})"
+
+
+def required_literals(pattern):
+    """
+    从正则表达式中提取每个匹配都必须包含的字面文本片段，用于三元组索引筛选候选行
+    只识别顶层的连续字面字符：分组、字符类、转义类与可省略的字符都作为分隔；
+    顶层有 | 时无法确定，返回空列表（由调用方退回逐行扫描）
+    """
+    runs = []
+    run = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            if i + 1 >= n:
+                return []
+            escaped = pattern[i + 1]
+            if escaped.isalnum():
+                # \d、\w、\n、\x41、反向引用等不是字面字符，连同参数一起跳过
+                runs.append("".join(run))
+                run = []
+                i = _skip_escape(pattern, i + 1)
+            else:
+                run.append(escaped)
+                i += 2
+            continue
+        if c == "|":
+            return []
+        if c in "*?{":
+            # 前一个字符可以不出现
+            if run:
+                run.pop()
+            runs.append("".join(run))
+            run = []
+            i = _skip_quantifier(pattern, i)
+            continue
+        if c == "+":
+            runs.append("".join(run))
+            run = []
+            i = _skip_quantifier(pattern, i)
+            continue
+        if c in ".^$":
+            runs.append("".join(run))
+            run = []
+            i += 1
+            continue
+        if c == "[":
+            runs.append("".join(run))
+            run = []
+            i = _skip_class(pattern, i)
+            continue
+        if c == "(":
+            runs.append("".join(run))
+            run = []
+            i = _skip_group(pattern, i)
+            if i < 0:
+                return []
+            continue
+        if c == ")":
+            return []
+        run.append(c)
+        i += 1
+    runs.append("".join(run))
+    return [run for run in runs if run]
+
+
+# 带参数的转义 -> 参数的字符数
+_ESCAPE_ARGS = {"x": 2, "u": 4, "U": 8}
+
+
+def _skip_escape(pattern, i):
+    """跳过从 i 开始的转义字母（反斜杠之后）及其参数，返回之后的位置"""
+    escaped = pattern[i]
+    if escaped in _ESCAPE_ARGS:
+        return i + 1 + _ESCAPE_ARGS[escaped]
+    if escaped == "N" and pattern.startswith("{", i + 1):
+        end = pattern.find("}", i)
+        return end + 1 if end >= 0 else len(pattern)
+    if escaped.isdigit():
+        # 八进制（最多三位）或反向引用（最多两位）
+        end = i + 1
+        while end < len(pattern) and end < i + 3 and pattern[end].isdigit():
+            end += 1
+        return end
+    return i + 1
+
+
+def _skip_quantifier(pattern, i):
+    """跳过从 i 开始的量词及其后的非贪婪标记，返回之后的位置"""
+    if pattern[i] == "{":
+        end = pattern.find("}", i)
+        i = end + 1 if end >= 0 else i + 1
+    else:
+        i += 1
+    if i < len(pattern) and pattern[i] in "?+":
+        i += 1
+    return i
+
+
+def _skip_class(pattern, i):
+    """跳过从 i 开始的字符类 [...]，返回之后的位置"""
+    i += 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1
+    while i < len(pattern) and pattern[i] != "]":
+        i += 2 if pattern[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_group(pattern, i):
+    """跳过从 i 开始的分组 (...)（可以嵌套），返回之后的位置；括号不匹配时返回 -1"""
+    depth = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            i = _skip_class(pattern, i)
+            continue
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _TrigramIndex:
+    """
+    一个行来源（原始内容或新增行）的三元组索引：三元组 -> 包含它的行块编号（升序）
+    每 _TRIGRAM_BLOCK 行为一块，按块而不是按行记录，索引的大小约为按行记录的十分之一；
+    来源中的行写入后不再修改，所以索引只需追加新行；被删除的行仍留在索引中，
+    查找时按片段树把来源位置映射为当前行号，已不在文本中的行自然被过滤掉
+    """
+
+    def __init__(self):
+        self.postings = {}
+
+    def add(self, lines, start):
+        """把来源中从 start 开始的 lines 加入索引"""
+        postings = self.postings
+        offset = 0
+        while offset < len(lines):
+            block = (start + offset) // _TRIGRAM_BLOCK
+            end = min(len(lines), (block + 1) * _TRIGRAM_BLOCK - start)
+            # 跨行的三元组含换行符，查找时不会用到
+            for gram in _trigrams("\n".join(lines[offset:end])):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("q")
+                elif posting[-1] == block:
+                    # 追加到已有的块
+                    continue
+                posting.append(block)
+            offset = end
+
+    def candidates(self, grams):
+        """包含全部三元组的块编号（升序）"""
+        postings = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        found = set(postings[0])
+        for posting in postings[1:]:
+            found.intersection_update(posting)
+            if not found:
+                return []
+        return sorted(found)
+
+
+class _Piece:
+    """
+    片段表中的一个片段（同时是平衡树节点）：引用某个来源中连续的若干行
+    size/chars 为子树的行数与字符数（每行计入换行符），用于按行号和字符偏移定位
+    """
+    __slots__ = ("source", "start", "count", "piece_chars", "size", "chars",
+                 "priority", "left", "right")
+
+    def __init__(self, source, start, count, piece_chars=0, priority=None):
+        self.source = source
+        self.start = start
+        self.count = count
+        self.piece_chars = piece_chars
+        self.size = count
+        self.chars = piece_chars
+        self.priority = random.random() if priority is None else priority
+        self.left = None
+        self.right = None
+
+    def update(self):
+        self.size = self.count
+        self.chars = self.piece_chars
+        if self.left is not None:
+            self.size += self.left.size
+            self.chars += self.left.chars
+        if self.right is not None:
+            self.size += self.right.size
+            self.chars += self.right.chars
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+def _chars(node):
+    return node.chars if node is not None else 0
+
+
+def _split(node, k, measure):
+    """
+    把树分成前 k 行和其余部分；k 落在片段中间时拆开该片段，
+    measure(source, start, count) 计算拆开后各部分的字符数
+    """
+    if node is None:
+        return None, None
+    left_size = _size(node.left)
+    if k <= left_size:
+        left, node.left = _split(node.left, k, measure)
+        node.update()
+        return left, node
+    if k >= left_size + node.count:
+        node.right, right = _split(node.right, k - left_size - node.count, measure)
+        node.update()
+        return node, right
+    offset = k - left_size
+    # 右半片段沿用原优先级，node.right 中的节点优先级都更低，堆性质不变
+    tail_start = node.start + offset
+    tail_count = node.count - offset
+    tail = _Piece(node.source, tail_start, tail_count,
+                  measure(node.source, tail_start, tail_count), node.priority)
+    tail.right = node.right
+    tail.update()
+    node.count = offset
+    node.piece_chars = measure(node.source, node.start, offset)
+    node.right = None
+    node.update()
+    return node, tail
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+class PieceTable(MutableSequence):
+    """
+    按行组织的片段表
+    original 为原始内容（列表或 MappedLines），从不修改（调用方交出后也不应再修改）；
+    新写入的行只追加到 added；
+    文本由若干片段按顺序拼成，片段存放在按行数平衡的树（treap）中，
+    按行号定位、插入、删除都是 O(log n)，并保持列表式的行接口
+
+    行首偏移索引：第一次调用 offset_of/position_of 时为原始内容建立行长度前缀和，
+    之后每个树节点同时维护子树字符数，(行, 列) 与全文字符偏移的互相转换为 O(log n)，
+    编辑时随片段的拆分与合并增量更新
+    """
+    _ORIGINAL = 0
+    _ADDED = 1
+
+    def __init__(self, original=None):
+        self.original = original if original is not None else []
+        self.added = []
+        # _prefix[source][i]：该来源前 i 行的字符数（每行计入换行符）
+        # 新增行的前缀和总是维护；原始内容的前缀和在启用索引时才计算
+        self._prefix = [None, array("q", [0])]
+        self._indexed = False
+        self._root = None
+        self._edited = False
+        # 每次修改加一，用于判断内容自上次快照以来是否变化
+        self.version = 0
+        # 上次保存以来第一处修改所在的行；None 表示与上次保存时一致
+        self._dirty_from = None
+        # 上次保存时的行数
+        self._clean_length = len(self.original)
+        # 两个来源各自的三元组索引，第一次 search 时建立
+        self._trigrams = None
+        if len(self.original):
+            self._root = _Piece(self._ORIGINAL, 0, len(self.original))
+
+    def is_edited(self):
+        return self._edited
+
+    def dirty_from(self):
+        """上次保存以来修改过的第一行（从 0 开始），之前的行与磁盘一致；未修改时为 None"""
+        return self._dirty_from
+
+    def clean_length(self):
+        """上次保存时的行数"""
+        return self._clean_length
+
+    def mark_clean(self):
+        """保存后调用：当前内容即为磁盘内容"""
+        self._dirty_from = None
+        self._clean_length = len(self)
+
+    def rebase(self, original):
+        """整体重写文件后调用：以重新读取的磁盘内容为原始内容，丢弃片段与新增行"""
+        version = self.version
+        self.__init__(original)
+        # 内容没有变化，快照仍可复用
+        self.version = version
+
+    def _mark_dirty(self, index):
+        self._edited = True
+        self.version += 1
+        if self._dirty_from is None or index < self._dirty_from:
+            self._dirty_from = index
+
+    def _source(self, piece):
+        return self.original if piece.source == self._ORIGINAL else self.added
+
+    def _measure(self, source, start, count):
+        if not self._indexed:
+            return 0
+        prefix = self._prefix[source]
+        return prefix[start + count] - prefix[start]
+
+    def _add_lines(self, lines):
+        prefix = self._prefix[self._ADDED]
+        total = prefix[-1]
+        for line in lines:
+            total += len(line) + 1
+            prefix.append(total)
+        if self._trigrams is not None:
+            self._trigrams[self._ADDED].add(lines, len(self.added))
+        self.added.extend(lines)
+
+    def _ensure_index(self):
+        """建立原始内容的行长度前缀和，并补算所有节点的字符数"""
+        if self._indexed:
+            return
+        prefix = array("q", [0])
+        total = 0
+        for line in self.original:
+            total += len(line) + 1
+            prefix.append(total)
+        self._prefix[self._ORIGINAL] = prefix
+        self._indexed = True
+
+        # 后序遍历，先更新子节点
+        stack = [(self._root, False)] if self._root is not None else []
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                node.piece_chars = self._measure(node.source, node.start, node.count)
+                node.update()
+                continue
+            stack.append((node, True))
+            if node.left is not None:
+                stack.append((node.left, False))
+            if node.right is not None:
+                stack.append((node.right, False))
+
+    def char_count(self):
+        """全文字符数（行之间以一个换行符分隔）"""
+        self._ensure_index()
+        return max(_chars(self._root) - 1, 0)
+
+    def offset_of(self, index, col):
+        """第 index 行第 col 列（都从 0 开始）对应的全文字符偏移"""
+        self._ensure_index()
+        index = self._normalize(index)
+        node = self._root
+        offset = 0
+        while node is not None:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index < left_size + node.count:
+                offset += _chars(node.left)
+                prefix = self._prefix[node.source]
+                line_start = node.start + index - left_size
+                line_length = prefix[line_start + 1] - prefix[line_start] - 1
+                if col < 0 or col > line_length:
+                    raise IndexError("column out of range")
+                return offset + prefix[line_start] - prefix[node.start] + col
+            else:
+                index -= left_size + node.count
+                offset += _chars(node.left) + node.piece_chars
+                node = node.right
+
+    def position_of(self, offset):
+        """全文字符偏移对应的 (行, 列)，都从 0 开始"""
+        self._ensure_index()
+        if offset < 0 or offset > self.char_count():
+            raise IndexError("offset out of range")
+        node = self._root
+        line = 0
+        while node is not None:
+            left_chars = _chars(node.left)
+            if offset < left_chars:
+                node = node.left
+            elif offset < left_chars + node.piece_chars:
+                line += _size(node.left)
+                prefix = self._prefix[node.source]
+                target = prefix[node.start] + offset - left_chars
+                j = bisect_right(prefix, target, node.start, node.start + node.count) - 1
+                return line + j - node.start, target - prefix[j]
+            else:
+                offset -= left_chars + node.piece_chars
+                line += _size(node.left) + node.count
+                node = node.right
+        # 空文本只有偏移 0
+        return 0, 0
+
+    def search(self, regex):
+        """
+        按文本顺序逐个生成 (行, 匹配)，行从 0 开始；正则表达式在每一行内匹配
+        能从表达式中提取出至少三个字符的字面文本时，只在三元组索引筛选出的候选行上匹配，
+        否则逐行扫描
+        """
+        grams = set()
+        if not regex.flags & (re.IGNORECASE | re.VERBOSE):
+            for literal in required_literals(regex.pattern):
+                grams |= _trigrams(literal)
+        if not grams:
+            for index, line in enumerate(self):
+                for match in regex.finditer(line):
+                    yield index, match
+            return
+
+        self._ensure_trigrams()
+        candidates = [index.candidates(grams) for index in self._trigrams]
+        if not candidates[self._ORIGINAL] and not candidates[self._ADDED]:
+            return
+        # 中序遍历片段，在片段覆盖的候选块内逐行匹配，把来源中的位置换算为当前行号
+        stack = []
+        node = self._root
+        line = 0
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            blocks = candidates[node.source]
+            source = self._source(node)
+            stop = node.start + node.count
+            i = bisect_left(blocks, node.start // _TRIGRAM_BLOCK)
+            while i < len(blocks) and blocks[i] * _TRIGRAM_BLOCK < stop:
+                first = max(node.start, blocks[i] * _TRIGRAM_BLOCK)
+                last = min(stop, (blocks[i] + 1) * _TRIGRAM_BLOCK)
+                for position in range(first, last):
+                    for match in regex.finditer(source[position]):
+                        yield line + position - node.start, match
+                i += 1
+            line += node.count
+            node = node.right
+
+    def _ensure_trigrams(self):
+        """建立两个来源的三元组索引，之后新增的行在 _add_lines 中加入索引"""
+        if self._trigrams is not None:
+            return
+        original = _TrigramIndex()
+        original.add(self.original, 0)
+        added = _TrigramIndex()
+        added.add(self.added, 0)
+        self._trigrams = [original, added]
+
+    def _locate(self, index):
+        """返回 (片段, 片段内偏移)"""
+        node = self._root
+        while node is not None:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index < left_size + node.count:
+                return node, index - left_size
+            else:
+                index -= left_size + node.count
+                node = node.right
+        raise IndexError("line index out of range")
+
+    def _normalize(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("line index out of range")
+        return index
+
+    def _replace(self, start, stop, lines):
+        """用 lines 替换 [start, stop) 范围内的行"""
+        self._mark_dirty(start)
+        left, rest = _split(self._root, start, self._measure)
+        _, right = _split(rest, stop - start, self._measure)
+        if lines:
+            added_start = len(self.added)
+            self._add_lines(lines)
+            piece = _Piece(self._ADDED, added_start, len(lines),
+                           self._measure(self._ADDED, added_start, len(lines)))
+            left = _merge(left, piece)
+        self._root = _merge(left, right)
+
+    def __len__(self):
+        return _size(self._root)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        piece, offset = self._locate(self._normalize(index))
+        return self._source(piece)[piece.start + offset]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("PieceTable 不支持带步长的切片赋值")
+            self._replace(start, max(start, stop), list(value))
+            return
+        index = self._normalize(index)
+        self._replace(index, index + 1, [value])
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("PieceTable 不支持带步长的切片删除")
+            self._replace(start, max(start, stop), [])
+            return
+        index = self._normalize(index)
+        self._replace(index, index + 1, [])
+
+    def insert(self, index, value):
+        length = len(self)
+        if index < 0:
+            index = max(0, index + length)
+        index = min(index, length)
+        if index == length and self._extend_last_piece(value):
+            return
+        self._replace(index, index, [value])
+
+    def _extend_last_piece(self, value):
+        """连续追加时直接延长最后一个片段，不新建节点"""
+        node = self._root
+        path = []
+        while node is not None:
+            path.append(node)
+            node = node.right
+        if not path:
+            return False
+        last = path[-1]
+        if last.source != self._ADDED or last.start + last.count != len(self.added):
+            return False
+        self._mark_dirty(len(self))
+        self._add_lines([value])
+        chars = len(value) + 1 if self._indexed else 0
+        last.count += 1
+        last.piece_chars += chars
+        for node in path:
+            node.size += 1
+            node.chars += chars
+        return True
+
+    def __iter__(self):
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            source = self._source(node)
+            if isinstance(source, MappedLines):
+                yield from source.iter_range(node.start, node.start + node.count)
+            else:
+                yield from source[node.start:node.start + node.count]
+            node = node.right
+
+    def __eq__(self, other):
+        if isinstance(other, (list, PieceTable)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PieceTable({list(self)!r})"
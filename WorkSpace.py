@@ -1,8 +1,18 @@
+import os
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import File
 import CommonUtils
+import TextBuffer
 from datetime import datetime
 import Memento
 import Logging
+import EditorActions
+import CommandParser
+
+# save all 同时写入的最大文件数
+SAVE_ALL_WORKERS = 8
 
 class WorkSpace():
     current_workFile_path = ""
@@ -13,6 +23,17 @@ class WorkSpace():
     
     # 集成 Logger 日志记录实例
     logger = Logging.Logger() 
+
+    # 脚本模式下为 False，需要用户确认的提示直接使用默认回答
+    interactive = True
+
+    @classmethod
+    def ask(self, prompt, default):
+        """向用户提问；非交互模式下不等待输入，返回 default"""
+        if not WorkSpace.interactive:
+            print(f"{prompt}{default}")
+            return default
+        return input(prompt)
     
     @classmethod
     #只有在 load close 时才会更新
@@ -37,10 +58,32 @@ class WorkSpace():
         WorkSpace.recent_files.clear()
 
         temp_files = {}
+        active_path = WorkSpace.current_workFile_path
 
         for f in last_state.get("all_files", []):
-            tf = File.TextFile(f["filePath"], content=f["content"])
+            if "content" in f:
+                # 旧版快照直接包含内容
+                tf = File.TextFile(f["filePath"], content=f["content"])
+            elif f.get("onDisk"):
+                # 与 load 相同，在读取前记录磁盘状态，之后的保存可以只追加尾部
+                stamp = CommonUtils.disk_stamp(f["filePath"])
+                if stamp is None:
+                    # 快照中没有内容，磁盘文件已被删除时无法恢复
+                    print(f"[Warning] 文件已不存在，不再恢复: {f['filePath']}")
+                    continue
+                # 未修改的大文件不进入快照，重新从磁盘映射
+                tf = File.TextFile(f["filePath"], loader=functools.partial(TextBuffer.read_lines, f["filePath"]))
+                tf.disk_stamp = stamp
+            elif f["filePath"] == active_path:
+                # 当前活动文件立即加载，其余文件第一次使用时再读取内容块
+                tf = File.TextFile(f["filePath"], content=Memento.load_blob(f.get("hash")))
+            else:
+                tf = File.TextFile(f["filePath"], loader=functools.partial(Memento.load_blob, f.get("hash")))
+            tf.blob_hash = f.get("hash")
             tf.state = f["state"]
+            if Memento.PERSIST_UNDO and tf.blob_hash:
+                # 撤销历史在第一次撤销/重做时才读取，不影响启动时间
+                tf.set_history_loader(functools.partial(_recover_history, tf, tf.blob_hash))
 
             temp_files[f["filePath"]] = tf
             File.FileList.all_files[f["filePath"]] = tf
@@ -61,20 +104,49 @@ class WorkSpace():
         if current_file:
             WorkSpace.recent_files.append(current_file)
 
+def _recover_history(tf, content_hash):
+    """读取磁盘上的撤销日志并还原为编辑记录"""
+    history = Memento.load_undo_log(tf.filePath, content_hash)
+    if history is None:
+        return None
+    try:
+        return ([EditorActions.record_from_value(tf, value) for value in history[0]],
+                [EditorActions.record_from_value(tf, value) for value in history[1]])
+    except (ValueError, TypeError, IndexError) as e:
+        print(f"[Warning] 撤销历史无法读取，已忽略: {e}")
+        return None
+
+
+def parse_args(command, usage, message=None):
+    """按用法解析命令参数；参数错误时输出 message（默认为用法提示）并返回 None"""
+    try:
+        return CommandParser.parse(command, usage)
+    except CommandParser.CommandError as e:
+        print(message or str(e))
+        return None
+
+
 class LoadCommand():
     def execute(self, command):
-        if(len(command.split(" "))) != 2 :
-            print("参数错误，应为：load <file>")
-            return 
-        filePath = command.split(" ")[1]
+        args = parse_args(command, "load <file>")
+        if args is None:
+            return False
+        filePath, = args
         if not CommonUtils.pathCheck(filePath):
-            return 
+            return False
         if filePath in WorkSpace.recent_files:
             print("当前文件已打开，请使用edit命令切换")
-            return 
+            return False
         curFile = None
         if(filePath not in File.FileList.all_files_path):
-            curFile = CommonUtils.create_newFile(filePath)
+            if os.path.isfile(filePath):
+                # 磁盘上已有的文件读取内容，大文件按需映射
+                curFile = CommonUtils.load_existingFile(filePath)
+                if not curFile:
+                    return False
+                print(f"加载文件成功")
+            else:
+                curFile = CommonUtils.create_newFile(filePath)
         else:
             curFile = File.FileList.all_files[filePath]
             print(f"加载文件成功")
@@ -84,103 +156,123 @@ class LoadCommand():
         if filePath in WorkSpace.recent_files:
             WorkSpace.recent_files.remove(filePath)
         WorkSpace.recent_files.append(filePath)
+        # 文件首行为 "# log" 时自动启用日志
+        if curFile.content and curFile.content[0] == "# log":
+            WorkSpace.logger.enable_logging(filePath)
         WorkSpace.logger.log_command(filePath, f"load {filePath}")
 
      
 class SaveCommand():
     def execute(self, command):
-        args = command.split(" ")
-        if len(args) == 1:
+        args = parse_args(command, "save [file|all]")
+        if args is None:
+            return False
+        param, = args
+        if param is None:
             # save 当前文件
             filePath = WorkSpace.current_workFile_path
-            self.save_single_file(filePath)
-        elif len(args) == 2:
-            param = args[1]
+            return self.save_single_file(filePath)
+        else:
             if param == "all":
                 # save 所有文件
-                self.save_all_files()
+                return self.save_all_files()
             else:
                 # save 指定文件
                 filePath = param
                 if not CommonUtils.pathCheck(filePath):
                     print("参数错误")
-                    return
+                    return False
                 if filePath not in [f.filePath for f in WorkSpace.current_workFile_list.values()]:
                     print("该文件不在当前工作区中")
-                    return
-                self.save_single_file(filePath)
+                    return False
+                saved = self.save_single_file(filePath)
                 WorkSpace.logger.log_command(filePath, f"save {filePath}")
-        else:
-            print("参数错误，应为：save [file|all]")
-            return
+                return saved
 
     def save_single_file(self, file_path):
-        """保存单个文件"""
+        """保存单个文件，失败时返回 False"""
         # 检查是否有活动文件
         if not WorkSpace.current_workFile_path:
             print("没有打开的文件")
-            return
+            return False
 
         # 获取要保存的文件
         file_to_save = WorkSpace.current_workFile_list.get(file_path)
         if not file_to_save:
             print("文件不存在")
-            return
+            return False
 
         # 写入文件
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                for line in file_to_save.content:
-                    f.write(line + '\n')
+            CommonUtils.save_file(file_path, file_to_save)
             # 更新文件状态
             file_to_save.state = "normal"
             print(f"保存文件 {file_path} 成功")
         except Exception as e:
             print(f"保存文件失败: {e}")
+            return False
 
     def save_all_files(self):
-        """保存所有已打开的文件"""
+        """并行保存所有已修改的文件，最后按工作区顺序输出结果表；有文件保存失败时返回 False"""
         if not WorkSpace.current_workFile_list:
             print("没有打开的文件")
+            return False
+
+        # 未修改且磁盘上已存在的文件无需保存
+        to_save = [(file_path, file_obj) for file_path, file_obj in WorkSpace.current_workFile_list.items()
+                   if file_obj.state == "modified" or not os.path.exists(file_path)]
+        skipped = len(WorkSpace.current_workFile_list) - len(to_save)
+        if not to_save:
+            print(f"没有需要保存的文件（跳过 {skipped} 个未修改文件）")
             return
-            
-        for file_path, file_obj in WorkSpace.current_workFile_list.items():
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    for line in file_obj.content:
-                        f.write(line + '\n')
-                # 更新文件状态
-                file_obj.state = "normal"
-                print(f"保存文件 {file_path} 成功")
-            except Exception as e:
-                print(f"保存文件 {file_path} 失败: {e}")
-        
-        print("所有文件保存完成")
-        
-               
+
+        workers = max(1, min(SAVE_ALL_WORKERS, len(to_save)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(file_path, file_obj, pool.submit(self._timed_write, file_path, file_obj))
+                       for file_path, file_obj in to_save]
+            results = []
+            for file_path, file_obj, future in futures:
+                error, elapsed = future.result()
+                if error is None:
+                    # 更新文件状态
+                    file_obj.state = "normal"
+                results.append((file_path, error, elapsed))
+
+        width = max(len("文件"), max(len(file_path) for file_path, _, _ in results))
+        print(f"{'文件':<{width}}  {'耗时(ms)':>10}  结果")
+        for file_path, error, elapsed in results:
+            outcome = "成功" if error is None else f"失败: {error}"
+            print(f"{file_path:<{width}}  {elapsed * 1000:>10.1f}  {outcome}")
+        failed = sum(1 for _, error, _ in results if error is not None)
+        print(f"所有文件保存完成: 成功 {len(results) - failed} 个，失败 {failed} 个，跳过 {skipped} 个未修改文件")
+        if failed:
+            return False
+
+    @staticmethod
+    def _timed_write(file_path, file_obj):
+        """在线程池中写入单个文件，返回 (异常, 耗时)"""
+        start = time.perf_counter()
+        try:
+            CommonUtils.save_file(file_path, file_obj)
+            error = None
+        except Exception as e:
+            error = e
+        return error, time.perf_counter() - start
+
 
 class InitCommand():
     def execute(self, command):
-        args = command.split(" ")
-        filePath =""
-        withLog = False
-        if len(args)==3:
-            if(not CommonUtils.pathCheck(args[1]) or args[2]!="with-log"):
-                print("参数错误")
-                return 
-            filePath = args[1]
-            withLog = True
-        elif len(args)==2:
-            if(not CommonUtils.pathCheck(args[1])):
-                print("参数错误")
-                return 
-            filePath = args[1]
-        else:
+        args = parse_args(command, "init <file> [with-log]", "参数错误")
+        if args is None:
+            return False
+        filePath, withLog = args
+        withLog = withLog is not None
+        if(not CommonUtils.pathCheck(filePath)):
             print("参数错误")
-            return
+            return False
         if(filePath in File.FileList.all_files_path):
             print("文件已存在")
-            return
+            return False
         curFile = CommonUtils.create_newFile(filePath,withLog)
         WorkSpace.current_workFile_list[filePath]=curFile
         WorkSpace.update_current_workFile_path(filePath)
@@ -196,26 +288,28 @@ class InitCommand():
 
 class CloseCommand():
     def execute(self, command):
-        args = command.split(" ")
-        if len(args) == 1:
+        args = parse_args(command, "close [file]", "参数错误")
+        if args is None:
+            return False
+        filePath, = args
+        if filePath is None:
             filePath = WorkSpace.current_workFile_path
-        elif len(args) == 2:
-            filePath = args[1]
+        else:
             if not CommonUtils.pathCheck(filePath):
                 print("参数错误")
-                return
+                return False
             if filePath not in [f.filePath for f in WorkSpace.current_workFile_list.values()]:
                 print("该文件不在当前工作区中")
-                return
-        else:
-            print("参数错误")
-            return
+                return False
+        if filePath not in WorkSpace.current_workFile_list:
+            print("没有打开的文件")
+            return False
         curFile = WorkSpace.current_workFile_list[filePath]
         if(curFile.state=="modified"):
-            op=input("文件已修改，是否保存文件？(y/n)")
+            op=WorkSpace.ask("文件已修改，是否保存文件？(y/n)", "n")
             if(op == "y"):
                 #这里调save 的操作
-                SaveCommand().execute(f"save {filePath}")
+                SaveCommand().execute(f"save {CommandParser.quote(filePath)}")
             elif(op == "n"):
                 #n 就直接关闭
                 del WorkSpace.current_workFile_list[filePath]
@@ -226,6 +320,7 @@ class CloseCommand():
                     WorkSpace.update_current_workFile_path("")
             else:
                 print("参数错误")
+                return False
         else:
             del WorkSpace.current_workFile_list[filePath]
             WorkSpace.recent_files.remove(filePath)
@@ -233,23 +328,25 @@ class CloseCommand():
                 WorkSpace.update_current_workFile_path(WorkSpace.recent_files[-1])
             else:
                 WorkSpace.update_current_workFile_path("")
+        curFile.release()
         WorkSpace.update_current_workFile_list()
         print("关闭文件成功")
         WorkSpace.logger.log_command(filePath, f"close {filePath}")
+        WorkSpace.logger.close(filePath)
 
 
 class EditCommand():
     def execute(self, command):
-        if(len(command.split(" "))) != 2 :
-            print("参数错误，应为：edit <file>")
-            return
-        filePath = command.split(" ")[1]
+        args = parse_args(command, "edit <file>")
+        if args is None:
+            return False
+        filePath, = args
         if not CommonUtils.pathCheck(filePath):
                 print("参数错误")
-                return
+                return False
         if filePath not in [f.filePath for f in WorkSpace.current_workFile_list.values()]:
             print("该文件不在当前工作区中")
-            return
+            return False
         
         WorkSpace.update_current_workFile_path(filePath)
         #把当前文件放到recent的最后
@@ -261,16 +358,15 @@ class EditCommand():
 
 class EditorListCommand():
     def execute(self, command):
-        if(len(command.split(" "))) != 1 :
-            print("参数错误，应为：editor-list")
+        if parse_args(command, "editor-list") is None:
+            return False
         for f in WorkSpace.current_workFile_list.values():
             print(f.filePath)
 
 class DirTreeCommand():
     def execute(self, command):
-        if len(command.split(" ")) != 1:
-            print("参数错误，应为：dir-tree")
-            return
+        if parse_args(command, "dir-tree") is None:
+            return False
 
         paths = list(File.FileList.all_files_path)
         if not paths:
@@ -302,42 +398,71 @@ class DirTreeCommand():
 
 class UndoCommand():
     def execute(self, command):
-        if len(command.split()) != 1:
-            print("参数错误，应为：undo")
-            return
+        if parse_args(command, "undo") is None:
+            return False
         
         # 检查是否有活动文件
         if not WorkSpace.current_workFile_path:
             print("没有打开的文件")
-            return
+            return False
         
         # 获取当前文件
         current_file = WorkSpace.current_workFile_list.get(WorkSpace.current_workFile_path)
         if not current_file:
             print("当前文件不存在")
-            return
+            return False
         
         # 执行撤销
-        current_file.undo()
+        if not current_file.undo():
+            return False
         WorkSpace.logger.log_command(current_file, f"undo {current_file}")
 
 class RedoCommand():
     def execute(self, command):
-        if len(command.split()) != 1:
-            print("参数错误，应为：redo")
-            return
+        if parse_args(command, "redo") is None:
+            return False
         
         # 检查是否有活动文件
         if not WorkSpace.current_workFile_path:
             print("没有打开的文件")
-            return
+            return False
         
         # 获取当前文件
         current_file = WorkSpace.current_workFile_list.get(WorkSpace.current_workFile_path)
         if not current_file:
             print("当前文件不存在")
-            return
+            return False
         
         # 执行重做
-        current_file.redo()
-        WorkSpace.logger.log_command(current_file, f"redo {current_file}")
\ No newline at end of file
+        if not current_file.redo():
+            return False
+        WorkSpace.logger.log_command(current_file, f"redo {current_file}")
+class BatchCommand():
+    """批量编辑 - batch begin|commit，其间的编辑合并为一条撤销记录"""
+    def execute(self, command):
+        args = parse_args(command, "batch begin|commit")
+        if args is None:
+            return False
+        action, = args
+
+        # 检查是否有活动文件
+        if not WorkSpace.current_workFile_path:
+            print("没有打开的文件")
+            return False
+
+        current_file = WorkSpace.current_workFile_list.get(WorkSpace.current_workFile_path)
+        if not current_file:
+            print("当前文件不存在")
+            return False
+
+        if action == "begin":
+            if not current_file.begin():
+                return False
+            print("开始批量编辑")
+            WorkSpace.logger.log_command(current_file.filePath, "batch begin")
+        else:
+            count = current_file.commit()
+            if count is None:
+                return False
+            print(f"批量编辑已提交: {count} 条编辑")
+            WorkSpace.logger.log_command(current_file.filePath, "batch commit")
@@ -0,0 +1,72 @@
+"""
+查找基准测试
+比较逐行扫描与三元组索引筛选候选行的耗时：索引第一次查找时建立，之后随编辑增量更新
+
+运行: python benchmarks/bench_find.py [行数]
+"""
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import TextBuffer
+
+PATTERNS = [r"needle_\d+", r"error: disk \w+", r"def parse_header"]
+
+
+def make_lines(count):
+    random.seed(0)
+    words = ["alpha", "beta", "gamma", "delta", "value", "return", "self", "index", "line", "text"]
+    lines = []
+    for i in range(count):
+        line = " ".join(random.choice(words) for _ in range(8))
+        if i % 5000 == 0:
+            line += f" needle_{i}"
+        lines.append(line)
+    return lines
+
+
+def scan(content, regex):
+    """逐行扫描（不使用索引）"""
+    return [(index, match) for index, line in enumerate(content) for match in regex.finditer(line)]
+
+
+def time_searches(search, content, repeat=5):
+    start = time.perf_counter()
+    hits = 0
+    for _ in range(repeat):
+        for pattern in PATTERNS:
+            hits += len(search(content, re.compile(pattern)))
+    return (time.perf_counter() - start) / (repeat * len(PATTERNS)), hits
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    content = TextBuffer.PieceTable(make_lines(count))
+    size = sum(len(line) + 1 for line in content)
+    print(f"行数: {count}，大小: {size / 1024 / 1024:.1f} MB")
+
+    elapsed, scan_hits = time_searches(scan, content)
+    print(f"{'逐行扫描':<20}{elapsed * 1000:>10.1f} ms/次")
+
+    start = time.perf_counter()
+    list(content.search(re.compile(PATTERNS[0])))
+    print(f"{'建立三元组索引':<20}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+    elapsed, index_hits = time_searches(lambda c, r: list(c.search(r)), content)
+    assert index_hits == scan_hits
+    print(f"{'三元组索引':<20}{elapsed * 1000:>10.1f} ms/次")
+
+    # 编辑后索引只加入新写入的行
+    for i in range(1000):
+        content.insert(random.randrange(len(content)), f"inserted needle_x{i}")
+        del content[random.randrange(len(content))]
+    elapsed, _ = time_searches(lambda c, r: list(c.search(r)), content)
+    print(f"{'1000 次编辑后':<20}{elapsed * 1000:>10.1f} ms/次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+命令解析基准测试
+比较原来各命令自行 split 解析与 CommandParser 按预编译用法解析的耗时（含取命令名）；
+两种写法都先取命令名再交给该命令解析，与编辑器中的调用结构相同。
+CommandParser 对每条命令都做完整分词，比只认常见写法的 split 慢（200000 条约 0.46 s 对 0.13 s），
+换来所有命令相同的空白、引号与转义规则
+
+运行: python benchmarks/bench_parser.py [命令数]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import EditorActions
+import CommandParser
+
+# 编辑器中的写法：Run.py 取命令名，命令用自己编译好的 Signature 解析
+SIGNATURES = {
+    "append": EditorActions.AppendCommand.SIGNATURE,
+    "insert": EditorActions.InsertCommand.SIGNATURE,
+    "delete": EditorActions.DeleteCommand.SIGNATURE,
+    "replace": EditorActions.ReplaceCommand.SIGNATURE,
+}
+
+
+def split_append(command):
+    return (command.split('"')[1],)
+
+
+def split_insert(command):
+    parts = command.split('"')
+    line_col = parts[0].strip().split()[1].split(':')
+    return (int(line_col[0]), int(line_col[1])), parts[1]
+
+
+def split_delete(command):
+    parts = command.split()
+    line_col = parts[1].split(':')
+    return (int(line_col[0]), int(line_col[1])), int(parts[2])
+
+
+def split_replace(command):
+    parts = command.split('"')
+    cmd_parts = parts[0].strip().split()
+    line_col = cmd_parts[1].split(':')
+    return (int(line_col[0]), int(line_col[1])), int(cmd_parts[2]), parts[1]
+
+
+# 原来的写法：Run.py 按空格取命令名，命令在 execute 中再按引号、空白、冒号分别 split
+SPLIT_PARSERS = {
+    "append": split_append,
+    "insert": split_insert,
+    "delete": split_delete,
+    "replace": split_replace,
+}
+
+
+def parse_split(command):
+    return SPLIT_PARSERS[command.split(" ")[0]](command)
+
+
+def parse_shared(command):
+    # 与 Run.execute_command 相同：CommandParser.operator 取命令名，命令用自己的 Signature 分词解析
+    return SIGNATURES[CommandParser.operator(command)].parse(command)
+
+
+def make_commands(count):
+    commands = []
+    for i in range(count):
+        line = i % 500 + 1
+        commands.append([
+            f'append "line {i} with some text"',
+            f'insert {line}:3 "word {i}"',
+            f'delete {line}:1 4',
+            f'replace {line}:2 3 "text {i}"',
+        ][i % 4])
+    return commands
+
+
+def time_parse(parse, commands, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for command in commands:
+            parse(command)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    commands = make_commands(count)
+    assert [parse_split(c) for c in commands[:8]] == [parse_shared(c) for c in commands[:8]]
+    print(f"命令数: {count}")
+    print(f"{'写法':<24}{'耗时(ms)':>12}{'命令/秒':>14}")
+    for name, parse in (("各命令自行 split（原写法）", parse_split), ("CommandParser", parse_shared)):
+        elapsed = time_parse(parse, commands)
+        print(f"{name:<24}{elapsed * 1000:>12.1f}{count / elapsed:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
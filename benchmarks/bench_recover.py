@@ -0,0 +1,65 @@
+"""
+工作区恢复耗时基准测试
+构造包含 1000 个文件的快照，比较延迟恢复与全部加载内容的启动耗时
+
+运行: python benchmarks/bench_recover.py [文件数] [每个文件行数]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import File
+import Memento
+import WorkSpace
+
+
+def build_snapshot(file_count, line_count):
+    File.FileList.all_files.clear()
+    File.FileList.all_files_path.clear()
+    opened = {}
+    for i in range(file_count):
+        path = f"dir{i % 10}/file{i}.txt"
+        tf = File.TextFile(path, content=[f"file {i} line {j}" for j in range(line_count)])
+        File.FileList.all_files[path] = tf
+        File.FileList.all_files_path.add(path)
+        opened[path] = tf
+    with patch('builtins.print'):
+        Memento.update("dir0/file0.txt", opened)
+    Memento.flush()
+
+
+def time_recover(load_all):
+    start = time.perf_counter()
+    with patch('builtins.print'):
+        WorkSpace.WorkSpace.recover()
+    if load_all:
+        for tf in File.FileList.all_files.values():
+            tf.content
+    return time.perf_counter() - start
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    line_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    work_dir = tempfile.mkdtemp()
+    try:
+        with patch.object(Memento, "MEMENTO_FILE", os.path.join(work_dir, "memento.txt")), \
+                patch.object(Memento, "BLOB_DIR", os.path.join(work_dir, "blobs")):
+            build_snapshot(file_count, line_count)
+            lazy = min(time_recover(False) for _ in range(3))
+            eager = min(time_recover(True) for _ in range(3))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"文件数: {file_count}, 每个文件行数: {line_count}")
+    print(f"延迟恢复（仅加载活动文件）: {lazy * 1000:.1f} ms")
+    print(f"恢复并加载全部内容:         {eager * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+文件保存吞吐量基准测试
+比较原来的逐行 f.write 与分块写入临时文件再改名覆盖的耗时，
+以及读入大文件后追加一行再保存时整体重写与只追加尾部的耗时
+
+运行: python benchmarks/bench_save.py [行数]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import File
+import CommonUtils
+import TextBuffer
+
+
+def save_per_line(path, lines):
+    """原来的写法：每行调用一次 f.write"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+
+
+def time_save(save, path, lines, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        save(path, lines)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_append(path):
+    """读入磁盘文件，追加一行后保存"""
+    results = []
+    for name, patch_max in (("整体重写", 0), ("只追加尾部", CommonUtils.SAVE_PATCH_MAX_LINES)):
+        tf = File.TextFile(path, content=TextBuffer.read_lines(path))
+        tf.disk_stamp = CommonUtils.disk_stamp(path)
+        tf.content.append("appended")
+        old_max = CommonUtils.SAVE_PATCH_MAX_LINES
+        CommonUtils.SAVE_PATCH_MAX_LINES = patch_max
+        try:
+            start = time.perf_counter()
+            CommonUtils.save_file(path, tf, fsync=False)
+            results.append((name, time.perf_counter() - start))
+        finally:
+            CommonUtils.SAVE_PATCH_MAX_LINES = old_max
+            if isinstance(tf.content.original, TextBuffer.MappedLines):
+                tf.content.original.close()
+    return results
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lines = TextBuffer.PieceTable([f"第{i}行 the quick brown fox jumps over the lazy dog" for i in range(line_count)])
+    work_dir = tempfile.mkdtemp()
+    path = os.path.join(work_dir, "big.txt")
+    try:
+        results = [
+            ("逐行 f.write（原写法）", time_save(save_per_line, path, lines)),
+            ("分块 + 改名", time_save(lambda p, l: CommonUtils.write_lines_atomic(p, l, fsync=False), path, lines)),
+            ("分块 + 改名 + fsync", time_save(lambda p, l: CommonUtils.write_lines_atomic(p, l, fsync=True), path, lines)),
+        ]
+        size = os.path.getsize(path)
+        append_results = bench_append(path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"行数: {line_count}, 文件大小: {size / 1024 / 1024:.1f} MB")
+    print(f"{'写法':<24}{'耗时(ms)':>12}{'吞吐(MB/s)':>14}")
+    for name, elapsed in results:
+        print(f"{name:<24}{elapsed * 1000:>12.1f}{size / 1024 / 1024 / elapsed:>14.1f}")
+    print()
+    print("读入后追加一行再保存")
+    for name, elapsed in append_results:
+        print(f"{name:<24}{elapsed * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
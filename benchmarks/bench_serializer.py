@@ -0,0 +1,88 @@
+"""
+快照编码格式基准测试
+比较各快照格式写入 N 条快照（dump）、读取最后一条（load）的耗时与文件大小
+
+运行: python benchmarks/bench_serializer.py [快照数] [文件数]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import Memento
+
+
+def make_state(index, file_count):
+    return {
+        "timestamp": "2025-01-01 10:00:00",
+        "current_workFile_path": f"dir/file{index % file_count}.txt",
+        "current_workFile_list": {f"dir/file{i}.txt": "normal" for i in range(file_count)},
+        "all_files": [
+            {
+                "fileName": f"file{i}.txt",
+                "filePath": f"dir/file{i}.txt",
+                "hash": f"{i:064x}",
+                "state": "modified" if i == index % file_count else "normal",
+            }
+            for i in range(file_count)
+        ],
+    }
+
+
+def bench_indent_json(path, states):
+    """原来的格式：整个历史为一个 indent=2 的 JSON 数组，每次写入都重写"""
+    start = time.perf_counter()
+    history = []
+    for state in states:
+        history.append(state)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+    dump = time.perf_counter() - start
+    start = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        json.load(f)[-1]
+    return dump, time.perf_counter() - start, os.path.getsize(path)
+
+
+def bench_serializer(name, states):
+    serializer = Memento._SERIALIZERS[name]
+    # binary 与 binary-zlib 写入同一个 .bin 文件
+    if os.path.exists(serializer.path()):
+        os.remove(serializer.path())
+    start = time.perf_counter()
+    for state in states:
+        with open(serializer.path(), "ab") as f:
+            f.write(serializer.encode(state))
+    dump = time.perf_counter() - start
+    start = time.perf_counter()
+    serializer.read_last()
+    return dump, time.perf_counter() - start, os.path.getsize(serializer.path())
+
+
+def main():
+    snapshot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    file_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    states = [make_state(i, file_count) for i in range(snapshot_count)]
+    work_dir = tempfile.mkdtemp()
+    results = []
+    try:
+        results.append(("json indent=2（原格式）", bench_indent_json(os.path.join(work_dir, "legacy.txt"), states)))
+        with patch.object(Memento, "MEMENTO_FILE", os.path.join(work_dir, "memento.txt")):
+            for name in ("json", "binary", "binary-zlib"):
+                results.append((name, bench_serializer(name, states)))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"快照数: {snapshot_count}, 每条快照文件数: {file_count}")
+    print(f"{'格式':<24}{'dump(ms)':>12}{'load(ms)':>12}{'大小(KB)':>12}")
+    for name, (dump, load, size) in results:
+        print(f"{name:<24}{dump * 1000:>12.1f}{load * 1000:>12.2f}{size / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+命令解析（CommandParser）的单元测试
+"""
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import WorkSpace
+import File
+import EditorActions
+import CommandParser
+
+
+class TestTokenize(unittest.TestCase):
+    """测试单遍分词"""
+
+    def test_quoted_text(self):
+        """引号内可以包含空格，\\" 表示引号，其余反斜杠原样保留"""
+        tokens = CommandParser.tokenize(r'insert 1:3  "say \"hi\" C:\dir\n"')
+        self.assertEqual(tokens, ("insert", "1:3", 'say "hi" C:\\dir\\n'))
+        self.assertIsInstance(tokens[2], CommandParser.Quoted)
+        self.assertNotIsInstance(tokens[1], CommandParser.Quoted)
+        self.assertEqual(CommandParser.tokenize('append ""'), ("append", ""))
+
+    def test_unterminated_quote(self):
+        """引号不匹配时报错，但仍能取得命令名"""
+        with self.assertRaises(CommandParser.CommandError):
+            CommandParser.tokenize('append "abc')
+        self.assertEqual(CommandParser.operator('append "abc'), "append")
+        self.assertEqual(CommandParser.operator("  show"), "show")
+        self.assertEqual(CommandParser.operator(""), "")
+
+    def test_quote_round_trip(self):
+        """quote 的结果再分词得到原文本"""
+        for text in ["", "a b", 'say "hi"', "C:\\dir"]:
+            self.assertEqual(CommandParser.tokenize("append " + CommandParser.quote(text))[1], text)
+
+
+class TestSignature(unittest.TestCase):
+    """测试按用法解析为类型化参数"""
+
+    def test_typed_arguments(self):
+        """位置、整数、引号文本分别转换为对应类型"""
+        self.assertEqual(CommandParser.parse('replace 2:3 4 "x y"', 'replace <line:col> <len> "text"'),
+                         ((2, 3), 4, "x y"))
+        self.assertEqual(CommandParser.parse("batch commit", "batch begin|commit"), ("commit",))
+
+    def test_optional_and_options(self):
+        """可省略参数为 None，选项可以出现在任意位置"""
+        usage = "log-show [file] [--tail N] [--since <time>] [--grep <pattern>]"
+        self.assertEqual(CommandParser.parse("log-show", usage), (None, None, None, None))
+        self.assertEqual(CommandParser.parse('log-show --grep "a b" x.txt --tail 3', usage),
+                         ("x.txt", 3, None, "a b"))
+        self.assertEqual(CommandParser.parse("memento-compact daily", "memento-compact [N] [hourly|daily]"),
+                         (None, "daily"))
+
+    def test_errors(self):
+        """参数个数、类型或字面值不符时报告用法"""
+        cases = [
+            ('append text', 'append "text"'),
+            ('delete 1:x 2', "delete <line:col> <len>"),
+            ('delete 1:1', "delete <line:col> <len>"),
+            ("undo now", "undo"),
+            ("batch start", "batch begin|commit"),
+            ("log-show --tail", "log-show [file] [--tail N]"),
+            ('append "abc', 'append "text"'),
+        ]
+        for command, usage in cases:
+            with self.assertRaises(CommandParser.CommandError) as context:
+                CommandParser.parse(command, usage)
+            self.assertEqual(str(context.exception), f"参数错误，应为：{usage}")
+
+    def test_signature_is_compiled_once(self):
+        """每种用法只编译一次，命令类持有编译好的参数格式"""
+        self.assertIs(CommandParser.signature("show [startLine:endLine]"),
+                      CommandParser.signature("show [startLine:endLine]"))
+        self.assertIs(EditorActions.ReplaceCommand.SIGNATURE,
+                      CommandParser.signature(EditorActions.ReplaceCommand.USAGE))
+
+    def test_same_rules_for_every_usage(self):
+        """空白、引号与转义在所有用法中按同一规则处理"""
+        cases = [
+            ('append"x"', 'append "text"', ("x",)),
+            ('\tappend  "a b"  ', 'append "text"', ("a b",)),
+            (r'append "say \"hi\" C:\dir"', 'append "text"', ('say "hi" C:\\dir',)),
+            ('replace\t1:2 3"x"', 'replace <line:col> <len> "text"', ((1, 2), 3, "x")),
+            ('load "a b.txt"', "load <file>", ("a b.txt",)),
+            ('log-show "a b.txt" --tail 2', "log-show [file] [--tail N]", ("a b.txt", 2)),
+        ]
+        for command, usage, expected in cases:
+            with self.subTest(command=command):
+                self.assertEqual(CommandParser.parse(command, usage), expected)
+        for command, usage in [('append "x" y', 'append "text"'), ('delete "1:2" 3', "delete <line:col> <len>"),
+                               ('undo"x"', "undo"), ('replace 1:2 3 "x', 'replace <line:col> <len> "text"')]:
+            with self.subTest(command=command):
+                with self.assertRaises(CommandParser.CommandError):
+                    CommandParser.parse(command, usage)
+
+
+class TestCommandsShareParser(unittest.TestCase):
+    """测试编辑命令使用统一的解析"""
+
+    def setUp(self):
+        self.tf = File.TextFile("a.txt", content=["hello"])
+        self._patches = [
+            patch.object(WorkSpace.WorkSpace, "current_workFile_path", "a.txt"),
+            patch.object(WorkSpace.WorkSpace, "current_workFile_list", {"a.txt": self.tf}),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    def test_text_with_quotes(self):
+        """文本中可以包含转义的引号，日志中同样转义"""
+        with patch.object(WorkSpace.WorkSpace.logger, "log_command") as log, patch('builtins.print'):
+            EditorActions.AppendCommand().execute(r'append "say \"hi\""')
+            EditorActions.ReplaceCommand().execute(r'replace 1:1 1 "\"H"')
+        self.assertEqual(list(self.tf.content), ['"Hello', 'say "hi"'])
+        log.assert_any_call("a.txt", r'append "say \"hi\""')
+        log.assert_any_call("a.txt", r'replace 1:1 1 "\"H"')
+
+    def test_same_error_message(self):
+        """参数错误时输出用法"""
+        with patch('builtins.print') as mock_print:
+            EditorActions.InsertCommand().execute("insert 1:1 text")
+            mock_print.assert_called_with('参数错误，应为：insert <line:col> "text"')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,8 @@
 import unittest
 import sys
 import os
+import shutil
+import tempfile
 
 # 添加项目根目录到路径（tests目录的父目录）
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -12,6 +14,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import File
 import WorkSpace
 import EditorActions
+from unittest.mock import patch
 
 
 class TestEditorActionsBase(unittest.TestCase):
@@ -110,7 +113,7 @@ class TestAppendCommand(TestEditorActionsBase):
         cmd.execute('append "Test"')
         
         self.assertEqual(len(self.test_file.command_history), 1)
-        self.assertIsInstance(self.test_file.command_history[0], EditorActions.AppendCommand)
+        self.assertIsInstance(self.test_file.command_history[0], EditorActions.AppendRecord)
     
     def test_append_undo(self):
         """测试追加命令的撤销"""
@@ -426,7 +429,7 @@ class TestShowCommand(TestEditorActionsBase):
         cmd = EditorActions.ShowCommand()
         result = cmd.execute('show')
         
-        self.assertFalse(result)
+        self.assertTrue(result)
     
     def test_show_all_content(self):
         """测试显示全部内容"""
@@ -435,7 +438,7 @@ class TestShowCommand(TestEditorActionsBase):
         cmd = EditorActions.ShowCommand()
         result = cmd.execute('show')
         
-        self.assertFalse(result)  # show命令返回False（不进入历史栈）
+        self.assertTrue(result)  # show命令成功，但不进入历史栈
     
     def test_show_range(self):
         """测试显示指定范围"""
@@ -444,7 +447,7 @@ class TestShowCommand(TestEditorActionsBase):
         cmd = EditorActions.ShowCommand()
         result = cmd.execute('show 2:4')
         
-        self.assertFalse(result)
+        self.assertTrue(result)
     
     def test_show_invalid_range(self):
         """测试无效的范围"""
@@ -474,7 +477,7 @@ class TestUndoRedoIntegration(TestEditorActionsBase):
     """测试Undo/Redo的集成功能"""
     
     def test_multiple_operations_undo(self):
-        """测试多次操作后的撤销"""
+        """测试连续追加合并为一条撤销记录，一次撤销整段追加"""
         cmd1 = EditorActions.AppendCommand()
         cmd2 = EditorActions.AppendCommand()
         cmd3 = EditorActions.AppendCommand()
@@ -484,24 +487,19 @@ class TestUndoRedoIntegration(TestEditorActionsBase):
         cmd3.execute('append "Line 3"')
         
         self.assertEqual(len(self.test_file.content), 3)
+        self.assertEqual(len(self.test_file.command_history), 1)
         
-        self.test_file.undo()
-        self.assertEqual(len(self.test_file.content), 2)
-        
-        self.test_file.undo()
-        self.assertEqual(len(self.test_file.content), 1)
-        
-        self.test_file.undo()
+        self.assertTrue(self.test_file.undo())
         self.assertEqual(len(self.test_file.content), 0)
+        self.assertFalse(self.test_file.undo())
     
     def test_multiple_undo_redo(self):
-        """测试多次撤销和重做"""
-        cmd1 = EditorActions.AppendCommand()
-        cmd2 = EditorActions.AppendCommand()
-        
-        cmd1.execute('append "Line 1"')
-        cmd2.execute('append "Line 2"')
+        """测试多次撤销和重做：其他编辑隔开的追加分别撤销"""
+        EditorActions.AppendCommand().execute('append "Line 1"')
+        EditorActions.ReplaceCommand().execute('replace 1:6 1 "A"')
+        EditorActions.AppendCommand().execute('append "Line 2"')
         
+        self.test_file.undo()
         self.test_file.undo()
         self.test_file.undo()
         self.assertEqual(len(self.test_file.content), 0)
@@ -510,10 +508,47 @@ class TestUndoRedoIntegration(TestEditorActionsBase):
         self.assertEqual(len(self.test_file.content), 1)
         self.assertEqual(self.test_file.content[0], "Line 1")
         
+        self.test_file.redo()
         self.test_file.redo()
         self.assertEqual(len(self.test_file.content), 2)
         self.assertEqual(self.test_file.content[1], "Line 2")
     
+    def test_many_appends_one_undo(self):
+        """测试大量连续追加只占一条撤销记录，内存估算随行数增长"""
+        cmd = EditorActions.AppendCommand()
+        for i in range(10000):
+            cmd.execute(f'append "{i}"')
+        
+        self.assertEqual(len(self.test_file.command_history), 1)
+        record = self.test_file.command_history[0]
+        self.assertEqual(record.describe(), "append 10000 lines")
+        self.assertEqual(self.test_file.history_bytes, record.memory_size())
+        self.assertGreater(record.memory_size(), 10000 * sys.getsizeof("0"))
+        
+        self.assertTrue(self.test_file.undo())
+        self.assertEqual(len(self.test_file.content), 0)
+        self.assertTrue(self.test_file.redo())
+        self.assertEqual(list(self.test_file.content), [str(i) for i in range(10000)])
+    
+    def test_append_after_undo_is_separate(self):
+        """测试撤销或重做之后的追加不与之前的追加合并"""
+        cmd = EditorActions.AppendCommand()
+        cmd.execute('append "a"')
+        cmd.execute('append "b"')
+        self.test_file.undo()
+        self.test_file.redo()
+        cmd.execute('append "c"')
+        cmd.execute('append "d"')
+        
+        self.assertEqual(len(self.test_file.command_history), 2)
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, ["a", "b"])
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, [])
+        self.test_file.redo()
+        self.test_file.redo()
+        self.assertEqual(self.test_file.content, ["a", "b", "c", "d"])
+    
     def test_new_command_clears_redo_stack(self):
         """测试执行新命令清空redo栈"""
         cmd1 = EditorActions.AppendCommand()
@@ -605,6 +640,264 @@ class TestWorkSpaceUndoRedo(TestEditorActionsBase):
         self.assertEqual(self.test_file.content[0], "Test")
 
 
+class TestUndoDelta(TestEditorActionsBase):
+    """测试撤销记录只保存差量"""
+    
+    def test_multiline_insert_undo_redo(self):
+        """测试多行插入的撤销和重做"""
+        self.test_file.content = ["Hello World", "End"]
+        
+        cmd = EditorActions.InsertCommand()
+        cmd.execute('insert 1:6 "\\nNew Line\\nAnother"')
+        self.assertEqual(self.test_file.content, ["Hello", "New Line", "Another World", "End"])
+        
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, ["Hello World", "End"])
+        
+        self.test_file.redo()
+        self.assertEqual(self.test_file.content, ["Hello", "New Line", "Another World", "End"])
+    
+    def test_insert_into_empty_line_undo(self):
+        """测试在空行中插入后撤销，空行保留"""
+        self.test_file.content = ["", "b"]
+        
+        cmd = EditorActions.InsertCommand()
+        cmd.execute('insert 1:1 "a"')
+        self.test_file.undo()
+        
+        self.assertEqual(self.test_file.content, ["", "b"])
+    
+    def test_record_does_not_copy_line(self):
+        """测试撤销记录的大小与行长度无关"""
+        self.test_file.content = ["x" * 100000]
+        
+        cmd = EditorActions.DeleteCommand()
+        cmd.execute('delete 1:10 2')
+        
+        self.assertEqual(self.test_file.command_history[-1].delta.removed, "xx")
+        self.assertLess(self.test_file.history_bytes, 1000)
+    
+    def test_memory_budget_evicts_oldest(self):
+        """测试超出内存预算时丢弃最早的撤销记录"""
+        self.test_file.content = ["0"]
+        size = EditorActions.DeltaRecord(
+            self.test_file, "replace", EditorActions.TextDelta(0, 0, "0", "1")).memory_size()
+        with patch.object(File, "UNDO_MEMORY_BUDGET", size * 3):
+            for i in range(1, 6):
+                EditorActions.ReplaceCommand().execute(f'replace 1:1 1 "{i}"')
+        
+        self.assertEqual(len(self.test_file.command_history), 3)
+        while self.test_file.command_history:
+            self.test_file.undo()
+        self.assertEqual(self.test_file.content, ["2"])
+        self.assertEqual(self.test_file.history_bytes, 0)
+
+
+class TestEditRecord(TestEditorActionsBase):
+    """测试每次执行产生独立的编辑记录"""
+    
+    def test_shared_command_multi_step_undo(self):
+        """测试同一个命令对象多次执行后逐步撤销"""
+        append_cmd = EditorActions.AppendCommand()
+        replace_cmd = EditorActions.ReplaceCommand()
+        
+        append_cmd.execute('append "Line 1"')
+        append_cmd.execute('append "Line 2"')
+        replace_cmd.execute('replace 1:6 1 "A"')
+        replace_cmd.execute('replace 2:6 1 "B"')
+        self.assertEqual(self.test_file.content, ["Line A", "Line B"])
+        
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, ["Line A", "Line 2"])
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, ["Line 1", "Line 2"])
+        # 两次连续追加合并为一条记录
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, [])
+        self.test_file.redo()
+        self.test_file.redo()
+        self.assertEqual(self.test_file.content, ["Line A", "Line 2"])
+    
+    def test_record_is_immutable(self):
+        """测试编辑记录不可修改"""
+        EditorActions.AppendCommand().execute('append "Test"')
+        record = self.test_file.command_history[0]
+        
+        with self.assertRaises(AttributeError):
+            record.text = "other"
+        with self.assertRaises(AttributeError):
+            record.extra = 1
+    
+    def test_record_describe(self):
+        """测试编辑记录还原出的命令文本"""
+        self.test_file.content = ["Hello World"]
+        EditorActions.InsertCommand().execute('insert 1:6 "\\nX"')
+        EditorActions.DeleteCommand().execute('delete 1:1 2')
+        EditorActions.ReplaceCommand().execute('replace 1:1 1 "h"')
+        
+        self.assertEqual([r.describe() for r in self.test_file.command_history],
+                         ['insert 1:6 "\\nX"', 'delete 1:1 2', 'replace 1:1 1 "h"'])
+
+
+class TestBatchEdit(TestEditorActionsBase):
+    """测试批量编辑"""
+    
+    def test_batch_undo_redo_at_once(self):
+        """测试批量编辑一次撤销、一次重做"""
+        self.test_file.content = ["Hello World"]
+        self.test_file.begin()
+        for i in range(100):
+            EditorActions.AppendCommand().execute(f'append "Line {i}"')
+        EditorActions.ReplaceCommand().execute('replace 1:1 5 "Hi"')
+        EditorActions.AppendCommand().execute('append "Last"')
+        self.assertEqual(self.test_file.commit(), 102)
+        
+        self.assertEqual(len(self.test_file.command_history), 1)
+        record = self.test_file.command_history[0]
+        self.assertIsInstance(record, EditorActions.CompoundRecord)
+        self.assertEqual([type(r) for r in record.records],
+                         [EditorActions.AppendLinesRecord, EditorActions.DeltaRecord,
+                          EditorActions.AppendLinesRecord])
+        expected = ["Hi World"] + [f"Line {i}" for i in range(100)] + ["Last"]
+        self.assertEqual(self.test_file.content, expected)
+        
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, ["Hello World"])
+        self.test_file.redo()
+        self.assertEqual(self.test_file.content, expected)
+    
+    def test_undo_during_batch_refused(self):
+        """测试批量编辑未提交时不能撤销"""
+        self.test_file.begin()
+        EditorActions.AppendCommand().execute('append "Line"')
+        
+        self.assertFalse(self.test_file.undo())
+        self.assertEqual(len(self.test_file.content), 1)
+        self.assertFalse(self.test_file.begin())
+    
+    def test_empty_batch(self):
+        """测试空的批量编辑不产生记录"""
+        self.assertIsNone(self.test_file.commit())
+        self.test_file.begin()
+        self.assertEqual(self.test_file.commit(), 0)
+        self.assertEqual(len(self.test_file.command_history), 0)
+    
+    def test_batch_command(self):
+        """测试 batch 命令"""
+        batch_cmd = WorkSpace.BatchCommand()
+        batch_cmd.execute('batch begin')
+        EditorActions.AppendCommand().execute('append "A"')
+        EditorActions.AppendCommand().execute('append "B"')
+        batch_cmd.execute('batch commit')
+        
+        WorkSpace.UndoCommand().execute('undo')
+        self.assertEqual(len(self.test_file.content), 0)
+        self.assertFalse(self.test_file.in_transaction())
+
+
+class TestBlockCommands(TestEditorActionsBase):
+    """测试 append-file / insert-block 一次导入整个文件"""
+    
+    def setUp(self):
+        super().setUp()
+        self.test_dir = tempfile.mkdtemp()
+        self.block_path = os.path.join(self.test_dir, "block file.txt")
+        with open(self.block_path, "w", encoding="utf-8") as f:
+            f.write("".join(f"Block {i}\n" for i in range(1000)))
+        self.block = [f"Block {i}" for i in range(1000)]
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        super().tearDown()
+    
+    def test_append_file_single_record(self):
+        """测试追加整个文件只产生一条撤销记录和一条日志"""
+        self.test_file.content = ["Head"]
+        with patch.object(WorkSpace.WorkSpace.logger, "log_command") as log:
+            result = EditorActions.AppendFileCommand().execute(
+                f'append-file "{self.block_path}"')
+        
+        self.assertTrue(result)
+        self.assertEqual(self.test_file.content, ["Head"] + self.block)
+        self.assertEqual(self.test_file.state, "modified")
+        self.assertEqual(len(self.test_file.command_history), 1)
+        log.assert_called_once_with(self.test_file_path, f'append-file "{self.block_path}"')
+        
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, ["Head"])
+        self.test_file.redo()
+        self.assertEqual(self.test_file.content, ["Head"] + self.block)
+    
+    def test_insert_block(self):
+        """测试在指定行前插入，行号可以是末行的下一行"""
+        self.test_file.content = ["A", "B"]
+        EditorActions.InsertBlockCommand().execute(f'insert-block 2 "{self.block_path}"')
+        self.assertEqual(self.test_file.content, ["A"] + self.block + ["B"])
+        
+        self.test_file.undo()
+        self.assertEqual(self.test_file.content, ["A", "B"])
+        EditorActions.InsertBlockCommand().execute(f'insert-block 3 "{self.block_path}"')
+        self.assertEqual(self.test_file.content, ["A", "B"] + self.block)
+    
+    def test_block_errors(self):
+        """测试行号越界与文件不存在"""
+        self.test_file.content = ["A"]
+        with patch('builtins.print') as mock_print:
+            self.assertFalse(EditorActions.InsertBlockCommand().execute(
+                f'insert-block 3 "{self.block_path}"'))
+            mock_print.assert_called_with("行号越界")
+            self.assertFalse(EditorActions.AppendFileCommand().execute("append-file missing.txt"))
+            mock_print.assert_called_with("无法读取文件")
+        self.assertEqual(self.test_file.content, ["A"])
+        self.assertEqual(len(self.test_file.command_history), 0)
+    
+    def test_block_record_round_trip(self):
+        """测试块记录可以持久化后还原"""
+        self.test_file.content = ["A"]
+        EditorActions.InsertBlockCommand().execute(f'insert-block 1 "{self.block_path}"')
+        record = self.test_file.command_history[0]
+        restored = EditorActions.record_from_value(self.test_file, record.to_value())
+        self.assertEqual((restored.kind, restored.index, restored.lines),
+                         ("insert-block", 0, tuple(self.block)))
+        self.assertEqual(restored.describe(), "insert-block 1 1000 lines")
+
+
+class TestFindCommand(TestEditorActionsBase):
+    """测试 find / find-all 查找命令"""
+    
+    def setUp(self):
+        super().setUp()
+        self.test_file.content = ["Hello World", "say hello", "hello hello"]
+    
+    def test_find_first(self):
+        """测试 find 只输出第一处匹配的行:列"""
+        with patch('builtins.print') as mock_print:
+            result = EditorActions.FindCommand().execute("find hello")
+        self.assertTrue(result)
+        mock_print.assert_called_once_with("2:5: say hello")
+        self.assertEqual(len(self.test_file.command_history), 0)
+    
+    def test_find_all(self):
+        """测试 find-all 输出全部匹配，查找后编辑仍能找到新内容"""
+        with patch('builtins.print') as mock_print:
+            EditorActions.FindAllCommand().execute('find-all "hel+o( |$)"')
+        self.assertEqual([call.args[0] for call in mock_print.call_args_list],
+                         ["2:5: say hello", "3:1: hello hello", "3:7: hello hello", "共 3 处匹配"])
+        
+        EditorActions.InsertCommand().execute('insert 1:1 "hello "')
+        with patch('builtins.print') as mock_print:
+            EditorActions.FindAllCommand().execute("find-all hello")
+        self.assertEqual(mock_print.call_args_list[-1].args[0], "共 4 处匹配")
+    
+    def test_find_errors(self):
+        """测试无匹配与正则表达式错误"""
+        with patch('builtins.print') as mock_print:
+            self.assertTrue(EditorActions.FindCommand().execute("find xyz"))
+            mock_print.assert_called_with("未找到匹配")
+            self.assertFalse(EditorActions.FindCommand().execute('find "(a"'))
+            self.assertTrue(mock_print.call_args.args[0].startswith("正则表达式错误"))
+
+
 def run_tests():
     """运行所有测试"""
     # 创建测试套件
@@ -619,6 +912,11 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestShowCommand))
     suite.addTests(loader.loadTestsFromTestCase(TestUndoRedoIntegration))
     suite.addTests(loader.loadTestsFromTestCase(TestWorkSpaceUndoRedo))
+    suite.addTests(loader.loadTestsFromTestCase(TestUndoDelta))
+    suite.addTests(loader.loadTestsFromTestCase(TestEditRecord))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatchEdit))
+    suite.addTests(loader.loadTestsFromTestCase(TestBlockCommands))
+    suite.addTests(loader.loadTestsFromTestCase(TestFindCommand))
     
     # 运行测试
     runner = unittest.TextTestRunner(verbosity=2)
@@ -1,9 +1,11 @@
 import unittest
 import os
+import gzip
 import shutil
 import sys
 import time
 from datetime import datetime
+from unittest.mock import patch
 
 # 将项目根目录加入路径，确保能导入 src 模块
 # 假设当前文件在 tests/ 目录下，向上两级找到项目根目录
@@ -13,7 +15,8 @@ import WorkSpace
 import Logging
 import File
 
-class TestLoggingSystem(unittest.TestCase):
+class TestLoggingBase(unittest.TestCase):
+    """测试基类 - 准备测试文件并重置 Logger"""
 
     def setUp(self):
         """每个测试开始前的初始化"""
@@ -55,9 +58,13 @@ class TestLoggingSystem(unittest.TestCase):
 
     def tearDown(self):
         """每个测试结束后的清理"""
+        WorkSpace.WorkSpace.logger.close()
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
 
+
+class TestLoggingSystem(TestLoggingBase):
+
     # ==================== 核心功能测试 ====================
 
     def test_filename_generation(self):
@@ -86,6 +93,7 @@ class TestLoggingSystem(unittest.TestCase):
         
         cmd = 'append "Hello World"'
         logger.log_command(self.filepath, cmd)
+        logger.flush()
         
         with open(self.log_filepath, 'r', encoding='utf-8') as f:
             lines = f.readlines()
@@ -147,10 +155,10 @@ class TestLoggingSystem(unittest.TestCase):
         logger.enable_logging(self.filepath)
         logger.log_command(self.filepath, "test_cmd")
         
-        # 直接测试 show_log 方法的返回值
-        content = logger.show_log(self.filepath)
-        self.assertIn("session start at", content)
-        self.assertIn("test_cmd", content)
+        # 直接测试 iter_log 逐行返回的内容
+        lines = list(logger.iter_log(self.filepath))
+        self.assertTrue(lines[0].startswith("session start at"))
+        self.assertTrue(lines[-1].endswith("test_cmd"))
 
     def test_log_on_invalid_file(self):
         """测试 log-on 一个不存在的文件"""
@@ -165,5 +173,288 @@ class TestLoggingSystem(unittest.TestCase):
         sys.stdout = sys.__stdout__ # 恢复 stdout
         self.assertIn("当前文件不存在", captured_output.getvalue())
 
+
+class TestBufferedLogger(TestLoggingBase):
+    """测试日志写缓冲（同步写入模式）"""
+
+    def setUp(self):
+        super().setUp()
+        self._async_patch = patch.object(Logging, "LOG_ASYNC", False)
+        self._async_patch.start()
+
+    def tearDown(self):
+        self._async_patch.stop()
+        super().tearDown()
+
+    def _read_log(self):
+        with open(self.log_filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_entries_buffered_until_flush(self):
+        """日志先进入缓冲，flush 后才写盘"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        logger.log_command(self.filepath, "buffered_cmd")
+        self.assertNotIn("buffered_cmd", self._read_log())
+        logger.flush()
+        self.assertIn("buffered_cmd", self._read_log())
+
+    def test_size_threshold(self):
+        """缓冲达到大小阈值时写盘"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        with patch.object(Logging, "LOG_BUFFER_BYTES", 100):
+            for i in range(10):
+                logger.log_command(self.filepath, f"cmd{i}")
+        self.assertIn("cmd3", self._read_log())
+
+    def test_time_threshold(self):
+        """距上次写盘超过时间阈值时写盘"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        logger.log_command(self.filepath, "first")
+        with patch.object(Logging, "LOG_FLUSH_INTERVAL", 0):
+            logger.log_command(self.filepath, "second")
+        self.assertIn("first", self._read_log())
+        self.assertIn("second", self._read_log())
+
+    def test_log_off_flushes(self):
+        """log-off 时写盘并关闭文件"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        logger.log_command(self.filepath, "before_off")
+        Logging.LogOffCommand().execute("log-off")
+        self.assertIn("before_off", self._read_log())
+        self.assertNotIn(self.filepath, logger._handles)
+
+    def test_timestamp_cached_within_second(self):
+        """同一秒内的日志复用时间戳"""
+        logger = WorkSpace.WorkSpace.logger
+        with patch.object(Logging.time, "time", return_value=1700000000.5):
+            first = logger._timestamp()
+            with patch.object(Logging.datetime, "datetime") as mock_datetime:
+                self.assertEqual(logger._timestamp(), first)
+                mock_datetime.fromtimestamp.assert_not_called()
+
+    def test_write_failure_warns(self):
+        """写入失败时只提示警告"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        logger.close()
+        with patch('builtins.open', side_effect=OSError("磁盘已满")):
+            with patch('builtins.print') as mock_print:
+                logger.log_command(self.filepath, "lost")
+                logger.flush()
+        mock_print.assert_called_with("[Warning] 写入日志失败: 磁盘已满")
+        logger.log_command(self.filepath, "after")
+        logger.flush()
+        self.assertIn("after", self._read_log())
+
+
+
+class TestAsyncLogger(TestLoggingBase):
+    """测试后台线程写日志"""
+
+    def _read_lines(self):
+        with open(self.log_filepath, 'r', encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def _fill_queue(self, policy):
+        """写线程不消费时向容量为 3 的队列写入 5 条日志"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        with patch.object(logger._writer, "_ensure_thread"), \
+                patch.object(Logging, "LOG_QUEUE_SIZE", 3), \
+                patch.object(Logging, "LOG_QUEUE_POLICY", policy):
+            for i in range(5):
+                logger.log_command(self.filepath, f"cmd{i}")
+            stats = logger.stats()
+        logger.flush()
+        return stats, [line.split(" ", 2)[-1] for line in self._read_lines()[1:]]
+
+    def test_entries_written_in_order(self):
+        """日志按顺序写入，flush 时等待队列写完"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        for i in range(1000):
+            logger.log_command(self.filepath, f"cmd{i}")
+        logger.flush()
+        lines = self._read_lines()
+        self.assertIn("session start at", lines[0])
+        self.assertEqual([line.split(" ", 2)[-1] for line in lines[1:]], [f"cmd{i}" for i in range(1000)])
+
+    def test_block_policy_keeps_everything(self):
+        """block 策略下队列满时等待，不丢日志"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        with patch.object(Logging, "LOG_QUEUE_SIZE", 2):
+            for i in range(200):
+                logger.log_command(self.filepath, f"cmd{i}")
+        logger.flush()
+        self.assertEqual(len(self._read_lines()), 201)
+        self.assertEqual(logger.stats()["dropped"], 0)
+
+    def test_drop_policy_counts_dropped(self):
+        """drop 策略丢弃新日志并计数"""
+        stats, entries = self._fill_queue("drop")
+        self.assertEqual(stats, {"queued": 3, "max_queued": 3, "dropped": 2})
+        self.assertEqual(entries, ["cmd0", "cmd1", "cmd2"])
+
+    def test_drop_oldest_policy(self):
+        """drop_oldest 策略丢弃最早的日志"""
+        stats, entries = self._fill_queue("drop_oldest")
+        self.assertEqual(stats["dropped"], 2)
+        self.assertEqual(entries, ["cmd2", "cmd3", "cmd4"])
+
+    def test_close_all_drains_queue(self):
+        """退出时写完队列中的日志"""
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        logger.log_command(self.filepath, "last_cmd")
+        Logging.close_all()
+        self.assertIn("last_cmd", self._read_lines()[-1])
+        self.assertIsNone(logger._writer._thread)
+
+    def test_log_stats_command(self):
+        """log-stats 显示队列统计，不接受参数"""
+        with patch('builtins.print') as mock_print:
+            Logging.LogStatsCommand().execute("log-stats")
+        mock_print.assert_called_with("日志队列: 当前 0 条，峰值 0 条，已丢弃 0 条")
+        with patch('builtins.print') as mock_print:
+            self.assertFalse(Logging.LogStatsCommand().execute("log-stats foo"))
+        mock_print.assert_called_once_with("参数错误，应为：log-stats")
+
+
+
+class TestLogRotation(TestLoggingBase):
+    """测试日志轮转"""
+
+    def setUp(self):
+        super().setUp()
+        self._patches = [
+            patch.object(Logging, "LOG_MAX_BYTES", 200),
+            patch.object(Logging, "LOG_BUFFER_BYTES", 1),
+            patch.object(Logging, "LOG_BACKUP_COUNT", 2),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        WorkSpace.WorkSpace.logger.close()
+        for p in self._patches:
+            p.stop()
+        super().tearDown()
+
+    def _log_many(self, count):
+        logger = WorkSpace.WorkSpace.logger
+        logger.enable_logging(self.filepath)
+        for i in range(count):
+            logger.log_command(self.filepath, f"cmd{i:03d} " + "x" * 20)
+        logger.flush()
+
+    def _read_segment(self, path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def test_rotate_by_size(self):
+        """超过大小上限时轮转，当前日志保持较小"""
+        self._log_many(10)
+        segments = WorkSpace.WorkSpace.logger.log_segments(self.filepath)
+        self.assertEqual(segments, [self.log_filepath + ".2", self.log_filepath + ".1", self.log_filepath])
+        self.assertLessEqual(os.path.getsize(self.log_filepath), 200)
+        text = "".join(self._read_segment(p) for p in segments)
+        self.assertIn("cmd009", text)
+
+    def test_retention_count(self):
+        """只保留指定个数的归档，最早的日志被删除"""
+        self._log_many(50)
+        segments = WorkSpace.WorkSpace.logger.log_segments(self.filepath)
+        self.assertEqual(len(segments), 3)
+        self.assertFalse(os.path.exists(self.log_filepath + ".3"))
+        text = "".join(self._read_segment(p) for p in segments)
+        self.assertNotIn("cmd000", text)
+        self.assertIn("cmd049", text)
+
+    def test_compressed_segments(self):
+        """开启压缩时归档为 gzip"""
+        with patch.object(Logging, "LOG_COMPRESS", True):
+            self._log_many(10)
+        segments = WorkSpace.WorkSpace.logger.log_segments(self.filepath)
+        self.assertTrue(segments[0].endswith(".gz"))
+        self.assertIn("session start at", self._read_segment(segments[0]))
+
+    def test_rotate_per_session(self):
+        """每次会话开始时轮转"""
+        with open(self.log_filepath, 'w', encoding='utf-8') as f:
+            f.write("old session\n")
+        with patch.object(Logging, "LOG_ROTATE_PER_SESSION", True):
+            WorkSpace.WorkSpace.logger.enable_logging(self.filepath)
+        self.assertEqual(self._read_segment(self.log_filepath + ".1"), "old session\n")
+        self.assertIn("session start at", self._read_segment(self.log_filepath))
+        # 当前日志只包含本次会话，旧会话在归档中
+        lines = list(WorkSpace.WorkSpace.logger.iter_log(self.filepath))
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith("session start at"))
+        self.assertEqual(len(WorkSpace.WorkSpace.logger.log_segments(self.filepath)), 2)
+
+
+
+class TestLogShowFilters(TestLoggingBase):
+    """测试 log-show 的 --tail / --since / --grep"""
+
+    def setUp(self):
+        super().setUp()
+        self.lines = ["session start at 20250101 09:00:00"]
+        for minute in range(60):
+            self.lines.append(f"20250101 10:{minute:02d}:00 append \"line{minute}\"")
+        self.lines.append("session start at 20250102 08:00:00")
+        self.lines.append("20250102 08:00:01 undo append \"line59\"")
+        with open(self.log_filepath, 'w', encoding='utf-8') as f:
+            f.write("\n".join(self.lines) + "\n")
+
+    def iter_log(self, **options):
+        return list(WorkSpace.WorkSpace.logger.iter_log(self.filepath, **options))
+
+    def test_tail(self):
+        """--tail 返回最后 N 行"""
+        with patch.object(Logging, "LOG_READ_CHUNK", 16):
+            self.assertEqual(self.iter_log(tail=3), self.lines[-3:])
+            self.assertEqual(self.iter_log(tail=1000), self.lines)
+        self.assertEqual(self.iter_log(tail=0), [])
+
+    def test_since(self):
+        """--since 返回不早于给定时间的行，时间可以只写前缀"""
+        self.assertEqual(self.iter_log(since="20250101 10:58"), self.lines[59:])
+        self.assertEqual(self.iter_log(since="20250102"), self.lines[-2:])
+        self.assertEqual(self.iter_log(since="20250101"), self.lines)
+        self.assertEqual(self.iter_log(since="20260101"), [])
+
+    def test_grep(self):
+        """--grep 按正则表达式过滤，可与 --tail、--since 组合"""
+        self.assertEqual(self.iter_log(grep="line5[0-9]"), self.lines[51:61] + self.lines[-1:])
+        self.assertEqual(self.iter_log(grep="^session", tail=1), [self.lines[-2]])
+        self.assertEqual(self.iter_log(grep="append", since="20250101 10:59"), self.lines[60:61] + self.lines[-1:])
+
+    def test_command_output(self):
+        """命令逐行输出过滤后的日志"""
+        with patch('builtins.print') as mock_print:
+            Logging.LogShowCommand().execute('log-show --since "20250101 10:59" --grep undo')
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        self.assertEqual(printed[1:-1], self.lines[-1:])
+
+    def test_command_errors(self):
+        """参数错误或正则表达式错误时给出提示"""
+        with patch('builtins.print') as mock_print:
+            Logging.LogShowCommand().execute("log-show --tail abc")
+            mock_print.assert_any_call(f"参数错误，应为：{Logging.LogShowCommand.USAGE}")
+        with patch('builtins.print') as mock_print:
+            Logging.LogShowCommand().execute("log-show --grep")
+            mock_print.assert_any_call(f"参数错误，应为：{Logging.LogShowCommand.USAGE}")
+        with patch('builtins.print') as mock_print:
+            Logging.LogShowCommand().execute("log-show --grep (")
+            self.assertTrue(any("正则表达式错误" in str(call.args[0]) for call in mock_print.call_args_list))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
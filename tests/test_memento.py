@@ -0,0 +1,495 @@
+"""
+工作区状态持久化（Memento）单元测试
+"""
+import unittest
+import json
+import os
+import sys
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import File
+import Memento
+import WorkSpace
+import EditorActions
+
+
+class TestMementoBase(unittest.TestCase):
+    """测试基类 - 在临时目录中读写 memento 文件"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.memento_path = os.path.join(self.test_dir, "memento.txt")
+        self.blob_dir = os.path.join(self.test_dir, "blobs")
+        self._patches = [
+            patch.object(Memento, "MEMENTO_FILE", self.memento_path),
+            patch.object(Memento, "BLOB_DIR", self.blob_dir),
+        ]
+        for p in self._patches:
+            p.start()
+        Memento._journal_checked.clear()
+
+        File.FileList.all_files.clear()
+        File.FileList.all_files_path.clear()
+        self.file_obj = File.TextFile("a.txt", content=["line1", "line2"])
+        File.FileList.all_files["a.txt"] = self.file_obj
+        File.FileList.all_files_path.add("a.txt")
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        File.FileList.all_files.clear()
+        File.FileList.all_files_path.clear()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _update(self, path="a.txt"):
+        with patch('builtins.print'):
+            Memento.update(path, {"a.txt": self.file_obj})
+        Memento.flush()
+
+    def _recover(self):
+        with patch('builtins.print'):
+            return Memento.recover()
+
+    def _recovered_content(self, index=0):
+        with patch('builtins.print'):
+            return Memento.load_blob(self._recover()["all_files"][index]["hash"])
+
+
+class TestMementoJournal(TestMementoBase):
+    """测试逐行追加的快照日志"""
+
+    def test_update_appends_one_line_per_snapshot(self):
+        """每次 update 追加一行记录"""
+        self._update()
+        self._update()
+        with open(self.memento_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[-1])["current_workFile_path"], "a.txt")
+
+    def test_recover_returns_last_record(self):
+        """恢复最后一条记录"""
+        self._update("a.txt")
+        self.file_obj.content.append("line3")
+        self._update("")
+        state = self._recover()
+        self.assertEqual(state["current_workFile_path"], "")
+        self.assertEqual(self._recovered_content(), ["line1", "line2", "line3"])
+
+    def test_recover_skips_torn_last_record(self):
+        """最后一条记录写入中断时回退到上一条完整记录"""
+        self._update("a.txt")
+        with open(self.memento_path, "a", encoding="utf-8") as f:
+            f.write('{"current_workFile_path": "b.t')
+        state = self._recover()
+        self.assertEqual(state["current_workFile_path"], "a.txt")
+
+    def test_append_after_torn_record(self):
+        """残缺行之后追加的新记录仍然可以恢复"""
+        self._update("a.txt")
+        with open(self.memento_path, "a", encoding="utf-8") as f:
+            f.write('{"current_workFile_path": "b.t')
+        Memento._journal_checked.clear()
+        self._update("")
+        self.assertEqual(self._recover()["current_workFile_path"], "")
+
+    def test_recover_without_file(self):
+        """没有状态文件时返回 None"""
+        self.assertIsNone(self._recover())
+
+    def test_legacy_json_list_is_migrated(self):
+        """旧版整体 JSON 数组可以恢复，并在下次写入时转换为日志格式"""
+        legacy = [{"current_workFile_path": "old.txt", "all_files": []}]
+        with open(self.memento_path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f, ensure_ascii=False, indent=2)
+
+        self.assertEqual(self._recover()["current_workFile_path"], "old.txt")
+
+        self._update("a.txt")
+        with open(self.memento_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])["current_workFile_path"], "old.txt")
+        self.assertEqual(self._recover()["current_workFile_path"], "a.txt")
+
+
+class TestMementoBlobStore(TestMementoBase):
+    """测试按内容哈希去重的文件内容存储"""
+
+    def test_snapshot_references_hash_not_content(self):
+        """快照记录中只保存内容哈希"""
+        self._update()
+        with open(self.memento_path, encoding="utf-8") as f:
+            record = json.loads(f.readline())
+        entry = record["all_files"][0]
+        self.assertNotIn("content", entry)
+        self.assertEqual(Memento.load_blob(entry["hash"]), ["line1", "line2"])
+
+    def test_unchanged_content_is_stored_once(self):
+        """内容未变化时不重复写入内容块"""
+        self._update()
+        self._update()
+        self.assertEqual(len(os.listdir(self.blob_dir)), 1)
+
+        self.file_obj.content.append("line3")
+        self._update()
+        self.assertEqual(len(os.listdir(self.blob_dir)), 2)
+
+    def test_empty_line_round_trip(self):
+        """空文件与只含一个空行的文件可以区分"""
+        self.assertEqual(Memento.load_blob(Memento._store_blob([])), [])
+        self.assertEqual(Memento.load_blob(Memento._store_blob([""])), [""])
+
+    def test_missing_blob_recovers_empty_content(self):
+        """内容块丢失时提示警告并恢复为空内容"""
+        self._update()
+        shutil.rmtree(self.blob_dir)
+        Memento._known_blobs.clear()
+        self.assertEqual(self._recovered_content(), [])
+
+
+class TestMementoWriter(TestMementoBase):
+    """测试后台合并写入"""
+
+    def test_burst_of_updates_is_coalesced(self):
+        """短时间内的多次 update 合并为一次写入"""
+        with patch.object(Memento, "FLUSH_INTERVAL", 60):
+            with patch('builtins.print'):
+                for i in range(5):
+                    self.file_obj.content.append(f"burst {i}")
+                    Memento.update("a.txt", {"a.txt": self.file_obj})
+            Memento.flush()
+
+        with open(self.memento_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(self._recovered_content()[-1], "burst 4")
+
+    def test_snapshot_is_taken_at_update_time(self):
+        """写盘前对文件的修改不会混入已提交的快照"""
+        with patch.object(Memento, "FLUSH_INTERVAL", 60):
+            self._update_no_flush()
+            self.file_obj.content.append("later")
+            Memento.flush()
+        self.assertEqual(self._recovered_content(), ["line1", "line2"])
+
+    def test_interval_flush_without_explicit_flush(self):
+        """超过 FLUSH_INTERVAL 后自动落盘"""
+        with patch.object(Memento, "FLUSH_INTERVAL", 0.01):
+            self._update_no_flush()
+            for _ in range(200):
+                if os.path.exists(self.memento_path) and os.path.getsize(self.memento_path):
+                    break
+                time.sleep(0.01)
+        Memento.flush()
+        self.assertTrue(os.path.getsize(self.memento_path) > 0)
+
+    def test_sync_mode(self):
+        """关闭后台写入时 update 直接写盘"""
+        with patch.object(Memento, "ASYNC_WRITE", False):
+            self._update_no_flush()
+        self.assertTrue(os.path.exists(self.memento_path))
+
+    def test_unchanged_file_is_not_copied(self):
+        """未修改的文件不再复制内容：写入前共用同一份行列表，写入后只引用内容块哈希"""
+        first = Memento._capture_file(self.file_obj)
+        second = Memento._capture_file(self.file_obj)
+        self.assertIs(first["content"], second["content"])
+
+        self._update()
+        entry = Memento._capture_file(self.file_obj)
+        self.assertNotIn("content", entry)
+        self.assertEqual(Memento.load_blob(entry["hash"]), ["line1", "line2"])
+
+        self.file_obj.content.append("line3")
+        self.assertEqual(Memento._capture_file(self.file_obj)["content"], ["line1", "line2", "line3"])
+        # 整体替换内容后版本号重新计数，也要重新复制
+        self._update()
+        self.file_obj.content = ["other"]
+        self.assertEqual(Memento._capture_file(self.file_obj)["content"], ["other"])
+
+    def _update_no_flush(self):
+        with patch('builtins.print'):
+            Memento.update("a.txt", {"a.txt": self.file_obj})
+
+
+class TestMementoCompact(TestMementoBase):
+    """测试快照保留与压缩"""
+
+    def _write_records(self, timestamps):
+        with open(self.memento_path, "w", encoding="utf-8") as f:
+            for i, ts in enumerate(timestamps):
+                blob = Memento._store_blob([f"v{i}"])
+                state = {
+                    "timestamp": ts,
+                    "current_workFile_path": f"f{i}.txt",
+                    "current_workFile_list": {},
+                    "all_files": [{"fileName": "a.txt", "filePath": "a.txt", "hash": blob, "state": "normal"}],
+                }
+                f.write(json.dumps(state) + "\n")
+
+    def _paths(self):
+        with open(self.memento_path, encoding="utf-8") as f:
+            return [json.loads(line)["current_workFile_path"] for line in f]
+
+    def test_keep_last_n(self):
+        """只保留最近 N 条快照"""
+        self._write_records([f"2025-01-01 10:00:0{i}" for i in range(5)])
+        self.assertEqual(Memento.compact(keep_last=2), (5, 2))
+        self.assertEqual(self._paths(), ["f3.txt", "f4.txt"])
+        self.assertEqual(self._recover()["current_workFile_path"], "f4.txt")
+
+    def test_daily_bucket(self):
+        """每天保留最后一条快照"""
+        self._write_records([
+            "2025-01-01 09:00:00", "2025-01-01 18:00:00",
+            "2025-01-02 09:00:00", "2025-01-02 18:00:00",
+            "2025-01-03 09:00:00",
+        ])
+        Memento.compact(keep_last=1, bucket="daily")
+        self.assertEqual(self._paths(), ["f1.txt", "f3.txt", "f4.txt"])
+
+    def test_unreferenced_blobs_are_removed(self):
+        """被丢弃快照独占的内容块会被删除"""
+        self._write_records([f"2025-01-01 10:00:0{i}" for i in range(3)])
+        self.assertEqual(len(os.listdir(self.blob_dir)), 3)
+        Memento.compact(keep_last=1)
+        self.assertEqual(len(os.listdir(self.blob_dir)), 1)
+        self.assertEqual(self._recovered_content(), ["v2"])
+
+    def test_auto_compact_only_above_threshold(self):
+        """启动时只有超过大小阈值才压缩"""
+        self._write_records([f"2025-01-01 10:00:0{i}" for i in range(5)])
+        with patch.object(Memento, "RETENTION_KEEP_LAST", 1):
+            Memento.auto_compact()
+            self.assertEqual(len(self._paths()), 5)
+            with patch.object(Memento, "AUTO_COMPACT_BYTES", 0):
+                Memento.auto_compact()
+        self.assertEqual(self._paths(), ["f4.txt"])
+
+    def test_compact_command(self):
+        """memento-compact 命令"""
+        self._write_records([f"2025-01-01 10:00:0{i}" for i in range(4)])
+        with patch('builtins.print') as mock_print:
+            Memento.MementoCompactCommand().execute("memento-compact 3")
+            mock_print.assert_called_with("工作区状态已压缩: 4 -> 3 条快照")
+            Memento.MementoCompactCommand().execute("memento-compact weekly")
+            mock_print.assert_called_with("参数错误，应为：memento-compact [N] [hourly|daily]")
+
+
+class TestMementoSerializer(TestMementoBase):
+    """测试可切换的快照编码格式"""
+
+    def setUp(self):
+        super().setUp()
+        self.bin_path = os.path.join(self.test_dir, "memento.bin")
+
+    def test_value_codec_round_trip(self):
+        """二进制编码支持快照中出现的所有类型"""
+        value = {"s": "中文", "i": -3, "n": None, "b": [True, False], "d": {"x": []}}
+        decoded, _ = Memento._decode_value(memoryview(Memento._encode_value(value)), 0)
+        self.assertEqual(decoded, value)
+
+    def test_binary_round_trip(self):
+        """二进制格式写入 .bin 文件并可以恢复"""
+        for name in ("binary", "binary-zlib"):
+            with patch.object(Memento, "SERIALIZER", name):
+                self._update(name + ".txt")
+                self.assertEqual(self._recover()["current_workFile_path"], name + ".txt")
+                self.assertEqual(self._recovered_content(), ["line1", "line2"])
+        self.assertFalse(os.path.exists(self.memento_path))
+
+    def test_binary_torn_tail_is_skipped_and_truncated(self):
+        """二进制记录写入中断时回退到上一条，下次写入前截掉残缺数据"""
+        with patch.object(Memento, "SERIALIZER", "binary"):
+            self._update("a.txt")
+            size = os.path.getsize(self.bin_path)
+            with open(self.bin_path, "ab") as f:
+                f.write(b"\x00\x00\x00\x10{")
+            self.assertEqual(self._recover()["current_workFile_path"], "a.txt")
+
+            Memento._journal_checked.clear()
+            self._update("")
+            self.assertEqual(self._recover()["current_workFile_path"], "")
+            Memento.compact(keep_last=5)
+        with open(self.bin_path, "rb") as f:
+            records = list(Memento._SERIALIZERS["binary"].iter_records(f))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(len(records[0][0]), size)
+
+    def test_json_history_is_migrated_to_binary(self):
+        """切换到二进制格式后可以读取并迁移已有的 JSON 快照"""
+        self._update("old.txt")
+        with patch.object(Memento, "SERIALIZER", "binary-zlib"):
+            self.assertEqual(self._recover()["current_workFile_path"], "old.txt")
+            self._update("new.txt")
+            self.assertEqual(Memento.compact(keep_last=5), (2, 2))
+            self.assertEqual(self._recover()["current_workFile_path"], "new.txt")
+
+    def test_unknown_serializer(self):
+        """未知格式报错"""
+        with patch.object(Memento, "SERIALIZER", "xml"):
+            with self.assertRaises(ValueError):
+                Memento.compact()
+
+
+class TestLazyRecover(TestMementoBase):
+    """测试工作区延迟恢复文件内容"""
+
+    def setUp(self):
+        super().setUp()
+        self.other = File.TextFile("b.txt", content=["other"])
+        File.FileList.all_files["b.txt"] = self.other
+        File.FileList.all_files_path.add("b.txt")
+        with patch('builtins.print'):
+            Memento.update("a.txt", {"a.txt": self.file_obj, "b.txt": self.other})
+        Memento.flush()
+
+    def tearDown(self):
+        WorkSpace.WorkSpace.current_workFile_path = ""
+        WorkSpace.WorkSpace.current_workFile_list = {}
+        WorkSpace.WorkSpace.recent_files = []
+        super().tearDown()
+
+    def _recover_workspace(self):
+        with patch('builtins.print'):
+            WorkSpace.WorkSpace.recover()
+
+    def test_only_active_file_is_loaded(self):
+        """只有当前活动文件在启动时加载内容"""
+        self._recover_workspace()
+        self.assertTrue(File.FileList.all_files["a.txt"].is_loaded())
+        self.assertFalse(File.FileList.all_files["b.txt"].is_loaded())
+        self.assertEqual(WorkSpace.WorkSpace.recent_files, ["b.txt", "a.txt"])
+
+    def test_content_loads_on_first_access(self):
+        """第一次访问 content 时读取内容"""
+        self._recover_workspace()
+        other = File.FileList.all_files["b.txt"]
+        self.assertEqual(other.content, ["other"])
+        self.assertTrue(other.is_loaded())
+
+    def test_snapshot_of_unloaded_file_reuses_hash(self):
+        """未加载的文件保存快照时不读取内容，直接引用原内容块"""
+        self._recover_workspace()
+        other = File.FileList.all_files["b.txt"]
+        with patch('builtins.print'):
+            Memento.update("a.txt", WorkSpace.WorkSpace.current_workFile_list)
+        Memento.flush()
+        self.assertFalse(other.is_loaded())
+        self.assertEqual(self._recovered_content(1), ["other"])
+
+
+class TestPersistentUndo(TestMementoBase):
+    """测试撤销历史跨会话保存"""
+
+    def setUp(self):
+        super().setUp()
+        self.undo_dir = os.path.join(self.test_dir, "undo")
+        self._patches += [
+            patch.object(Memento, "UNDO_DIR", self.undo_dir),
+            patch.object(Memento, "PERSIST_UNDO", True),
+        ]
+        for p in self._patches[-2:]:
+            p.start()
+        WorkSpace.WorkSpace.current_workFile_path = "a.txt"
+        WorkSpace.WorkSpace.current_workFile_list = {"a.txt": self.file_obj}
+
+    def tearDown(self):
+        WorkSpace.WorkSpace.current_workFile_path = ""
+        WorkSpace.WorkSpace.current_workFile_list = {}
+        WorkSpace.WorkSpace.recent_files = []
+        super().tearDown()
+
+    def _edit(self, command, text):
+        with patch('builtins.print'):
+            command.execute(text)
+
+    def _restart(self):
+        """保存快照后重新恢复工作区，返回恢复后的 a.txt"""
+        self._update()
+        with patch('builtins.print'):
+            WorkSpace.WorkSpace.recover()
+        return File.FileList.all_files["a.txt"]
+
+    def test_undo_after_restart(self):
+        """重启后仍可撤销上次会话的编辑"""
+        self._edit(EditorActions.AppendCommand(), 'append "line3"')
+        self._edit(EditorActions.ReplaceCommand(), 'replace 1:1 4 "LINE"')
+        tf = self._restart()
+        self.assertEqual(len(tf.command_history), 0)
+        with patch('builtins.print'):
+            tf.undo()
+            self.assertEqual(tf.content, ["line1", "line2", "line3"])
+            tf.undo()
+            self.assertEqual(tf.content, ["line1", "line2"])
+            tf.redo()
+        self.assertEqual(tf.content, ["line1", "line2", "line3"])
+
+    def test_history_is_loaded_lazily(self):
+        """恢复时不读取撤销日志"""
+        self._edit(EditorActions.AppendCommand(), 'append "line3"')
+        self._update()
+        with patch.object(Memento, "load_undo_log", wraps=Memento.load_undo_log) as mock_load:
+            tf = self._restart()
+            mock_load.assert_not_called()
+            with patch('builtins.print'):
+                tf.undo()
+            mock_load.assert_called_once()
+
+    def test_new_edits_stack_on_persisted_history(self):
+        """重启后的新编辑排在持久化的记录之后"""
+        self._edit(EditorActions.AppendCommand(), 'append "line3"')
+        tf = self._restart()
+        self.file_obj = tf
+        WorkSpace.WorkSpace.current_workFile_list = {"a.txt": tf}
+        self._edit(EditorActions.AppendCommand(), 'append "line4"')
+        tf = self._restart()
+        with patch('builtins.print'):
+            tf.undo()
+            tf.undo()
+        self.assertEqual(tf.content, ["line1", "line2"])
+
+    def test_log_is_truncated(self):
+        """撤销日志只保存最近的记录"""
+        for i in range(5):
+            self._edit(EditorActions.ReplaceCommand(), f'replace 1:1 1 "{i}"')
+        with patch.object(Memento, "UNDO_LOG_LIMIT", 2):
+            tf = self._restart()
+        with patch('builtins.print'):
+            self.assertTrue(tf.undo())
+            self.assertTrue(tf.undo())
+            self.assertFalse(tf.undo())
+        self.assertEqual(tf.content, ["2ine1", "line2"])
+
+    def test_unchanged_history_is_not_converted(self):
+        """只转换要写入的最近记录；历史未变化时快照不再转换"""
+        for i in range(5):
+            self._edit(EditorActions.ReplaceCommand(), f'replace 1:1 1 "{i}"')
+        with patch.object(Memento, "UNDO_LOG_LIMIT", 2):
+            with patch.object(EditorActions.DeltaRecord, "to_value", autospec=True,
+                              side_effect=EditorActions.DeltaRecord.to_value) as mock_value:
+                self._update()
+                self.assertEqual(mock_value.call_count, 2)
+                self._update()
+                self.assertEqual(mock_value.call_count, 2)
+                with patch('builtins.print'):
+                    self.file_obj.undo()
+                self._update()
+                self.assertEqual(mock_value.call_count, 5)
+
+    def test_mismatched_log_is_ignored(self):
+        """日志对应的内容与恢复的内容不一致时忽略"""
+        self._edit(EditorActions.AppendCommand(), 'append "line3"')
+        self._update()
+        self.assertIsNone(Memento.load_undo_log("a.txt", "0" * 64))
+        self.assertIsNotNone(Memento.load_undo_log("a.txt", self._recover()["all_files"][0]["hash"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,256 @@
+"""
+日志重放（replay）的单元测试
+"""
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import File
+import CommonUtils
+import Memento
+import WorkSpace
+import EditorActions
+import Logging
+import Replay
+
+
+class TestReplay(unittest.TestCase):
+    """测试由日志重建文件内容"""
+
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.test_dir = tempfile.mkdtemp()
+        os.chdir(self.test_dir)
+        self._patches = [
+            patch.object(CommonUtils, "rootpath", self.test_dir),
+            patch.object(WorkSpace.WorkSpace, "logger", Logging.Logger()),
+        ]
+        for p in self._patches:
+            p.start()
+        self.reset_workspace()
+
+    def tearDown(self):
+        WorkSpace.WorkSpace.logger.close()
+        Memento.flush()
+        self.reset_workspace()
+        for p in self._patches:
+            p.stop()
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def reset_workspace(self):
+        WorkSpace.WorkSpace.current_workFile_path = ""
+        WorkSpace.WorkSpace.current_workFile_list = {}
+        WorkSpace.WorkSpace.recent_files = []
+        File.FileList.all_files.clear()
+        File.FileList.all_files_path.clear()
+
+    def run_commands(self, commands):
+        factory = {
+            "init": WorkSpace.InitCommand(),
+            "load": WorkSpace.LoadCommand(),
+            "append": EditorActions.AppendCommand(),
+            "insert": EditorActions.InsertCommand(),
+            "delete": EditorActions.DeleteCommand(),
+            "replace": EditorActions.ReplaceCommand(),
+            "append-file": EditorActions.AppendFileCommand(),
+            "insert-block": EditorActions.InsertBlockCommand(),
+            "undo": WorkSpace.UndoCommand(),
+            "redo": WorkSpace.RedoCommand(),
+            "batch": WorkSpace.BatchCommand(),
+            "log-on": Logging.LogOnCommand(),
+        }
+        with patch('builtins.print'):
+            for command in commands:
+                factory[command.split(" ")[0]].execute(command)
+
+    def replay(self, command):
+        with patch('builtins.print') as mock_print:
+            Replay.ReplayCommand().execute(command)
+        return [str(call.args[0]) for call in mock_print.call_args_list]
+
+    def write_log(self, lines):
+        with open(".a.txt.log", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def test_rebuild_from_log(self):
+        """重放日志得到与编辑结果相同的内容，包括 undo/redo 与批量编辑"""
+        self.run_commands([
+            "init a.txt with-log",
+            'append "hello world"',
+            'append "second"',
+            'insert 1:6 ","',
+            "delete 2:1 3",
+            'replace 1:1 5 "HELLO"',
+            "undo",
+            "redo",
+            'insert 2:1 "a\\nb"',
+            "undo",
+            "batch begin",
+            'append "x"',
+            'append "y"',
+            "delete 1:1 1",
+            "batch commit",
+            "undo",
+            'append "last"',
+        ])
+        tf = File.FileList.all_files["a.txt"]
+        expected = list(tf.content)
+        tf.content = ["garbage"]
+
+        output = self.replay("replay a.txt")
+        self.assertEqual(list(tf.content), expected)
+        self.assertIn("重放完成: 17 条命令", output[-1])
+        self.assertEqual(len(tf.command_history), 0)
+        self.assertEqual(tf.state, "modified")
+
+    def test_insert_into_empty_file_is_logged(self):
+        """在空文件中 insert 1:1 也写入日志，从空内容重放能得到完整内容"""
+        self.run_commands([
+            "init a.txt",
+            "log-on",
+            'insert 1:1 "hello"',
+            'append "world"',
+        ])
+        tf = File.FileList.all_files["a.txt"]
+        self.assertEqual(list(tf.content), ["hello", "world"])
+        open("empty.txt", "w").close()
+        tf.content = []
+        self.replay("replay a.txt --base empty.txt")
+        self.assertEqual(list(tf.content), ["hello", "world"])
+
+    def test_coalesced_appends(self):
+        """连续追加在编辑器与重放中按同样的规则合并，撤销结果一致；新会话不与之前的追加合并"""
+        self.run_commands([
+            "init a.txt with-log",
+            'append "a"',
+            'append "b"',
+            "undo",
+            'append "c"',
+            'replace 2:1 1 "C"',
+            'append "d"',
+            'append "e"',
+            "undo",
+        ])
+        tf = File.FileList.all_files["a.txt"]
+        expected = list(tf.content)
+        self.assertEqual(expected, ["# log", "C"])
+        tf.content = ["garbage"]
+        self.replay("replay a.txt")
+        self.assertEqual(list(tf.content), expected)
+
+        self.write_log([
+            "session start at 20250101 09:59:00",
+            "20250101 09:59:00 init a.txt",
+            '20250101 10:00:00 append "a"',
+            '20250101 10:00:01 append "b"',
+            "session start at 20250101 11:00:00",
+            '20250101 11:00:00 append "c"',
+            "20250101 11:00:01 undo",
+        ])
+        tf.content = []
+        self.replay("replay a.txt")
+        self.assertEqual(list(tf.content), ["a", "b"])
+
+    def test_time_range(self):
+        """--from/--to 只重放该时间段内的命令"""
+        self.run_commands(["init a.txt"])
+        self.write_log([
+            "session start at 20250101 09:00:00",
+            "20250101 09:00:00 init a.txt",
+            '20250101 09:00:01 append "a"',
+            '20250101 10:00:00 append "b"',
+            '20250101 10:30:00 append "c"',
+            '20250101 11:00:00 append "d"',
+        ])
+        self.replay('replay a.txt --to "20250101 10:30"')
+        self.assertEqual(list(File.FileList.all_files["a.txt"].content), ["a", "b", "c"])
+
+        # 跳过了 init，需要指定 --from 时刻的内容
+        output = self.replay('replay a.txt --from "20250101 10" --to "20250101 10:30"')
+        self.assertIn("初始内容未知", output[-1])
+        with open("base.txt", "w", encoding="utf-8") as f:
+            f.write("a\n")
+        self.replay('replay a.txt --from "20250101 10" --to "20250101 10:30" --base base.txt')
+        self.assertEqual(list(File.FileList.all_files["a.txt"].content), ["a", "b", "c"])
+
+    def test_reads_rotated_segments(self):
+        """按时间顺序读取已轮转的归档"""
+        self.run_commands(["init a.txt"])
+        with open(".a.txt.log.1", "w", encoding="utf-8") as f:
+            f.write('20250101 09:00:00 init a.txt\n20250101 09:00:01 append "a"\n')
+        self.write_log(['20250101 10:00:00 append "b"'])
+        self.replay("replay a.txt")
+        self.assertEqual(list(File.FileList.all_files["a.txt"].content), ["a", "b"])
+
+    def test_stops_on_inconsistent_log(self):
+        """命令无法应用时中止并提示，文件内容与撤销历史保持不变"""
+        self.run_commands(["init a.txt", 'append "x"'])
+        self.write_log([
+            "20250101 10:00:00 init a.txt",
+            '20250101 10:00:00 append "a"',
+            "20250101 10:00:01 delete 5:1 1",
+            '20250101 10:00:02 append "b"',
+        ])
+        output = self.replay("replay a.txt")
+        self.assertTrue(output[-1].startswith("重放中止，第 3 条命令无法应用，文件内容未改变"))
+        self.assertIn("行号越界", output[-1])
+        tf = File.FileList.all_files["a.txt"]
+        self.assertEqual(list(tf.content), ["x"])
+        self.assertEqual(len(tf.command_history), 1)
+
+    def test_log_starting_with_load(self):
+        """日志从 load 开始时载入前的内容未知，不在当前内容上重复应用编辑；用 --base 指定后正常重放"""
+        with open("a.txt", "w", encoding="utf-8") as f:
+            f.write("# log\nold\n")
+        self.run_commands(["load a.txt", 'append "one"', 'append "two"'])
+        tf = File.FileList.all_files["a.txt"]
+        expected = ["# log", "old", "one", "two"]
+        self.assertEqual(list(tf.content), expected)
+
+        output = self.replay("replay a.txt")
+        self.assertTrue(output[-1].startswith("重放中止，第 1 条命令无法应用"))
+        self.assertIn("--base", output[-1])
+        self.assertEqual(list(tf.content), expected)
+        self.assertEqual(len(tf.command_history), 1)
+
+        # 磁盘上的文件尚未保存，仍是载入时的内容
+        self.replay("replay a.txt --base a.txt")
+        self.assertEqual(list(tf.content), expected)
+        self.assertEqual(self.replay("replay a.txt --base missing.txt"), ["无法读取文件 missing.txt"])
+
+    def test_block_commands(self):
+        """append-file/insert-block 重放时重新读取日志中记录的文件"""
+        with open("block.txt", "w", encoding="utf-8") as f:
+            f.write("x\ny\n")
+        self.run_commands([
+            "init a.txt with-log",
+            "append-file block.txt",
+            'append "z"',
+            "insert-block 2 block.txt",
+            "undo",
+        ])
+        tf = File.FileList.all_files["a.txt"]
+        expected = list(tf.content)
+        self.assertEqual(expected, ["# log", "x", "y", "z"])
+        self.replay("replay a.txt")
+        self.assertEqual(list(tf.content), expected)
+
+        os.remove("block.txt")
+        output = self.replay("replay a.txt")
+        self.assertIn("无法读取文件 block.txt", output[-1])
+
+    def test_argument_errors(self):
+        """参数错误与文件不存在"""
+        self.assertEqual(self.replay("replay"), [f"参数错误，应为：{Replay.ReplayCommand.USAGE}"])
+        self.assertEqual(self.replay("replay a.txt --since x"), [f"参数错误，应为：{Replay.ReplayCommand.USAGE}"])
+        self.assertEqual(self.replay("replay missing.txt"), ["当前文件不存在"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+脚本模式（Run.py --script）的单元测试
+"""
+import unittest
+import io
+import os
+import sys
+import shutil
+import tempfile
+import contextlib
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import File
+import CommonUtils
+import Memento
+import WorkSpace
+import Logging
+import Run
+
+
+class TestScriptMode(unittest.TestCase):
+    """测试按行执行命令文件"""
+
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.test_dir = tempfile.mkdtemp()
+        os.chdir(self.test_dir)
+        self._patches = [
+            patch.object(CommonUtils, "rootpath", self.test_dir),
+            patch.object(WorkSpace.WorkSpace, "logger", Logging.Logger()),
+            patch.object(WorkSpace.WorkSpace, "interactive", True),
+        ]
+        for p in self._patches:
+            p.start()
+        self.reset_workspace()
+
+    def tearDown(self):
+        WorkSpace.WorkSpace.logger.close()
+        Memento.flush()
+        self.reset_workspace()
+        for p in self._patches:
+            p.stop()
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def reset_workspace(self):
+        WorkSpace.WorkSpace.current_workFile_path = ""
+        WorkSpace.WorkSpace.current_workFile_list = {}
+        WorkSpace.WorkSpace.recent_files = []
+        File.FileList.all_files.clear()
+        File.FileList.all_files_path.clear()
+
+    def run_script(self, lines, quiet=False):
+        with open("cmds.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            Run.run_script(Run.CommandFactory(), "cmds.txt", quiet)
+        return output.getvalue().splitlines()
+
+    def test_runs_commands(self):
+        """逐行执行命令，跳过空行与注释，exit 之后的命令不执行"""
+        output = self.run_script([
+            "# 注释",
+            "init a.txt",
+            'append "one"',
+            "",
+            'append "two"',
+            "exit",
+            'append "three"',
+        ])
+        self.assertEqual(list(File.FileList.all_files["a.txt"].content), ["one", "two"])
+        self.assertIn("追加成功", output)
+        self.assertTrue(output[-1].startswith("脚本执行完成: 4 条命令，失败 0 条"))
+
+    def test_operator_followed_by_quote(self):
+        """命令名后直接跟引号或制表符时同样找到命令"""
+        output = self.run_script(["init a.txt", 'append"one"', 'append\t"two"'])
+        self.assertEqual(list(File.FileList.all_files["a.txt"].content), ["one", "two"])
+        self.assertTrue(output[-1].startswith("脚本执行完成: 3 条命令，失败 0 条"))
+
+    def test_quiet(self):
+        """quiet 模式只输出结束时的统计"""
+        output = self.run_script(["init a.txt", 'append "one"', "bogus"], quiet=True)
+        self.assertEqual(len(output), 1)
+        self.assertTrue(output[0].startswith("脚本执行完成: 3 条命令，失败 1 条"))
+
+    def test_counts_failures(self):
+        """参数错误、不支持的操作与无法执行的命令计为失败，失败后继续执行"""
+        output = self.run_script([
+            "init a.txt",
+            'append "one"',
+            "delete 9:1 1",
+            "append",
+            "bogus",
+            "undo",
+            "undo",
+            "edit missing.txt",
+            'append "two"',
+        ])
+        self.assertEqual(list(File.FileList.all_files["a.txt"].content), ["two"])
+        self.assertTrue(output[-1].startswith("脚本执行完成: 9 条命令，失败 5 条"))
+
+    def test_read_only_commands_succeed(self):
+        """show、find、find-all 不进入撤销历史，但执行成功，不计为失败"""
+        output = self.run_script([
+            "init a.txt",
+            'append "hello world"',
+            "show",
+            "find hello",
+            "find-all o",
+            "find xyz",
+            "save",
+        ])
+        self.assertIn("1: hello world", output)
+        self.assertTrue(output[-1].startswith("脚本执行完成: 7 条命令，失败 0 条"))
+        self.assertEqual(len(File.FileList.all_files["a.txt"].command_history), 1)
+
+    def test_exit_status(self):
+        """脚本中有命令失败时 main 返回非零退出状态"""
+        with open("ok.txt", "w", encoding="utf-8") as f:
+            f.write('init a.txt\nappend "one"\n')
+        with open("bad.txt", "w", encoding="utf-8") as f:
+            f.write('init b.txt\nbogus\n')
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(Run.main(["--script", "ok.txt", "--quiet"]), 0)
+            self.reset_workspace()
+            self.assertEqual(Run.main(["--script", "bad.txt", "--quiet"]), 1)
+            self.assertEqual(Run.main(["--script", "missing.txt"]), 1)
+        self.assertIn("失败 1 条", output.getvalue())
+
+    def test_prompt_uses_default(self):
+        """需要确认的提示不等待输入，close 默认不保存"""
+        with patch('builtins.input', side_effect=AssertionError("不应等待输入")):
+            output = self.run_script(["init a.txt", 'append "one"', "close"])
+        self.assertIn("文件已修改，是否保存文件？(y/n)n", output)
+        self.assertNotIn("a.txt", WorkSpace.WorkSpace.current_workFile_list)
+        self.assertFalse(os.path.exists("a.txt"))
+
+
+if __name__ == '__main__':
+    unittest.main()
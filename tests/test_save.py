@@ -0,0 +1,308 @@
+"""
+保存文件（save）的单元测试
+"""
+import unittest
+import os
+import re
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import File
+import CommonUtils
+import Memento
+import TextBuffer
+import WorkSpace
+
+
+class TestSaveBase(unittest.TestCase):
+    """测试基类 - 在临时目录中保存文件"""
+
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.test_dir = tempfile.mkdtemp()
+        os.chdir(self.test_dir)
+        self._patches = [patch.object(CommonUtils, "rootpath", self.test_dir)]
+        for p in self._patches:
+            p.start()
+        self.reset_workspace()
+
+    def tearDown(self):
+        Memento.flush()
+        self.reset_workspace()
+        for p in self._patches:
+            p.stop()
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def reset_workspace(self):
+        WorkSpace.WorkSpace.current_workFile_path = ""
+        WorkSpace.WorkSpace.current_workFile_list = {}
+        WorkSpace.WorkSpace.recent_files = []
+        File.FileList.all_files.clear()
+        File.FileList.all_files_path.clear()
+
+    def open_file(self, path, content, state="modified"):
+        tf = File.TextFile(path, content=content)
+        tf.state = state
+        File.FileList.all_files[path] = tf
+        File.FileList.all_files_path.add(path)
+        WorkSpace.WorkSpace.current_workFile_list[path] = tf
+        WorkSpace.WorkSpace.current_workFile_path = path
+        return tf
+
+    def read(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+
+class TestWriteLinesAtomic(TestSaveBase):
+    """测试分块原子写入"""
+
+    def test_writes_lines_across_chunks(self):
+        """跨越多个分块时内容完整，每行以换行结尾"""
+        lines = [f"line {i}" for i in range(25)]
+        with patch.object(CommonUtils, "SAVE_CHUNK_LINES", 4):
+            CommonUtils.write_lines_atomic("a.txt", lines)
+        self.assertEqual(self.read("a.txt"), "".join(l + "\n" for l in lines))
+        CommonUtils.write_lines_atomic("empty.txt", [])
+        self.assertEqual(self.read("empty.txt"), "")
+
+    def test_failure_keeps_original(self):
+        """写入中途失败时原文件不变，也不留下临时文件"""
+        CommonUtils.write_lines_atomic("a.txt", ["old"])
+
+        def broken():
+            yield "new"
+            raise OSError("磁盘已满")
+
+        with self.assertRaises(OSError):
+            CommonUtils.write_lines_atomic("a.txt", broken())
+        self.assertEqual(self.read("a.txt"), "old\n")
+        self.assertEqual(os.listdir(self.test_dir), ["a.txt"])
+
+    def test_fsync(self):
+        """开启 fsync 时同步文件"""
+        with patch("os.fsync") as mock_fsync:
+            CommonUtils.write_lines_atomic("a.txt", ["x"], fsync=True)
+        self.assertTrue(mock_fsync.called)
+        self.assertEqual(self.read("a.txt"), "x\n")
+
+
+class TestSaveCommand(TestSaveBase):
+    """测试 save 命令"""
+
+    def test_save_current_file(self):
+        """保存当前文件并更新状态"""
+        tf = self.open_file("a.txt", ["Hello", "World"])
+        with patch('builtins.print') as mock_print:
+            WorkSpace.SaveCommand().execute("save")
+            mock_print.assert_any_call("保存文件 a.txt 成功")
+        self.assertEqual(self.read("a.txt"), "Hello\nWorld\n")
+        self.assertEqual(tf.state, "normal")
+
+    def test_save_all(self):
+        """save all 保存所有打开的文件"""
+        self.open_file("a.txt", ["a"])
+        self.open_file("b.txt", ["b1", "b2"])
+        with patch('builtins.print'):
+            WorkSpace.SaveCommand().execute("save all")
+        self.assertEqual(self.read("a.txt"), "a\n")
+        self.assertEqual(self.read("b.txt"), "b1\nb2\n")
+
+    def test_save_all_skips_unmodified(self):
+        """save all 跳过未修改且已在磁盘上的文件"""
+        self.open_file("a.txt", ["a"])
+        CommonUtils.write_lines_atomic("b.txt", ["on disk"])
+        self.open_file("b.txt", ["b"], state="normal")
+        with patch('builtins.print') as mock_print:
+            WorkSpace.SaveCommand().execute("save all")
+        self.assertEqual(self.read("b.txt"), "on disk\n")
+        mock_print.assert_called_with("所有文件保存完成: 成功 1 个，失败 0 个，跳过 1 个未修改文件")
+
+    def test_save_all_reports_in_workspace_order(self):
+        """结果表按工作区顺序输出，单个文件失败不影响其它文件"""
+        paths = [f"f{i}.txt" for i in range(12)]
+        for path in paths:
+            self.open_file(path, [path])
+        real_write = CommonUtils.write_lines_atomic
+
+        def write(path, lines, fsync=None, release=None):
+            if path == "f3.txt":
+                raise OSError("只读")
+            real_write(path, lines)
+
+        with patch.object(CommonUtils, "write_lines_atomic", side_effect=write):
+            with patch('builtins.print') as mock_print:
+                WorkSpace.SaveCommand().execute("save all")
+        rows = [c.args[0] for c in mock_print.call_args_list[1:-1]]
+        self.assertEqual([row.split()[0] for row in rows], paths)
+        self.assertTrue(rows[3].endswith("失败: 只读"))
+        self.assertEqual(File.FileList.all_files["f3.txt"].state, "modified")
+        self.assertEqual(File.FileList.all_files["f4.txt"].state, "normal")
+        self.assertFalse(os.path.exists("f3.txt"))
+        self.assertEqual(self.read("f11.txt"), "f11.txt\n")
+
+
+class TestDirtyRangeSave(TestSaveBase):
+    """测试只改写修改过的尾部"""
+
+    def load(self, path, data):
+        with open(path, "wb") as f:
+            f.write(data.encode("utf-8"))
+        with patch('builtins.print'):
+            tf = CommonUtils.load_existingFile(path)
+        self.addCleanup(self.close_mapped, tf)
+        return tf
+
+    def close_mapped(self, tf):
+        if isinstance(tf.content.original, TextBuffer.MappedLines):
+            tf.content.original.close()
+
+    def test_buffer_tracks_first_dirty_line(self):
+        """片段表记录第一处修改所在的行"""
+        table = TextBuffer.PieceTable(["a", "b", "c"])
+        self.assertIsNone(table.dirty_from())
+        table.append("d")
+        self.assertEqual(table.dirty_from(), 3)
+        table[1] = "B"
+        self.assertEqual(table.dirty_from(), 1)
+        table.mark_clean()
+        self.assertIsNone(table.dirty_from())
+        self.assertEqual(table.clean_length(), 4)
+
+    def test_append_only_appends(self):
+        """只追加时不重写整个文件"""
+        tf = self.load("a.log", "line1\nline2\n")
+        tf.content.append("line3")
+        with patch.object(CommonUtils, "write_lines_atomic") as mock_write:
+            CommonUtils.save_file("a.log", tf)
+        mock_write.assert_not_called()
+        self.assertEqual(self.read("a.log"), "line1\nline2\nline3\n")
+        self.assertIsNone(tf.content.dirty_from())
+
+    def test_append_without_trailing_newline(self):
+        """原文件末尾没有换行符时先补上"""
+        tf = self.load("a.log", "line1\nline2")
+        tf.content.append("line3")
+        CommonUtils.save_file("a.log", tf)
+        self.assertEqual(self.read("a.log"), "line1\nline2\nline3\n")
+
+    def test_patch_tail(self):
+        """修改、删除靠近末尾的行时从该行开始改写"""
+        tf = self.load("a.txt", "一\n二\n三\n四\n")
+        tf.content[2] = "叁"
+        with patch.object(CommonUtils, "write_lines_atomic") as mock_write:
+            CommonUtils.save_file("a.txt", tf)
+        mock_write.assert_not_called()
+        self.assertEqual(self.read("a.txt"), "一\n二\n叁\n四\n")
+        del tf.content[3]
+        CommonUtils.save_file("a.txt", tf)
+        self.assertEqual(self.read("a.txt"), "一\n二\n叁\n")
+
+    def test_patch_mapped_file(self):
+        """mmap 打开的文件只原地追加；需要截断时整体重写，之后仍能读取全部原始内容"""
+        lines = [f"line {i}" for i in range(200)]
+        with patch.object(TextBuffer, "MMAP_THRESHOLD", 1):
+            tf = self.load("big.log", "".join(l + "\n" for l in lines))
+        tf.content.append("new")
+        with patch.object(CommonUtils, "write_lines_atomic") as mock_write:
+            CommonUtils.save_file("big.log", tf)
+        mock_write.assert_not_called()
+
+        del tf.content[150:]
+        with patch.object(CommonUtils, "write_lines_atomic", wraps=CommonUtils.write_lines_atomic) as mock_write:
+            CommonUtils.save_file("big.log", tf)
+        mock_write.assert_called_once()
+        expected = lines[:150]
+        self.assertEqual(self.read("big.log"), "".join(l + "\n" for l in expected))
+        # 索引会遍历全部原始内容
+        self.assertEqual(tf.content.char_count(), len("\n".join(expected)))
+        self.assertEqual([i for i, _ in tf.content.search(re.compile("line 149"))], [149])
+        self.assertEqual(list(tf.content), expected)
+
+    def test_rewrite_releases_mapping(self):
+        """整体重写 mmap 打开的文件时先关闭映射再改名（Windows 上不能替换被映射的文件），之后映射新文件"""
+        lines = [f"line {i}" for i in range(200)]
+        with patch.object(TextBuffer, "MMAP_THRESHOLD", 1):
+            tf = self.load("big.log", "".join(l + "\n" for l in lines))
+        old_mapping = tf.content.original
+        tf.content[0] = "first"
+        real_replace = os.replace
+
+        def replace(src, dst):
+            self.assertIsNone(old_mapping._mm)
+            real_replace(src, dst)
+
+        with patch.object(TextBuffer, "MMAP_THRESHOLD", 1), patch.object(os, "replace", side_effect=replace):
+            CommonUtils.save_file("big.log", tf)
+        expected = ["first"] + lines[1:]
+        self.assertIsInstance(tf.content.original, TextBuffer.MappedLines)
+        self.assertIsNot(tf.content.original, old_mapping)
+        self.assertIsNone(tf.content.dirty_from())
+        self.assertEqual(list(tf.content), expected)
+        self.assertTrue(Memento._capture_file(tf).get("onDisk"))
+
+        # 改名失败时重新映射原文件，内容与修改都保留
+        tf.content[1] = "second"
+        mapping = tf.content.original
+        with patch.object(os, "replace", side_effect=OSError("占用")):
+            with self.assertRaises(OSError):
+                CommonUtils.save_file("big.log", tf)
+        self.assertIs(tf.content.original, mapping)
+        self.assertEqual(list(tf.content), ["first", "second"] + lines[2:])
+        self.assertEqual(self.read("big.log"), "".join(l + "\n" for l in expected))
+
+    def test_close_releases_mapping(self):
+        """关闭未修改的 mmap 文件时释放映射，再次使用时重新读取"""
+        with patch.object(TextBuffer, "MMAP_THRESHOLD", 1):
+            tf = self.load("big.log", "a\nb\n")
+        mapping = tf.content.original
+        WorkSpace.WorkSpace.current_workFile_list["big.log"] = tf
+        WorkSpace.WorkSpace.recent_files.append("big.log")
+        WorkSpace.WorkSpace.current_workFile_path = "big.log"
+        with patch('builtins.print'):
+            WorkSpace.CloseCommand().execute("close")
+        self.assertIsNone(mapping._mm)
+        self.assertFalse(tf.is_loaded())
+        self.assertEqual(list(tf.content), ["a", "b"])
+
+    def test_other_newlines_rewrite_whole_file(self):
+        """单独的 \\r 或与本机不同的换行符时整体重写，不丢行、不混用换行符"""
+        tf = self.load("a.txt", "a\rb\nc\n")
+        tf.content[1] = "B"
+        CommonUtils.save_file("a.txt", tf)
+        with open("a.txt", "rb") as f:
+            self.assertEqual(f.read(), os.linesep.join(["a", "B", "c", ""]).encode())
+
+        tf = self.load("b.txt", "a\r\nb\r\n")
+        tf.content.append("c")
+        CommonUtils.save_file("b.txt", tf)
+        with open("b.txt", "rb") as f:
+            self.assertEqual(f.read(), os.linesep.join(["a", "b", "c", ""]).encode())
+
+    def test_external_change_rewrites_whole_file(self):
+        """磁盘文件在读取后被其它程序修改时整体重写"""
+        tf = self.load("a.log", "line1\n")
+        with open("a.log", "a", encoding="utf-8") as f:
+            f.write("external\n")
+        tf.content.append("line2")
+        CommonUtils.save_file("a.log", tf)
+        self.assertEqual(self.read("a.log"), "line1\nline2\n")
+
+    def test_large_tail_rewrites_whole_file(self):
+        """需要改写的行太多时整体重写"""
+        tf = self.load("a.txt", "a\nb\nc\n")
+        tf.content[0] = "A"
+        with patch.object(CommonUtils, "SAVE_PATCH_MAX_LINES", 1):
+            with patch.object(CommonUtils, "write_lines_atomic", wraps=CommonUtils.write_lines_atomic) as mock_write:
+                CommonUtils.save_file("a.txt", tf)
+        mock_write.assert_called_once()
+        self.assertEqual(self.read("a.txt"), "A\nb\nc\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
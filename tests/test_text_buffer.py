@@ -0,0 +1,420 @@
+"""
+文本缓冲区（TextBuffer）与 load 读取磁盘文件的单元测试
+"""
+import unittest
+import os
+import sys
+import re
+import random
+import shutil
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import File
+import CommonUtils
+import Memento
+import TextBuffer
+import WorkSpace
+
+
+class TestTextBufferBase(unittest.TestCase):
+    """测试基类 - 在临时目录中创建文件"""
+
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.test_dir = tempfile.mkdtemp()
+        os.chdir(self.test_dir)
+        self._patches = [patch.object(CommonUtils, "rootpath", self.test_dir)]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        Memento.flush()
+        for p in self._patches:
+            p.stop()
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, name, data):
+        with open(name, "wb") as f:
+            f.write(data.encode("utf-8"))
+        return name
+
+
+class TestReadLines(TestTextBufferBase):
+    """测试 read_lines"""
+
+    def test_small_file_is_list(self):
+        """小文件读取为普通列表，末尾换行不产生空行"""
+        self.assertEqual(TextBuffer.read_lines(self.write("a.txt", "x\ny\n")), ["x", "y"])
+        self.assertEqual(TextBuffer.read_lines(self.write("b.txt", "x\ny")), ["x", "y"])
+        self.assertEqual(TextBuffer.read_lines(self.write("c.txt", "")), [])
+        self.assertEqual(TextBuffer.read_lines(self.write("d.txt", "\n")), [""])
+
+    def test_large_file_is_mapped(self):
+        """超过阈值的文件使用 mmap"""
+        path = self.write("big.log", "a\nb\n")
+        with patch.object(TextBuffer, "MMAP_THRESHOLD", 1):
+            lines = TextBuffer.read_lines(path)
+        self.assertIsInstance(lines, TextBuffer.MappedLines)
+        self.assertEqual(list(lines), ["a", "b"])
+        self.assertTrue(TextBuffer.is_disk_backed(TextBuffer.PieceTable(lines)))
+        lines.close()
+
+
+class TestMappedLines(TestTextBufferBase):
+    """测试 MappedLines 的按需索引"""
+
+    def setUp(self):
+        super().setUp()
+        self.expected = [f"第{i}行 line {i}" for i in range(500)]
+        path = self.write("big.log", "\r\n".join(self.expected))
+        # 用很小的分块覆盖跨块定位
+        with patch.object(TextBuffer, "_INDEX_CHUNK", 64):
+            self.lines = TextBuffer.MappedLines(path)
+
+    def tearDown(self):
+        self.lines.close()
+        super().tearDown()
+
+    def test_random_access(self):
+        """任意行随机访问，包括负下标和切片"""
+        self.assertEqual(len(self.lines), 500)
+        for i in (0, 1, 37, 250, 498, 499):
+            self.assertEqual(self.lines[i], self.expected[i])
+        self.assertEqual(self.lines[-1], self.expected[-1])
+        self.assertEqual(self.lines[10:13], self.expected[10:13])
+        with self.assertRaises(IndexError):
+            self.lines[500]
+
+    def test_iteration(self):
+        """顺序遍历所有行"""
+        self.assertEqual(list(self.lines), self.expected)
+
+    def test_edits_do_not_copy_original(self):
+        """在 mmap 内容上编辑时原始内容不被复制或修改"""
+        table = TextBuffer.PieceTable(self.lines)
+        table.append("new")
+        table[0] = "changed"
+        del table[100:200]
+        self.assertFalse(TextBuffer.is_disk_backed(table))
+        self.assertEqual(len(table), 401)
+        self.assertEqual(table[0], "changed")
+        self.assertEqual(table[100], self.expected[200])
+        self.assertEqual(table[-1], "new")
+        self.assertEqual(list(table), ["changed"] + self.expected[1:100] + self.expected[200:] + ["new"])
+        self.assertEqual(list(self.lines), self.expected)
+
+
+class TestPieceTable(unittest.TestCase):
+    """测试片段表的列表式接口"""
+
+    def test_list_operations(self):
+        """常用的列表操作"""
+        table = TextBuffer.PieceTable(["a", "b", "c"])
+        table.append("d")
+        table.insert(0, "start")
+        table[2] = "B"
+        table[3:4] = ["c1", "c2"]
+        self.assertEqual(table, ["start", "a", "B", "c1", "c2", "d"])
+        self.assertEqual(table.pop(), "d")
+        self.assertEqual(table.pop(0), "start")
+        del table[1:3]
+        self.assertEqual(table, ["a", "c2"])
+        self.assertEqual(table[-1], "c2")
+        self.assertEqual(table[0:1], ["a"])
+        with self.assertRaises(IndexError):
+            table[5]
+        self.assertTrue(table.is_edited())
+
+    def test_consecutive_appends_share_one_piece(self):
+        """连续追加不新建片段"""
+        table = TextBuffer.PieceTable()
+        for i in range(100):
+            table.append(str(i))
+        self.assertEqual(table._root.count, 100)
+        self.assertIsNone(table._root.left)
+        self.assertIsNone(table._root.right)
+
+    def test_matches_list_model(self):
+        """随机编辑序列的结果与普通列表一致"""
+        rng = random.Random(7)
+        model = [f"line {i}" for i in range(50)]
+        table = TextBuffer.PieceTable(list(model))
+        for step in range(2000):
+            op = rng.randrange(5)
+            value = f"v{step}"
+            if op == 0 or not model:
+                index = rng.randint(0, len(model))
+                model.insert(index, value)
+                table.insert(index, value)
+            elif op == 1:
+                index = rng.randrange(len(model))
+                model[index] = value
+                table[index] = value
+            elif op == 2:
+                index = rng.randrange(len(model))
+                del model[index]
+                del table[index]
+            elif op == 3:
+                start = rng.randint(0, len(model))
+                stop = rng.randint(start, min(len(model), start + 3))
+                new_lines = [value + "a", value + "b"]
+                model[start:stop] = new_lines
+                table[start:stop] = new_lines
+            else:
+                model.append(value)
+                table.append(value)
+            self.assertEqual(len(table), len(model))
+        self.assertEqual(list(table), model)
+        self.assertEqual([table[i] for i in range(len(model))], model)
+
+
+class TestSearch(unittest.TestCase):
+    """测试按三元组索引查找"""
+
+    PATTERNS = [r"abc", r"ab+c", r"(ab|cd)cab", r"abc|bca", r"x?abca", r"\.ab", r"[ab]bca", r"(?i)ABC", r"^cab"]
+
+    def expected(self, model, regex):
+        return [(index, match.span()) for index, line in enumerate(model) for match in regex.finditer(line)]
+
+    def test_required_literals(self):
+        """只提取每个匹配都必须包含的字面文本"""
+        self.assertEqual(TextBuffer.required_literals(r"def \w+\(self"), ["def ", "(self"])
+        self.assertEqual(TextBuffer.required_literals(r"colou?r [0-9]+ (red|blue) items"),
+                         ["colo", "r ", " ", " items"])
+        self.assertEqual(TextBuffer.required_literals(r"cat|dog"), [])
+        # 转义的参数不是字面文本
+        self.assertEqual(TextBuffer.required_literals(r"\x41BC"), ["BC"])
+        self.assertEqual(TextBuffer.required_literals(r"\101BC"), ["BC"])
+        self.assertEqual(TextBuffer.required_literals(r"\u0041BC\U00000042CD"), ["BC", "CD"])
+        self.assertEqual(TextBuffer.required_literals(r"\N{LATIN CAPITAL LETTER A}BC"), ["BC"])
+        self.assertEqual(TextBuffer.required_literals(r"(a)\1abc"), ["abc"])
+
+    def test_escapes_find_matches(self):
+        """含转义的表达式与逐行扫描结果一致"""
+        lines = ["xx ABC yy", "ABCD", "abc", "AB C"]
+        table = TextBuffer.PieceTable(lines)
+        for pattern in [r"\x41BC", r"\101BC", r"\u0041BCD", r"\N{LATIN CAPITAL LETTER A}BC", r"\0101BC"]:
+            regex = re.compile(pattern)
+            found = [(index, match.span()) for index, match in table.search(regex)]
+            self.assertEqual(found, self.expected(lines, regex), pattern)
+
+    def test_index_follows_edits(self):
+        """随机编辑后，使用索引的查找与逐行扫描结果一致"""
+        rng = random.Random(5)
+        with patch.object(TextBuffer, "_TRIGRAM_BLOCK", 3):
+            def random_line():
+                return "".join(rng.choice("abc. x") for _ in range(rng.randrange(12)))
+            model = [random_line() for _ in range(40)]
+            table = TextBuffer.PieceTable(list(model))
+            for step in range(400):
+                op = rng.randrange(4)
+                value = random_line()
+                if op == 0 or not model:
+                    index = rng.randint(0, len(model))
+                    model.insert(index, value)
+                    table.insert(index, value)
+                elif op == 1:
+                    index = rng.randrange(len(model))
+                    model[index] = value
+                    table[index] = value
+                elif op == 2:
+                    start = rng.randrange(len(model))
+                    del model[start:start + 3]
+                    del table[start:start + 3]
+                else:
+                    model.append(value)
+                    table.append(value)
+                if step % 10 == 0:
+                    regex = re.compile(rng.choice(self.PATTERNS))
+                    found = [(index, match.span()) for index, match in table.search(regex)]
+                    self.assertEqual(found, self.expected(model, regex))
+        self.assertIsNotNone(table._trigrams)
+
+    def test_index_is_lazy(self):
+        """只有能提取出字面文本的查找才建立索引"""
+        table = TextBuffer.PieceTable(["hello world"])
+        self.assertEqual(len(list(table.search(re.compile(r"o")))), 2)
+        self.assertIsNone(table._trigrams)
+        self.assertEqual([index for index, _ in table.search(re.compile(r"wor"))], [0])
+        self.assertIsNotNone(table._trigrams)
+
+
+class TestLineIndex(unittest.TestCase):
+    """测试行列号与字符偏移的互相转换"""
+
+    def check(self, table, lines):
+        text = "\n".join(lines)
+        self.assertEqual(table.char_count(), len(text))
+        line_starts = []
+        offset = 0
+        for line in lines:
+            line_starts.append(offset)
+            offset += len(line) + 1
+        for index, line in enumerate(lines):
+            for col in {0, len(line) // 2, len(line)}:
+                expected = line_starts[index] + col
+                self.assertEqual(table.offset_of(index, col), expected)
+                self.assertEqual(table.position_of(expected), (index, col))
+
+    def test_offsets_follow_edits(self):
+        """随机编辑后索引仍与全文一致"""
+        rng = random.Random(11)
+        model = [f"line {i}" * (i % 4) for i in range(40)]
+        table = TextBuffer.PieceTable(list(model))
+        self.check(table, model)
+        for step in range(300):
+            op = rng.randrange(4)
+            value = "x" * rng.randrange(6)
+            if op == 0 or not model:
+                index = rng.randint(0, len(model))
+                model.insert(index, value)
+                table.insert(index, value)
+            elif op == 1:
+                index = rng.randrange(len(model))
+                model[index] = value
+                table[index] = value
+            elif op == 2:
+                index = rng.randrange(len(model))
+                del model[index]
+                del table[index]
+            else:
+                model.append(value)
+                table.append(value)
+            if step % 20 == 0:
+                self.check(table, model)
+        self.check(table, model)
+
+    def test_out_of_range(self):
+        """越界的行、列、偏移报错"""
+        table = TextBuffer.PieceTable(["ab", "c"])
+        with self.assertRaises(IndexError):
+            table.offset_of(2, 0)
+        with self.assertRaises(IndexError):
+            table.offset_of(0, 3)
+        with self.assertRaises(IndexError):
+            table.position_of(5)
+        self.assertEqual(TextBuffer.PieceTable().position_of(0), (0, 0))
+
+    def test_text_file_positions_are_one_based(self):
+        """TextFile 的接口使用从 1 开始的行列号"""
+        tf = File.TextFile("a.txt", content=["Hello", "World"])
+        self.assertEqual(tf.offset_of(2, 1), 6)
+        self.assertEqual(tf.position_of(8), (2, 3))
+
+
+class TestLoadExistingFile(TestTextBufferBase):
+    """测试 load 读取磁盘上已有的文件"""
+
+    def setUp(self):
+        super().setUp()
+        WorkSpace.WorkSpace.current_workFile_path = ""
+        WorkSpace.WorkSpace.current_workFile_list = {}
+        WorkSpace.WorkSpace.recent_files = []
+        File.FileList.all_files.clear()
+        File.FileList.all_files_path.clear()
+
+    def tearDown(self):
+        for tf in File.FileList.all_files.values():
+            if isinstance(tf.content.original, TextBuffer.MappedLines):
+                tf.content.original.close()
+        WorkSpace.WorkSpace.current_workFile_path = ""
+        WorkSpace.WorkSpace.current_workFile_list = {}
+        WorkSpace.WorkSpace.recent_files = []
+        File.FileList.all_files.clear()
+        File.FileList.all_files_path.clear()
+        super().tearDown()
+
+    def test_load_reads_content(self):
+        """load 已存在的文件时读取内容"""
+        self.write("a.txt", "hello\nworld\n")
+        with patch('builtins.print') as mock_print:
+            WorkSpace.LoadCommand().execute("load a.txt")
+            mock_print.assert_any_call("加载文件成功")
+        self.assertEqual(File.FileList.all_files["a.txt"].content, ["hello", "world"])
+        self.assertEqual(WorkSpace.WorkSpace.current_workFile_path, "a.txt")
+
+    def test_load_missing_file_creates_empty(self):
+        """load 不存在的文件时创建空文件"""
+        with patch('builtins.print'):
+            WorkSpace.LoadCommand().execute("load new.txt")
+        self.assertEqual(File.FileList.all_files["new.txt"].content, [])
+
+    def test_load_large_file_is_snapshotted_by_reference(self):
+        """未修改的大文件快照中不包含内容"""
+        self.write("big.log", "a\nb\n")
+        with patch.object(TextBuffer, "MMAP_THRESHOLD", 1):
+            with patch('builtins.print'):
+                WorkSpace.LoadCommand().execute("load big.log")
+        entry = Memento._capture_file(File.FileList.all_files["big.log"])
+        self.assertTrue(entry["onDisk"])
+        self.assertNotIn("content", entry)
+
+    def test_saved_large_file_stays_on_disk(self):
+        """大文件追加并保存后快照仍只引用磁盘文件；磁盘文件被改动后改为保存内容"""
+        self.write("big.log", "a\nb\n")
+        with patch.object(TextBuffer, "MMAP_THRESHOLD", 1):
+            with patch('builtins.print'):
+                WorkSpace.LoadCommand().execute("load big.log")
+        tf = File.FileList.all_files["big.log"]
+        tf.content.append("c")
+        self.assertIn("content", Memento._capture_file(tf))
+        CommonUtils.save_file("big.log", tf)
+        self.assertTrue(Memento._capture_file(tf).get("onDisk"))
+
+        with open("big.log", "a", encoding="utf-8") as f:
+            f.write("external\n")
+        self.assertEqual(Memento._capture_file(tf)["content"], ["a", "b", "c"])
+
+    def test_recovered_disk_file_appends_in_place(self):
+        """从快照恢复的磁盘文件保存时仍只追加尾部"""
+        self.write("big.log", "a\nb\n")
+        state = {"current_workFile_path": "big.log", "current_workFile_list": {"big.log": "normal"},
+                 "all_files": [{"fileName": "big.log", "filePath": "big.log", "state": "normal", "onDisk": True}]}
+        with patch.object(Memento, "recover", return_value=state):
+            WorkSpace.WorkSpace.recover()
+        tf = File.FileList.all_files["big.log"]
+        self.assertEqual(tf.disk_stamp, CommonUtils.disk_stamp("big.log"))
+        tf.content.append("c")
+        with patch.object(CommonUtils, "write_lines_atomic") as mock_write:
+            CommonUtils.save_file("big.log", tf)
+        mock_write.assert_not_called()
+        with open("big.log", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "a\nb\nc\n")
+
+    def test_recovered_disk_file_unreadable(self):
+        """恢复时已删除的磁盘文件不再恢复；恢复后才变得无法读取的文件提示后使用空内容"""
+        state = {"current_workFile_path": "big.log", "current_workFile_list": {"big.log": "normal", "gone.log": "normal"},
+                 "all_files": [{"fileName": "big.log", "filePath": "big.log", "state": "normal", "onDisk": True},
+                               {"fileName": "gone.log", "filePath": "gone.log", "state": "normal", "onDisk": True}]}
+        self.write("big.log", "a\nb\n")
+        with patch.object(Memento, "recover", return_value=state):
+            with patch('builtins.print') as mock_print:
+                WorkSpace.WorkSpace.recover()
+        mock_print.assert_any_call("[Warning] 文件已不存在，不再恢复: gone.log")
+        self.assertNotIn("gone.log", File.FileList.all_files_path)
+        self.assertEqual(list(WorkSpace.WorkSpace.current_workFile_list), ["big.log"])
+
+        os.remove("big.log")
+        tf = File.FileList.all_files["big.log"]
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(list(tf.content), [])
+        self.assertTrue(mock_print.call_args.args[0].startswith("[Warning] 读取文件失败，已使用空内容"))
+        self.assertIsNone(tf.disk_stamp)
+        tf.content.append("c")
+        self.assertEqual(list(tf.content), ["c"])
+
+    def test_load_with_log_header_enables_logging(self):
+        """首行为 # log 的文件自动启用日志"""
+        self.write("lab.txt", "# log\ntext\n")
+        with patch('builtins.print'):
+            WorkSpace.LoadCommand().execute("load lab.txt")
+        self.assertTrue(WorkSpace.WorkSpace.logger.is_logging_enabled("lab.txt"))
+        WorkSpace.WorkSpace.logger.disable_logging("lab.txt")
+
+
+if __name__ == '__main__':
+    unittest.main()